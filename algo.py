@@ -1,16 +1,20 @@
 import random
 
+from occupancy import Occupancy, iter_slots
+from problem_index import ProblemIndex
+from profiling import profiled, section
+
 # Constants
 COURSE_DURATION_MINUTES = 45
 
-def generate_gene(year_id, available_teachers, available_courses, available_classrooms, available_timeslots):
+def generate_gene(year_id, available_teachers, available_courses, available_classrooms, available_timeslots, rng=random):
     """
     Generate a random gene (course assignment) for a specific year.
     """
-    course = random.choice(available_courses)  # Randomly choose a course for the year
-    teacher = random.choice([t for t in available_teachers if course['id'] in t['courses']])  # Select a teacher
-    classroom = random.choice(available_classrooms)  # Choose a classroom
-    timeslot = random.choice(available_timeslots)  # Choose a timeslots
+    course = rng.choice(available_courses)  # Randomly choose a course for the year
+    teacher = rng.choice([t for t in available_teachers if course['id'] in t['courses']])  # Select a teacher
+    classroom = rng.choice(available_classrooms)  # Choose a classroom
+    timeslot = rng.choice(available_timeslots)  # Choose a timeslots
 
     return {
         'year_id': year_id,
@@ -30,13 +34,18 @@ def assign_teacher_to_class(class_day, teacher):
 
 import random
 
-def generate_population(population_size, years, year_courses, teachers, classrooms, timeslots, teacher_max_hours):
+@profiled('generate_population')
+def generate_population(population_size, years, year_courses, teachers, classrooms, timeslots, teacher_max_hours, problem_index=None,
+                        rng=random):
+    if problem_index is None:
+        problem_index = ProblemIndex(teachers, year_courses, timeslots, classrooms)
+    max_hours = [teacher_max_hours[t['id']] for t in teachers]
     population = []
 
     for _ in range(population_size):
         individual = []
-        teacher_workload = {teacher['id']: 0 for teacher in teachers}
-        year_timeslot_usage = {year['id']: [] for year in years}
+        teacher_workload = [0] * len(teachers)
+        year_timeslot_usage = Occupancy(len(timeslots))
 
         for year in years:
             year_timetable = []
@@ -45,58 +54,57 @@ def generate_population(population_size, years, year_courses, teachers, classroo
             for course in courses_for_year:
                 course_duration_hours = course['hours']
                 slots_needed = course_duration_hours * 60 // COURSE_DURATION_MINUTES
+                qualified_teachers = problem_index.course_teachers[course['id']]
 
                 for _ in range(int(slots_needed)):
-                    # Filter teachers based on course they can teach and their max workload
-                    available_teachers = [
-                        t for t in teachers 
-                        if course['id'] in t['courses'] and 
-                        teacher_workload[t['id']] + (COURSE_DURATION_MINUTES / 60) <= teacher_max_hours[t['id']]
-                    ]
-
-                    if not available_teachers:
-                        raise Exception(f"No available teachers for course {course['course_name']} in year {year['name']}")
-
-                    # Find available timeslots not yet used in this year
-                    available_timeslots = [
-                        ts for ts in timeslots 
-                        if (ts['day'], ts['slot']) not in year_timeslot_usage[year['id']]
-                    ]
-
-                    if not available_timeslots:
-                        raise Exception(f"No available timeslots for year {year['name']} to schedule {course['course_name']}")
-
-                    # Shuffle the available timeslots to maintain randomness
-                    random.shuffle(available_timeslots)
-
-                    # Try to generate a valid gene
-                    assigned = False
-                    for ts in available_timeslots:
-                        # Filter teachers based on unavailability for this specific timeslot
-                        available_teachers_for_slot = [
-                            t for t in available_teachers 
-                            if assign_teacher_to_class(ts['day'], t)
+                    with section('generate_population.slot_search'):
+                        # Filter teachers based on course they can teach and their max workload
+                        available_teachers = [
+                            t for t in qualified_teachers
+                            if teacher_workload[t] + (COURSE_DURATION_MINUTES / 60) <= max_hours[t]
                         ]
 
-                        if available_teachers_for_slot:
-                            # Generate the gene with available resources
-                            gene = generate_gene(
-                                year_id=year['id'], 
-                                available_teachers=available_teachers_for_slot, 
-                                available_courses=[course], 
-                                available_classrooms=classrooms, 
-                                available_timeslots=[ts]
-                            )
-
-                            # Update teacher workload
-                            teacher_workload[gene['teacher']] += COURSE_DURATION_MINUTES / 60
-                            # Mark the timeslot as used for this year
-                            year_timeslot_usage[year['id']].append((gene['timeslot']['day'], gene['timeslot']['slot']))
-                            # Add the scheduled class (gene) to the year timetable
-                            year_timetable.append(gene)
-
-                            assigned = True
-                            break  # Exit the loop once a class is successfully assigned
+                        if not available_teachers:
+                            raise Exception(f"No available teachers for course {course['course_name']} in year {year['name']}")
+
+                        # Find available timeslots not yet used in this year
+                        available_timeslots = list(iter_slots(year_timeslot_usage.free(year['id'])))
+
+                        if not available_timeslots:
+                            raise Exception(f"No available timeslots for year {year['name']} to schedule {course['course_name']}")
+
+                        # Shuffle the available timeslots to maintain randomness
+                        rng.shuffle(available_timeslots)
+
+                        # Try to generate a valid gene
+                        assigned = False
+                        for ts in available_timeslots:
+                            # Filter teachers based on unavailability for this specific timeslot
+                            available_teachers_for_slot = [
+                                teachers[t] for t in available_teachers
+                                if problem_index.is_available(t, ts)
+                            ]
+
+                            if available_teachers_for_slot:
+                                # Generate the gene with available resources
+                                gene = generate_gene(
+                                    year_id=year['id'], 
+                                    available_teachers=available_teachers_for_slot, 
+                                    available_courses=[course], 
+                                    available_classrooms=classrooms, 
+                                    available_timeslots=[timeslots[ts]],
+                                    rng=rng,
+                                )
+
+                                # Update teacher workload
+                                teacher_workload[problem_index.teacher_index[gene['teacher']]] += COURSE_DURATION_MINUTES / 60
+                                # Mark the timeslot as used for this year
+                                year_timeslot_usage.occupy(year['id'], ts)
+                                # Add the scheduled class (gene) to the year timetable
+                                year_timetable.append(gene)
+
+                                assigned = True
+                                break  # Exit the loop once a class is successfully assigned
 
                     if not assigned:
                         raise Exception(f"Could not assign a teacher for {course['course_name']} in year {year['name']} after checking all available timeslots.")
@@ -119,16 +127,18 @@ def display_population(population):
                 print(f"  {gene['year_id']}- Course: {gene['course']}, TeachID: {gene['teacher']}, "
                       f"ClassID: {gene['classroom']},{gene['timeslot']['day']}  {gene['timeslot']['start_time']} - {gene['timeslot']['end_time']} Slot {gene['timeslot']['slot']}")
 
+@profiled('fitness_function')
 def fitness_function(individual, teacher_max_hours):
     """
     Evaluate the fitness of an individual.
     """
     fitness = 0
     gap_penalty = 5
-    teacher_timeslots = {}
-    classroom_timeslots = {}
-    teacher_workload = {teacher['id']: 0 for teacher in teachers}
-    year_timeslot_usage = {}
+    num_genes = sum(len(year_timetable) for year_timetable in individual)
+    slot_bits = {}  # One bit per distinct (day, slot) of the individual
+    teacher_timeslots = Occupancy(num_genes)
+    classroom_timeslots = Occupancy(num_genes)
+    year_timeslot_usage = Occupancy(num_genes)
 
     for year_timetable in individual:
         day_slots = {}  # Reset day_slots for each year timetable
@@ -137,36 +147,19 @@ def fitness_function(individual, teacher_max_hours):
             classroom_id = gene['classroom']
             day = gene['timeslot']['day']
             slot = gene['timeslot']['slot']
-            timeslot = (day, slot)
+            timeslot = slot_bits.setdefault((day, slot), len(slot_bits))
 
             # Track teacher timeslots
-            if teacher_id not in teacher_timeslots:
-                teacher_timeslots[teacher_id] = []
-
-            if timeslot in teacher_timeslots[teacher_id]:
+            if teacher_timeslots.occupy(teacher_id, timeslot):
                 fitness -= 10  # Teacher overlap penalty
-            else:
-                teacher_timeslots[teacher_id].append(timeslot)
-                teacher_workload[teacher_id] += COURSE_DURATION_MINUTES / 60
 
             # Track classroom timeslots
-            if classroom_id not in classroom_timeslots:
-                classroom_timeslots[classroom_id] = []
-
-            if timeslot in classroom_timeslots[classroom_id]:
+            if classroom_timeslots.occupy(classroom_id, timeslot):
                 fitness -= 10  # Classroom overlap penalty
-            else:
-                classroom_timeslots[classroom_id].append(timeslot)
 
             # Track year timeslot usage
-            year_id = gene['year_id']
-            if year_id not in year_timeslot_usage:
-                year_timeslot_usage[year_id] = []
-
-            if timeslot in year_timeslot_usage[year_id]:
+            if year_timeslot_usage.occupy(gene['year_id'], timeslot):
                 fitness -= 10  # Year overlap penalty
-            else:
-                year_timeslot_usage[year_id].append(timeslot)
 
             # Track the slots per day for gap detection
             if day not in day_slots:
@@ -184,34 +177,41 @@ def fitness_function(individual, teacher_max_hours):
                     fitness -= gap_penalty * gap_size
                     #* gap_size
 
-    # Check if teacher workload exceeds max allowed hours
-    for teacher_id, workload in teacher_workload.items():
-        if workload > teacher_max_hours.get(teacher_id, float('inf')):
+    # Check if teacher workload (distinct busy timeslots) exceeds max allowed hours
+    for teacher_id, max_hours in teacher_max_hours.items():
+        workload = teacher_timeslots.busy_count(teacher_id) * (COURSE_DURATION_MINUTES / 60)
+        if workload > max_hours:
             fitness -= 11  # Workload penalty
 
     return fitness
                     # Determine if this gap should be penalized
                     # Assuming morning session ends at a specific slot (e.g., 11 for 1-11 slots)
                     # and evening starts at a specific slot (e.g., 3 for 12-15 slots)
+@profiled('crossover')
 def crossover(parent1, parent2):
     """
     Perform random crossover between two parents to create two new individuals.
+    The children get their own copies of the year timetables and genes, since
+    mutate and repair change them in place.
     """
     assert len(parent1) == len(parent2), "The number of years must be fixed."
 
     child1, child2 = [], []
 
     for i in range(len(parent1)):
+        year1 = [dict(gene) for gene in parent1[i]]
+        year2 = [dict(gene) for gene in parent2[i]]
         if random.random() < 0.5:
-            child1.append(parent1[i])
-            child2.append(parent2[i])
+            child1.append(year1)
+            child2.append(year2)
         else:
-            child1.append(parent2[i])
-            child2.append(parent1[i])
+            child1.append(year2)
+            child2.append(year1)
 
     return child1, child2
 
-def mutate(individual, mutation_rate, teachers, classrooms, timeslots):
+@profiled('mutate')
+def mutate(individual, mutation_rate, teachers, classrooms, timeslots, problem_index):
     """
     Apply mutation to an individual by randomly changing the teacher, classroom, and timeslot of one gene per year.
     Mutation occurs randomly once per year if the mutation rate condition is met.
@@ -226,9 +226,10 @@ def mutate(individual, mutation_rate, teachers, classrooms, timeslots):
             # Apply the mutation based on the randomly chosen mutation type
             if mutation_choice == 'teacher':
                 current_course = year_timetable[mutation_index]['course']
-                available_teachers = [t for t in teachers if current_course in t['courses']]
+                # Teachers qualified for the gene's course (genes keep the name, teachers list course ids)
+                available_teachers = problem_index.course_name_teachers.get(current_course, ())
                 if available_teachers:
-                    new_teacher = random.choice(available_teachers)
+                    new_teacher = teachers[random.choice(available_teachers)]
                     year_timetable[mutation_index]['teacher'] = new_teacher['id']
 
             elif mutation_choice == 'classroom':
@@ -241,11 +242,13 @@ def mutate(individual, mutation_rate, teachers, classrooms, timeslots):
 
     return individual
 
-def tournament_selection(population, fitness_values, k=3):#tkhayar best 1 mn 3 random, ttrepeata 
+@profiled('tournament_selection')
+def tournament_selection(population, fitness_values, k=3, rng=random):#tkhayar best 1 mn 3 random, ttrepeata 
     """
     Selects two individuals from the population using tournament selection.
+    rng is the source of randomness (the random module by default).
     """
-    tournament_indices = random.sample(range(len(population)), k)
+    tournament_indices = rng.sample(range(len(population)), k)
     tournament_individuals = [population[i] for i in tournament_indices]
     tournament_fitness = [fitness_values[i] for i in tournament_indices]
 
@@ -257,7 +260,8 @@ def tournament_selection(population, fitness_values, k=3):#tkhayar best 1 mn 3 r
 
     return parent1, parent2
 
-def repair(individual, teachers, classrooms, timeslots, teacher_max_hours):
+@profiled('repair')
+def repair(individual, teachers, classrooms, timeslots, teacher_max_hours, problem_index):
     """
     Repairs an individual (chromosome) by resolving hard constraint violations 
     (e.g., teacher conflicts, classroom conflicts, workload limits), and minimizing gaps between slots.
@@ -268,78 +272,78 @@ def repair(individual, teachers, classrooms, timeslots, teacher_max_hours):
     - classrooms: List of classrooms.
     - timeslots: List of available timeslots.
     - teacher_max_hours: Max teaching hours per teacher.
+    - problem_index: ProblemIndex of the problem.
 
     Returns:
     - Repaired individual.
     """
-    teacher_timeslots = {}  # Dictionary to track which timeslots a teacher has been assigned
-    classroom_timeslots = {}  # Track which timeslots a classroom has been occupied
+    teacher_timeslots = Occupancy(len(timeslots))  # Track which timeslots a teacher has been assigned
+    classroom_timeslots = Occupancy(len(timeslots))  # Track which timeslots a classroom has been occupied
     teacher_workload = {teacher['id']: 0 for teacher in teachers}  # Initialize workload dictionary
 
     # Repair hard constraint violations
     for year_timetable in individual:
         day_slots = {}  # Track timeslots per day to detect gaps
 
-        for gene in year_timetable:
-            teacher_id = gene['teacher']
-            classroom_id = gene['classroom']
-            timeslot = (gene['timeslot']['day'], gene['timeslot']['slot'])  # Combine day and slot
-            day = gene['timeslot']['day']
-            slot = gene['timeslot']['slot']
-
-            # ---- Repair Teacher Conflicts ----
-            if teacher_id not in teacher_timeslots:
-                teacher_timeslots[teacher_id] = []
-            if timeslot in teacher_timeslots[teacher_id] or teacher_workload[teacher_id] >= teacher_max_hours[teacher_id]:
-                # Teacher conflict or exceeding max hours, so repair the gene
-                available_teachers = [t for t in teachers if gene['course'] in t['courses']]
-                if available_teachers:
-                    new_teacher = random.choice(available_teachers)
+        with section('repair.conflicts'):
+            for gene in year_timetable:
+                teacher_id = gene['teacher']
+                classroom_id = gene['classroom']
+                day = gene['timeslot']['day']
+                slot = gene['timeslot']['slot']
+                timeslot = problem_index.timeslot_index[(day, slot)]  # Combine day and slot
+
+                # ---- Repair Teacher Conflicts ----
+                if teacher_timeslots.is_busy(teacher_id, timeslot) or teacher_workload[teacher_id] >= teacher_max_hours[teacher_id]:
+                    # Teacher conflict or exceeding max hours, so repair the gene
+                    # A qualified teacher when the course has one, any teacher otherwise
+                    available_teachers = problem_index.course_name_teachers.get(gene['course'], ())
+                    if available_teachers:
+                        new_teacher = teachers[random.choice(available_teachers)]
+                    else:
+                        new_teacher = random.choice(teachers)
+                    gene['teacher'] = new_teacher['id']
+                    teacher_workload[new_teacher['id']] += COURSE_DURATION_MINUTES / 60  # Update workload
                 else:
-                    new_teacher = random.choice(teachers)
-                gene['teacher'] = new_teacher['id']
-                teacher_workload[new_teacher['id']] += COURSE_DURATION_MINUTES / 60  # Update workload
-            else:
-                teacher_workload[teacher_id] += COURSE_DURATION_MINUTES / 60
-
-            teacher_timeslots[teacher_id].append(timeslot)
-
-            # ---- Repair Classroom Conflicts ----
-            if classroom_id not in classroom_timeslots:
-                classroom_timeslots[classroom_id] = []
-            if timeslot in classroom_timeslots[classroom_id]:
-                # Classroom conflict, so repair the gene
-                new_classroom = random.choice(classrooms)
-                gene['classroom'] = new_classroom['id']
+                    teacher_workload[teacher_id] += COURSE_DURATION_MINUTES / 60
 
-            classroom_timeslots[classroom_id].append(timeslot)
+                teacher_timeslots.occupy(teacher_id, timeslot)
 
-            # Track day slots for gap detection
-            if day not in day_slots:
-                day_slots[day] = []
-            day_slots[day].append(slot)
-
-        # ---- Repair Gaps in Timetables ----
-        for day, slots in day_slots.items():
-            slots.sort()  # Sort slots to find gaps
+                # ---- Repair Classroom Conflicts ----
+                if classroom_timeslots.is_busy(classroom_id, timeslot):
+                    # Classroom conflict, so repair the gene
+                    new_classroom = random.choice(classrooms)
+                    gene['classroom'] = new_classroom['id']
 
-            # Try to reduce gaps by shifting or swapping slots
-            for i in range(len(slots) - 1):
-                current_slot = slots[i]
-                next_slot = slots[i + 1]
+                classroom_timeslots.occupy(classroom_id, timeslot)
 
-                if next_slot > current_slot + 1:  # Gap detected
-                    gap_size = next_slot - (current_slot + 1)
+                # Track day slots for gap detection
+                if day not in day_slots:
+                    day_slots[day] = []
+                day_slots[day].append(slot)
 
-                    # Attempt to fill the gap by shifting a nearby timeslot or reassigning
-                    for j, gene in enumerate(year_timetable):
-                        if gene['timeslot']['day'] == day and gene['timeslot']['slot'] == next_slot:
-                            available_timeslots = [ts for ts in timeslots if ts['slot'] == current_slot + 1 and ts not in classroom_timeslots[gene['classroom']]]
-                            if available_timeslots:
-                                # Shift the next slot to close the gap
-                                gene['timeslot'] = available_timeslots[0]
-                                classroom_timeslots[gene['classroom']].append((day, current_slot + 1))
-                                break
+        # ---- Repair Gaps in Timetables ----
+        with section('repair.gap_shift'):
+            for day, slots in day_slots.items():
+                slots.sort()  # Sort slots to find gaps
+
+                # Try to reduce gaps by shifting or swapping slots
+                for i in range(len(slots) - 1):
+                    current_slot = slots[i]
+                    next_slot = slots[i + 1]
+
+                    if next_slot > current_slot + 1:  # Gap detected
+                        gap_size = next_slot - (current_slot + 1)
+
+                        # Attempt to fill the gap by shifting a nearby timeslot or reassigning
+                        for gene in year_timetable:
+                            if gene['timeslot']['day'] == day and gene['timeslot']['slot'] == next_slot:
+                                target = problem_index.timeslot_index.get((day, current_slot + 1))
+                                if target is not None and not classroom_timeslots.is_busy(gene['classroom'], target):
+                                    # Shift the next slot to close the gap
+                                    gene['timeslot'] = timeslots[target]
+                                    classroom_timeslots.occupy(gene['classroom'], target)
+                                    break
 
     return individual
 
@@ -503,59 +507,39 @@ POPULATION_SIZE = 10
 MUTATION_RATE = 0.1
 NUM_GENERATIONS = 10000
 TOURNAMENT_SIZE = 3
-RESET_THRESHOLD = -600
+RESET_THRESHOLD = -600  # Fitness of the built-in problem at or below which an individual is replaced by a fresh one
 STOP_THRESHOLD = 0
-population = generate_population(POPULATION_SIZE, years, year_courses, teachers, classrooms, timeslots, teacher_max_hours)
-
-# Run Genetic Algorithm
-for generation in range(NUM_GENERATIONS):
-    # Evaluate Fitness
-    fitness_values = [fitness_function(individual, teacher_max_hours) for individual in population]
-
-    
-    # Print Fitness for Each Individual
-    print(f"Generation {generation}:")
-    for i, fitness in enumerate(fitness_values):
-        print(f"  Individual {i + 1}: Fitness = {fitness}")
-
-    if max(fitness_values) >= STOP_THRESHOLD:
-      print("Stopping early due to fitness threshold.")
-      best_index = fitness_values.index(max(fitness_values))
-      print(f"Best Fitness of Generation {generation}: {fitness_values[best_index]}")
-      print(f"Best Solution of Generation {generation} before fixing:")
-      display_population([population[best_index]])
-
-
-      break
-    # Check if all fitness values are the same and below the reset threshold
-    if len(set(fitness_values)) == 1 or min(fitness_values) <= RESET_THRESHOLD:
-        print("Resetting population due to no improvement.")
-
-        population = generate_population(POPULATION_SIZE, years, year_courses, teachers, classrooms, timeslots, teacher_max_hours)
-        if len(set(fitness_values)) == 1: print("All individuals have the same fitness value. Stopping early.")
-        if min(fitness_values) <= RESET_THRESHOLD: print("All individuals have a fitness value less than or equal to the reset threshold. ")
-        continue  
-
-    print(2)
-    
-    # Generate New Population
-    new_population = []
-    
-    for _ in range(POPULATION_SIZE // 2):  
-        parent1, parent2 = tournament_selection(population, fitness_values, k=TOURNAMENT_SIZE)
-        child1, child2 = crossover(parent1, parent2)
-
-        child1= mutate(child1, MUTATION_RATE, teachers, classrooms, timeslots)
-        child2= mutate(child1, MUTATION_RATE, teachers, classrooms, timeslots)
-        new_population.append(repair(child1, teachers, classrooms, timeslots, teacher_max_hours))
-        new_population.append(repair(child2, teachers, classrooms, timeslots, teacher_max_hours))
-    
-    # Update population with new generation
-    population = new_population
-
-    # Print Best Solution of the Generation
-    best_index = fitness_values.index(max(fitness_values))
-    print(f"Best Fitness of Generation {generation}: {fitness_values[best_index]}")
-    print(f"Best Solution of Generation {generation}:")
-
-
+NUM_WORKERS = 0  # 0 runs everything in this process, N > 0 spreads fitness and offspring over N worker processes
+SEED = None
+PROGRESS_INTERVAL = 100  # Print statistics every N generations, 0 for a silent run
+CHECKPOINT_PATH = None  # e.g. 'run.npz': checkpoint every 100 generations, and resume from the file when it exists
+
+if __name__ == '__main__':
+    import os
+
+    from progress import PrintSink, ProgressReporter
+    from solver import Solver
+
+    problem = {
+        'years': years,
+        'year_courses': year_courses,
+        'teachers': teachers,
+        'classrooms': classrooms,
+        'timeslots': timeslots,
+        'teacher_max_hours': teacher_max_hours,
+    }
+    progress = ProgressReporter([PrintSink()], interval=PROGRESS_INTERVAL) if PROGRESS_INTERVAL else None
+    solver = Solver(problem)
+    if CHECKPOINT_PATH is not None and os.path.exists(CHECKPOINT_PATH):
+        print(f"Resuming from {CHECKPOINT_PATH}")
+        result = solver.resume(CHECKPOINT_PATH, progress=progress)
+    else:
+        result = solver.solve({
+            'num_workers': NUM_WORKERS, 'seed': SEED, 'checkpoint_path': CHECKPOINT_PATH, 'reset_threshold': RESET_THRESHOLD,
+        }, progress)
+
+    if result['fitness'] >= STOP_THRESHOLD:
+        print("Stopping early due to fitness threshold.")
+    print(f"Best Fitness after {result['generations']} generations ({result['resets']} resets): {result['fitness']}")
+    print("Best Solution:")
+    display_population([result['individual']])
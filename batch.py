@@ -0,0 +1,179 @@
+"""
+Batch solving: many problem instances (e.g. one per school) over one worker pool.
+
+Instances come from a directory of .json files or from a JSONL file (or
+stdin with -), one instance per file or line. An instance is either a
+problem dict (years, year_courses, teachers, classrooms, timeslots and
+teacher_max_hours, as in algo.py) or {"id": ..., "problem": {...},
+"config": {...}} with its own solver settings. The pool starts once and its
+workers are reused from one instance to the next, so imports are paid once
+per worker, not once per school. Every instance gets its own time_limit
+(--time-budget unless its config says otherwise) and its result is written
+as one JSON line as soon as it finishes:
+
+    python batch.py schools/ --workers 4 --time-budget 60 --output results.jsonl
+
+A summary with the total throughput is printed at the end.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from solver import DEFAULT_CONFIG, ENGINES, Solver
+
+
+def load_problem(data):
+    """
+    Restore a problem dict read from JSON, whose year_courses and teacher_max_hours
+    keys came back as strings, with the ids of the years and teachers as keys.
+    """
+    problem = dict(data)
+    if 'year_courses' in data:
+        year_ids = {str(year['id']): year['id'] for year in data.get('years', ())}
+        problem['year_courses'] = {year_ids.get(str(key), key): courses for key, courses in data['year_courses'].items()}
+    if 'teacher_max_hours' in data:
+        teacher_ids = {str(teacher['id']): teacher['id'] for teacher in data.get('teachers', ())}
+        problem['teacher_max_hours'] = {
+            teacher_ids.get(str(key), key): hours for key, hours in data['teacher_max_hours'].items()
+        }
+    return problem
+
+
+def _job(data, default_id):
+    if 'problem' in data:
+        return data.get('id', default_id), data['problem'], data.get('config') or {}
+    return data.get('id', default_id), data, {}
+
+
+def iter_jobs(path):
+    """
+    Yield (job id, problem data, config) for every instance of a directory of .json
+    files (ids are the file names) or of a JSONL file, - for stdin (ids are the line numbers).
+    """
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.json'):
+                with open(os.path.join(path, name)) as f:
+                    yield _job(json.load(f), name[:-len('.json')])
+        return
+
+    stream = sys.stdin if path == '-' else open(path)
+    try:
+        for line_number, line in enumerate(stream, 1):
+            if line.strip():
+                yield _job(json.loads(line), line_number)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def solve_job(job_id, data, config):
+    """
+    Solve one instance and return its result as a JSON-ready dict (with an error
+    message instead of a timetable when the instance could not be solved).
+    """
+    start = time.perf_counter()
+    try:
+        problem = load_problem(data)
+        result = Solver(problem).solve(config)
+    except Exception as error:  # One bad instance must not stop the batch
+        return {'id': job_id, 'error': f"{type(error).__name__}: {error}", 'elapsed': time.perf_counter() - start}
+    return {
+        'id': job_id,
+        'fitness': result['fitness'],
+        'generations': result['generations'],
+        'evaluations': result['evaluations'],
+        'lessons': len(result['timetable']),
+        'elapsed': result['elapsed'],
+        'individual': result['individual'],
+    }
+
+
+def _solve_task(task):
+    return solve_job(*task)
+
+
+def run_batch(jobs, output, num_workers=0, config=None):
+    """
+    Solve every job and write each result to output as one JSON line when it finishes.
+
+    Parameters:
+    - jobs: Iterable of (job id, problem data, config), e.g. iter_jobs(path).
+    - output: Text stream receiving the results.
+    - num_workers: Worker processes, 0 to solve the jobs one after the other in this process.
+    - config: Settings of every job, overridden by the job's own config.
+
+    Returns:
+    - A summary dict: jobs, solved (fitness at or above their stop_threshold),
+      failed, lessons, elapsed, jobs_per_s and lessons_per_s.
+    """
+    config = config or {}
+    summary = {'jobs': 0, 'solved': 0, 'failed': 0, 'lessons': 0}
+    start = time.perf_counter()
+
+    def write(result, job_config):
+        summary['jobs'] += 1
+        if 'error' in result:
+            summary['failed'] += 1
+        else:
+            summary['lessons'] += result['lessons']
+            summary['solved'] += result['fitness'] >= job_config.get('stop_threshold', DEFAULT_CONFIG['stop_threshold'])
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+
+    tasks = ((job_id, data, dict(config, **job_config)) for job_id, data, job_config in jobs)
+    if num_workers == 0:
+        for task in tasks:
+            write(_solve_task(task), task[2])
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            # Keep a few jobs queued per worker, so a long stream is not read into memory at once
+            pending = {}
+            for task in tasks:
+                pending[executor.submit(_solve_task, task)] = task[2]
+                if len(pending) >= 2 * num_workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write(future.result(), pending.pop(future))
+            for future in wait(pending).done:
+                write(future.result(), pending[future])
+
+    elapsed = time.perf_counter() - start
+    summary.update(
+        elapsed=elapsed,
+        jobs_per_s=summary['jobs'] / elapsed if elapsed else None,
+        lessons_per_s=summary['lessons'] / elapsed if elapsed else None,
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="directory of .json instances, or JSONL file (- for stdin)")
+    parser.add_argument('--output', default='-', help="JSONL file receiving the results (- for stdout)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes, 0 to run in this process")
+    parser.add_argument('--time-budget', type=float, default=60, help="seconds per instance")
+    parser.add_argument('--engine', choices=ENGINES, default='ga')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    # Each instance runs on one worker, so the solver itself stays in-process (and CP-SAT uses one thread)
+    config = {'engine': args.engine, 'time_limit': args.time_budget, 'num_workers': 0, 'seed': args.seed}
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        summary = run_batch(iter_jobs(args.input), output, args.workers, config)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(
+        f"{summary['jobs']} instances ({summary['solved']} solved, {summary['failed']} failed) in {summary['elapsed']:.1f}s: "
+        f"{summary['jobs_per_s']:.2f} instances/s, {summary['lessons_per_s']:.0f} lessons/s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+"""
+Benchmark of the GA operators and of end-to-end convergence.
+
+Runs on the built-in problem of algo.py and on copies scaled 10x and 100x
+(teachers, years and classrooms), with fixed seeds, and writes the results
+as JSON so that runs of different versions can be compared:
+
+    python benchmark.py --scales 1 10 100 --output bench.json
+
+With --synthetic the instances come from instances.generate_instance, sized
+like the built-in problem times the scale. With --district they are district
+timetables of about 2,000 lessons per scale: 12 year levels of 7 sections
+times the scale, sharing teachers and classrooms over 3 buildings.
+
+--compare-engines also runs the given engines end to end on every instance
+(e.g. --compare-engines ga cp), with the same time budget:
+
+    python benchmark.py --scales 1 2 --synthetic --compare-engines ga decomposition cp
+
+--child-scoring compares scoring the children with batch_fitness against
+carrying each parent's ConflictState over to its child (see benchmark_child_scoring).
+"""
+import argparse
+import copy
+import json
+import platform
+import random
+import time
+
+import numpy as np
+
+import algo
+from delta import ConflictState
+from fitness_batch import batch_fitness
+from instances import generate_instance
+from profiling import Profiler
+from replacement import REPLACEMENT_MODES
+from seeding import greedy_individual
+from solver import ENGINES, Solver
+from timetable import TimetableCodec, crossover_timetables, mutate_timetable, repair_timetable, stack_timetables
+
+
+def scale_problem(factor):
+    """
+    Copy the built-in problem factor times: every copy gets its own years,
+    teachers and classrooms (with fresh ids), the timeslots are shared.
+
+    Returns:
+    - A problem dict with years, year_courses, teachers, classrooms, timeslots and teacher_max_hours.
+    """
+    years, year_courses, teachers, classrooms, teacher_max_hours = [], {}, [], [], {}
+    year_stride = max(year['id'] for year in algo.years)
+    teacher_stride = max(teacher['id'] for teacher in algo.teachers)
+    classroom_stride = max(classroom['id'] for classroom in algo.classrooms)
+
+    for copy_index in range(factor):
+        for year in algo.years:
+            year_id = year['id'] + copy_index * year_stride
+            years.append({'id': year_id, 'name': f"{year['name']} ({copy_index + 1})"})
+            year_courses[year_id] = algo.year_courses[year['id']]
+        for teacher in algo.teachers:
+            teacher_id = teacher['id'] + copy_index * teacher_stride
+            teachers.append(dict(teacher, id=teacher_id))
+            teacher_max_hours[teacher_id] = algo.teacher_max_hours[teacher['id']]
+        for classroom in algo.classrooms:
+            classrooms.append(dict(classroom, id=classroom['id'] + copy_index * classroom_stride))
+
+    return {
+        'years': years,
+        'year_courses': year_courses,
+        'teachers': teachers,
+        'classrooms': classrooms,
+        'timeslots': algo.timeslots,
+        'teacher_max_hours': teacher_max_hours,
+    }
+
+
+def synthetic_problem(factor, seed):
+    """
+    Generate a feasible instance with the size of the built-in problem times factor.
+    """
+    return generate_instance(
+        num_years=len(algo.years) * factor,
+        num_teachers=len(algo.teachers) * factor,
+        num_classrooms=len(algo.classrooms) * factor,
+        num_courses=15,
+        seed=seed,
+    )
+
+
+def district_problem(factor, seed):
+    """
+    Generate a feasible district instance: 12 year levels with 7 * factor sections each
+    (about 2,000 lessons per factor), 90 * factor teachers and classrooms in 3 buildings.
+    """
+    return generate_instance(
+        num_years=12,
+        sections_per_year=7 * factor,
+        num_teachers=90 * factor,
+        num_classrooms=90 * factor,
+        num_buildings=3,
+        num_courses=30,
+        courses_per_teacher=6,
+        seed=seed,
+    )
+
+
+def _timed(function, inputs):
+    """
+    Call function once per input and return the timing summary.
+    """
+    start = time.perf_counter()
+    for args in inputs:
+        function(*args)
+    elapsed = time.perf_counter() - start
+    return {'calls': len(inputs), 'total_s': elapsed, 'per_call_ms': 1000 * elapsed / max(len(inputs), 1)}
+
+
+def benchmark_operators(problem, population_size, repeat, seed):
+    """
+    Time every GA operator separately, on the dict individuals and on the Timetable arrays.
+    """
+    random.seed(seed)
+    codec = TimetableCodec(problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'], problem['timeslots'])
+    problem_index = codec.problem_index
+    teachers, classrooms, timeslots = problem['teachers'], problem['classrooms'], problem['timeslots']
+    teacher_max_hours = problem['teacher_max_hours']
+
+    start = time.perf_counter()
+    population = algo.generate_population(
+        population_size, problem['years'], problem['year_courses'], teachers, classrooms, timeslots, teacher_max_hours, problem_index
+    )
+    elapsed = time.perf_counter() - start
+    results = {'generate_population': {'calls': 1, 'total_s': elapsed, 'per_call_ms': 1000 * elapsed / population_size}}
+    results['greedy_individual'] = _timed(
+        greedy_individual,
+        [(problem['years'], problem['year_courses'], teachers, classrooms, timeslots, teacher_max_hours, problem_index)] * population_size,
+    )
+
+    fitness_values = [algo.fitness_function(individual, teacher_max_hours) for individual in population]
+    pairs = [random.sample(population, 2) for _ in range(repeat)]
+    copies = [copy.deepcopy(random.choice(population)) for _ in range(repeat)]
+
+    results['fitness_function'] = _timed(algo.fitness_function, [(random.choice(population), teacher_max_hours) for _ in range(repeat)])
+    results['tournament_selection'] = _timed(algo.tournament_selection, [(population, fitness_values, algo.TOURNAMENT_SIZE)] * repeat)
+    results['crossover'] = _timed(algo.crossover, pairs)
+    results['mutate'] = _timed(algo.mutate, [(individual, 1.0, teachers, classrooms, timeslots, problem_index) for individual in copies])
+    results['repair'] = _timed(algo.repair, [(individual, teachers, classrooms, timeslots, teacher_max_hours, problem_index) for individual in copies])
+
+    timetables = codec.encode_population(population)
+    timetable_pairs = [random.sample(timetables, 2) for _ in range(repeat)]
+    timetable_copies = [random.choice(timetables).copy() for _ in range(repeat)]
+    states = [ConflictState(timetable, codec, teacher_max_hours) for timetable in timetable_copies]
+
+    results['batch_fitness'] = _timed(
+        lambda encoded: batch_fitness(encoded, codec.index_maps, teacher_max_hours), [(stack_timetables(timetables),)] * repeat
+    )
+    results['conflict_state'] = _timed(ConflictState, [(timetable, codec, teacher_max_hours) for timetable in timetable_copies])
+    results['crossover_timetables'] = _timed(crossover_timetables, timetable_pairs)
+    results['mutate_timetable'] = _timed(mutate_timetable, [(state.timetable, 1.0, codec, state) for state in states])
+    results['repair_timetable'] = _timed(repair_timetable, [(state.timetable, codec, teacher_max_hours, state) for state in states])
+
+    return results
+
+
+def _breed_with_batch_fitness(pairs, seeds, codec, teacher_max_hours, mutation_rate):
+    children = []
+    for (parent1, parent2), seed in zip(pairs, seeds):
+        rng = random.Random(seed)
+        for child in crossover_timetables(parent1, parent2, rng):
+            mutate_timetable(child, mutation_rate, codec, rng=rng)
+            repair_timetable(child, codec, teacher_max_hours)
+            children.append(child)
+    return batch_fitness(stack_timetables(children), codec.index_maps, teacher_max_hours).tolist()
+
+
+def _breed_with_inherited_states(pairs, seeds, states, codec, teacher_max_hours, mutation_rate):
+    fitness_values = []
+    for (parent1, parent2), seed in zip(pairs, seeds):
+        rng = random.Random(seed)
+        for child, parent in zip(crossover_timetables(parent1, parent2, rng), (parent1, parent2)):
+            # Start from the parent's counters and move the genes the child took from the other parent
+            state = states[id(parent)].copy()
+            genes, before = child.genes, parent.genes
+            differing = np.flatnonzero(
+                (genes['teacher'] != before['teacher']) | (genes['classroom'] != before['classroom'])
+                | (genes['timeslot'] != before['timeslot'])
+            )
+            for i in differing.tolist():
+                state.move(i, teacher=int(genes['teacher'][i]), classroom=int(genes['classroom'][i]),
+                           timeslot=int(genes['timeslot'][i]))
+            mutate_timetable(state.timetable, mutation_rate, codec, state, rng)
+            repair_timetable(state.timetable, codec, teacher_max_hours, state)
+            fitness_values.append(state.score)
+    return fitness_values
+
+
+def benchmark_child_scoring(problem, population_size, repeat, seed, mutation_rate=algo.MUTATION_RATE):
+    """
+    Compare two ways of breeding and scoring children without a fitness cache:
+    - batch_fitness: crossover, mutate and repair every child, then score them all with
+      one batch_fitness call (what breed_pairs does),
+    - inherited_state: copy the ConflictState of the parent a child mostly comes from,
+      move the genes it took from the other parent, then mutate and repair through the
+      state. The parents' states are built beforehand and not timed.
+    Both run on a diverse random population and on a converged one (mutated copies of
+    one individual), where children differ from their parents in few genes.
+    """
+    codec = TimetableCodec(problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'], problem['timeslots'])
+    teacher_max_hours = problem['teacher_max_hours']
+    rng = random.Random(seed)
+    individuals = algo.generate_population(
+        population_size, problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'],
+        problem['timeslots'], teacher_max_hours, codec.problem_index, rng,
+    )
+    diverse = codec.encode_population(individuals)
+    converged = [diverse[0].copy() for _ in range(population_size)]
+    for timetable in converged:
+        mutate_timetable(timetable, 1.0, codec, rng=rng)
+    repeat = max(repeat, 1)
+
+    results = {}
+    for name, population in (('diverse', diverse), ('converged', converged)):
+        states = {id(timetable): ConflictState(timetable, codec, teacher_max_hours) for timetable in population}
+        pairs = [tuple(rng.sample(population, 2)) for _ in range(population_size // 2)]
+        seeds = [rng.getrandbits(64) for _ in pairs]
+        children = 2 * len(pairs) * repeat
+        timings = {}
+        for method, breed in (
+            ('batch_fitness', lambda: _breed_with_batch_fitness(pairs, seeds, codec, teacher_max_hours, mutation_rate)),
+            ('inherited_state', lambda: _breed_with_inherited_states(pairs, seeds, states, codec, teacher_max_hours, mutation_rate)),
+        ):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                fitness_values = breed()
+            elapsed = time.perf_counter() - start
+            timings[method] = {'children': children, 'total_s': elapsed, 'per_child_ms': 1000 * elapsed / children}
+            timings[method]['fitness_values'] = fitness_values
+        # Both ways must give the same children, so the same fitness values
+        timings['same_fitness'] = timings['batch_fitness'].pop('fitness_values') == timings['inherited_state'].pop('fitness_values')
+        results[name] = timings
+    return results
+
+
+def benchmark_convergence(problem, population_size, generations, time_budget, seed, profiler=None, greedy_fraction=0.0,
+                          replacement='generational', engine='ga'):
+    """
+    Run the Solver and measure generations per second, fitness evaluations and time to fitness 0.
+    With a Profiler, the run is also timed operator by operator.
+    """
+    config = {
+        'engine': engine,
+        'population_size': population_size,
+        'greedy_fraction': greedy_fraction,
+        'replacement': replacement,
+        'num_generations': generations,
+        'time_limit': time_budget,
+        'num_workers': 0,
+        'seed': seed,
+    }
+    if profiler is None:
+        result = Solver(problem).solve(config)
+    else:
+        with profiler:
+            result = Solver(problem).solve(config)
+    elapsed = result['elapsed']
+    return {
+        'generations': result['generations'],
+        'elapsed_s': elapsed,
+        'generations_per_s': result['generations'] / elapsed if elapsed else None,
+        'best_fitness': result['fitness'],
+        'evaluations': result['evaluations'],
+        'fitness_cache': result['fitness_cache'],
+        'time_to_fitness_0_s': elapsed if result['fitness'] >= algo.STOP_THRESHOLD else None,
+    }
+
+
+def compare_engines(problem, engines, population_size, generations, time_budget, seed, greedy_fraction=0.0,
+                    replacement='generational'):
+    """
+    Run benchmark_convergence once per engine and print one line per engine.
+
+    Returns:
+    - A dict engine -> end-to-end results, or {'error': message} when the engine found no timetable
+      or cannot run here (the cp engine without OR-Tools).
+    """
+    results = {}
+    for engine in engines:
+        try:
+            results[engine] = benchmark_convergence(
+                problem, population_size, generations, time_budget, seed, greedy_fraction=greedy_fraction,
+                replacement=replacement, engine=engine,
+            )
+        except (ImportError, ValueError, RuntimeError) as error:
+            results[engine] = {'error': str(error)}
+            print(f"  {engine:<13} {error}")
+            continue
+        print(f"  {engine:<13} fitness {results[engine]['best_fitness']:>6} in {results[engine]['elapsed_s']:.2f}s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--population-size', type=int, default=algo.POPULATION_SIZE)
+    parser.add_argument('--repeat', type=int, default=20, help="calls per operator")
+    parser.add_argument('--generations', type=int, default=algo.NUM_GENERATIONS)
+    parser.add_argument('--time-budget', type=float, default=60, help="seconds per end-to-end run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--synthetic', action='store_true', help="use generated instances instead of copies of the built-in data")
+    parser.add_argument('--district', action='store_true', help="use district instances with many sections per year level")
+    parser.add_argument('--greedy-fraction', type=float, default=0.0,
+                        help="share of the initial population built by the DSatur heuristic (0 measures the GA alone)")
+    parser.add_argument('--replacement', choices=REPLACEMENT_MODES, default='generational')
+    parser.add_argument('--engine', choices=ENGINES, default='ga')
+    parser.add_argument('--compare-engines', choices=ENGINES, nargs='+', default=[],
+                        help="also run these engines end to end and report them side by side")
+    parser.add_argument('--child-scoring', action='store_true',
+                        help="also compare batch_fitness with ConflictStates inherited from the parents")
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--profile', action='store_true', help="time every operator during the end-to-end runs")
+    parser.add_argument('--track-allocations', action='store_true', help="with --profile, also measure memory with tracemalloc")
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'synthetic': args.synthetic,
+        'district': args.district,
+        'population_size': args.population_size,
+        'greedy_fraction': args.greedy_fraction,
+        'replacement': args.replacement,
+        'engine': args.engine,
+        'compare_engines': args.compare_engines,
+        'results': [],
+    }
+    for scale in args.scales:
+        if args.district:
+            problem = district_problem(scale, args.seed)
+        elif args.synthetic:
+            problem = synthetic_problem(scale, args.seed)
+        else:
+            problem = scale_problem(scale)
+        print(f"Scale {scale}x: {len(problem['teachers'])} teachers, {len(problem['years'])} years, {len(problem['classrooms'])} classrooms")
+        profiler = Profiler(track_allocations=args.track_allocations, per_generation=False) if args.profile else None
+        result = {
+            'scale': scale,
+            'instance': {key: len(problem[key]) for key in ('years', 'teachers', 'classrooms', 'timeslots')},
+            'operators': benchmark_operators(problem, args.population_size, args.repeat, args.seed),
+            'end_to_end': benchmark_convergence(
+                problem, args.population_size, args.generations, args.time_budget, args.seed, profiler, args.greedy_fraction,
+                args.replacement, args.engine,
+            ),
+        }
+        if args.child_scoring:
+            result['child_scoring'] = benchmark_child_scoring(problem, args.population_size, args.repeat, args.seed)
+        if profiler is not None:
+            print(profiler.summary())
+            result['profile'] = profiler.dump()
+        if args.compare_engines:
+            result['engines'] = compare_engines(
+                problem, args.compare_engines, args.population_size, args.generations, args.time_budget, args.seed,
+                args.greedy_fraction, args.replacement,
+            )
+        report['results'].append(result)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
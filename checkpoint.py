@@ -0,0 +1,112 @@
+"""
+Checkpoints of a Solver run as NumPy .npz files.
+
+A checkpoint holds the population genes, fitness values, generation,
+reset and evaluation counters, the best individual so far, the state of the
+run's random generator and of the Breeder's seed stream, the DiversityManager state,
+the elapsed time and the solver config. Everything is stored as plain arrays (no pickle), so resuming
+from it continues the run exactly where it stopped.
+"""
+import json
+import os
+
+import numpy as np
+
+from timetable import GENE_DTYPE, Timetable
+
+CHECKPOINT_VERSION = 2
+
+
+def _problem_shape(codec):
+    return np.array(
+        [len(codec.years), len(codec.courses), len(codec.teachers), len(codec.classrooms), len(codec.timeslots)],
+        dtype=np.int64,
+    )
+
+
+def _pack_random_state(state):
+    version, internal, gauss_next = state
+    return (
+        np.array([version], dtype=np.int64),
+        np.array(internal, dtype=np.uint32),
+        np.array([np.nan if gauss_next is None else gauss_next]),
+    )
+
+
+def _unpack_random_state(version, internal, gauss_next):
+    gauss_next = float(gauss_next[0])
+    return int(version[0]), tuple(int(x) for x in internal), None if np.isnan(gauss_next) else gauss_next
+
+
+def save_checkpoint(path, codec, state):
+    """
+    Write a checkpoint, atomically (a crash while writing keeps the previous file).
+
+    Parameters:
+    - path: File to write.
+    - codec: TimetableCodec of the problem.
+    - state: Dict with population (Timetables), fitness_values, generation, resets,
+      evaluations, best (Timetable), best_fitness, random_state (of the run's random.Random),
+      breeder_state (getstate() tuples), diversity_state (DiversityManager.get_state()),
+      elapsed and config.
+    """
+    population = state['population']
+    random_version, random_internal, random_gauss = _pack_random_state(state['random_state'])
+    breeder_version, breeder_internal, breeder_gauss = _pack_random_state(state['breeder_state'])
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(
+            f,
+            version=np.array([CHECKPOINT_VERSION], dtype=np.int64),
+            problem_shape=_problem_shape(codec),
+            genes=np.stack([timetable.genes for timetable in population]),
+            year_offsets=population[0].year_offsets,
+            fitness_values=np.array(state['fitness_values'], dtype=np.int64),
+            counters=np.array([state['generation'], state['resets'], state['evaluations']], dtype=np.int64),
+            best_genes=state['best'].genes,
+            best_fitness=np.array([state['best_fitness']], dtype=np.int64),
+            elapsed=np.array([state['elapsed']]),
+            diversity_state=np.array(json.dumps(state['diversity_state'])),
+            random_version=random_version,
+            random_internal=random_internal,
+            random_gauss=random_gauss,
+            breeder_version=breeder_version,
+            breeder_internal=breeder_internal,
+            breeder_gauss=breeder_gauss,
+            config=np.array(json.dumps(state['config'])),
+        )
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, codec):
+    """
+    Read a checkpoint written by save_checkpoint for the same problem.
+
+    Returns:
+    - The state dict passed to save_checkpoint.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        if int(data['version'][0]) != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {int(data['version'][0])}")
+        if not np.array_equal(data['problem_shape'], _problem_shape(codec)):
+            raise ValueError(f"Checkpoint {path} was written for another problem")
+        if data['genes'].dtype != GENE_DTYPE:
+            raise ValueError(f"Checkpoint {path} has an unexpected gene layout")
+
+        year_offsets = data['year_offsets']
+        generation, resets, evaluations = (int(x) for x in data['counters'])
+        return {
+            'population': [Timetable(genes.copy(), year_offsets) for genes in data['genes']],
+            'fitness_values': data['fitness_values'].tolist(),
+            'generation': generation,
+            'resets': resets,
+            'evaluations': evaluations,
+            'best': Timetable(data['best_genes'].copy(), year_offsets),
+            'best_fitness': int(data['best_fitness'][0]),
+            'elapsed': float(data['elapsed'][0]),
+            'diversity_state': json.loads(str(data['diversity_state'])),
+            'random_state': _unpack_random_state(data['random_version'], data['random_internal'], data['random_gauss']),
+            'breeder_state': _unpack_random_state(data['breeder_version'], data['breeder_internal'], data['breeder_gauss']),
+            'config': json.loads(str(data['config'])),
+        }
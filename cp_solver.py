@@ -0,0 +1,164 @@
+"""
+Exact engine: the timetable as a CP-SAT model (OR-Tools, pip install ortools).
+
+One boolean per (year, course, teacher, timeslot) says that the year has a
+lesson of the course with that teacher at that timeslot. The hard
+constraints of fitness_function become constraints of the model:
+
+- every course gets its hours * 60 // COURSE_DURATION_MINUTES lessons,
+- a year and a teacher have at most one lesson per timeslot,
+- no more lessons run at a timeslot than there are classrooms (classrooms
+  have no other attributes, so they are handed out once the model is solved),
+- teachers only teach courses they are qualified for, on days they are available,
+- teachers teach at most teacher_max_hours.
+
+The objective is the gap penalty: the span of every (year, day) from its
+first to its last lesson, minus the lessons, which are a constant. A proven
+optimum is the best fitness of the instance. The model grows with
+years x courses x teachers x timeslots, so this engine is meant for small
+and mid-sized instances.
+"""
+from fitness_batch import COURSE_DURATION_MINUTES
+from profiling import profiled
+
+
+def _cp_model():
+    try:
+        from ortools.sat.python import cp_model
+    except ImportError as error:
+        raise ImportError("The cp engine needs OR-Tools: pip install ortools") from error
+    return cp_model
+
+
+@profiled('solve_cp')
+def solve_cp(problem, codec, time_limit=None, num_workers=0, seed=None, hint=None):
+    """
+    Solve a problem with CP-SAT.
+
+    Parameters:
+    - problem: Problem dict (see Solver).
+    - codec: TimetableCodec of the problem.
+    - time_limit: Seconds, None for no limit. The best timetable found so far is returned when it runs out.
+    - num_workers: Search threads, 0 for one as everywhere else in the solver config. Several
+      workers race each other, so runs are not reproducible even with a seed.
+    - seed: Seed of the search, or None.
+    - hint: Dict individual the search starts from (e.g. a greedy or previous timetable), or None.
+
+    Returns:
+    - The dict individual and whether it is proven optimal.
+    """
+    cp_model = _cp_model()
+    problem_index = codec.problem_index
+    teachers, timeslots = codec.teachers, codec.timeslots
+    year_courses, teacher_max_hours = problem['year_courses'], problem['teacher_max_hours']
+    slot_number = [ts['slot'] for ts in timeslots]
+    model = cp_model.CpModel()
+
+    # ---- Lessons: (year, course, teacher, timeslot) -> bool ----
+    lessons = {}
+    year_slot_lessons = {}
+    teacher_slot_lessons = {}
+    slot_lessons = {}
+    for y, year in enumerate(codec.years):
+        lessons_needed = {}
+        for course in year_courses[year['id']]:
+            c = codec.course_index[course['course_name']]
+            lessons_needed[c] = lessons_needed.get(c, 0) + int(course['hours'] * 60 // COURSE_DURATION_MINUTES)
+        for c, needed in lessons_needed.items():
+            course_lessons = []
+            # Every teacher for a course nobody is qualified for, as in the GA
+            for t in codec.course_teachers[c] or range(len(teachers)):
+                for s in range(len(timeslots)):
+                    if not problem_index.teacher_timeslots[t] >> s & 1:
+                        continue
+                    lesson = model.NewBoolVar(f'lesson_{y}_{c}_{t}_{s}')
+                    lessons[y, c, t, s] = lesson
+                    course_lessons.append(lesson)
+                    year_slot_lessons.setdefault((y, s), []).append(lesson)
+                    teacher_slot_lessons.setdefault((t, s), []).append(lesson)
+                    slot_lessons.setdefault(s, []).append(lesson)
+            if len(course_lessons) < needed:
+                raise ValueError(
+                    f"Not enough available teacher slots for {codec.courses[c]['course_name']} in year {year['name']}"
+                )
+            model.Add(sum(course_lessons) == needed)
+
+    # ---- No overlaps ----
+    for group in teacher_slot_lessons.values():
+        model.AddAtMostOne(group)
+    for s, group in slot_lessons.items():
+        model.Add(sum(group) <= len(codec.classrooms))
+
+    # ---- Workload ----
+    teacher_lessons = {}
+    for (_, _, t, _), lesson in lessons.items():
+        teacher_lessons.setdefault(t, []).append(lesson)
+    for t, group in teacher_lessons.items():
+        max_hours = teacher_max_hours.get(teachers[t]['id'])
+        if max_hours is not None:
+            model.Add(sum(group) <= int(max_hours * 60 // COURSE_DURATION_MINUTES))
+
+    # ---- Gaps: span of every (year, day) with lessons ----
+    spans = []
+    for y in range(len(codec.years)):
+        for day_timeslots in problem_index.day_timeslots:
+            numbers = [slot_number[s] for s in day_timeslots]
+            low, high = min(numbers), max(numbers)
+            first = model.NewIntVar(low, high, f'first_{y}_{day_timeslots[0]}')
+            last = model.NewIntVar(low, high, f'last_{y}_{day_timeslots[0]}')
+            span = model.NewIntVar(0, high - low + 1, f'span_{y}_{day_timeslots[0]}')
+            day_used = []
+            for s in day_timeslots:
+                group = year_slot_lessons.get((y, s))
+                if not group:
+                    continue
+                used = model.NewBoolVar(f'used_{y}_{s}')
+                model.Add(sum(group) == used)  # Also keeps the year to one lesson per timeslot
+                model.Add(first <= slot_number[s]).OnlyEnforceIf(used)
+                model.Add(last >= slot_number[s]).OnlyEnforceIf(used)
+                day_used.append(used)
+            model.Add(span >= last - first + 1)
+            model.Add(span >= sum(day_used))  # Redundant, but proves a timetable without gaps optimal at once
+            spans.append(span)
+    model.Minimize(sum(spans))
+
+    if hint is not None:
+        hinted = set()
+        for year_timetable in hint:
+            for gene in year_timetable:
+                hinted.add((
+                    codec.index_maps['year'][gene['year_id']],
+                    codec.course_index[gene['course']],
+                    problem_index.teacher_index[gene['teacher']],
+                    problem_index.timeslot_index[(gene['timeslot']['day'], gene['timeslot']['slot'])],
+                ))
+        for key, lesson in lessons.items():
+            model.AddHint(lesson, key in hinted)
+
+    solver = cp_model.CpSolver()
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = max(1, num_workers)
+    if seed is not None:
+        solver.parameters.random_seed = seed % 2 ** 31
+    status = solver.Solve(model)
+    if status == cp_model.INFEASIBLE:
+        raise ValueError("No timetable satisfies the hard constraints")
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        raise RuntimeError(f"CP-SAT found no timetable ({solver.StatusName(status)}), raise the time limit")
+
+    # ---- Dict individual, classrooms handed out per timeslot ----
+    classrooms_used = [0] * len(timeslots)
+    individual = [[] for _ in codec.years]
+    for (y, c, t, s), lesson in lessons.items():
+        if not solver.BooleanValue(lesson):
+            continue
+        individual[y].append({
+            'year_id': codec.years[y]['id'],
+            'course': codec.courses[c]['course_name'],
+            'teacher': teachers[t]['id'],
+            'classroom': codec.classrooms[classrooms_used[s]]['id'],
+            'timeslot': timeslots[s],
+        })
+        classrooms_used[s] += 1
+    return individual, status == cp_model.OPTIMAL
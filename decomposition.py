@@ -0,0 +1,58 @@
+"""
+Decomposition of a problem into one subproblem per year (class group).
+
+Year overlaps and gaps only depend on the genes of one year; years are only
+coupled by their shared teachers and classrooms. The decomposition engine of
+the Solver (engine='decomposition') therefore solves every year on its own,
+in parallel, merges the year timetables and reconciles them: repair_timetable
+moves the genes whose teacher or classroom is already taken by another year,
+then tabu search works on the conflicts that are left.
+"""
+import random
+
+from local_search import tabu_search
+from profiling import profiled
+from timetable import repair_timetable
+
+
+def split_problem(problem):
+    """
+    Return one problem dict per year, with only that year and its courses
+    but all the teachers, classrooms and timeslots.
+    """
+    return [
+        dict(problem, years=[year], year_courses={year['id']: problem['year_courses'][year['id']]})
+        for year in problem['years']
+    ]
+
+
+def merge_individuals(individuals):
+    """
+    Join the one-year dict individuals of the subproblems into one dict individual.
+    """
+    return [year_timetable for individual in individuals for year_timetable in individual]
+
+
+@profiled('reconcile')
+def reconcile(timetable, codec, teacher_max_hours, max_iterations=5000, time_budget=None, report=None, rng=random):
+    """
+    Resolve the cross-year teacher and classroom conflicts of a merged Timetable, in place.
+
+    Parameters:
+    - timetable: Timetable built from the year solutions.
+    - codec: TimetableCodec of the whole problem.
+    - teacher_max_hours: Max teaching hours per teacher.
+    - max_iterations: Tabu search steps at most.
+    - time_budget: Seconds of tabu search at most (None for no limit).
+    - report: Counter receiving the violations found and resolved by repair_timetable and the
+      neighbours scored by tabu search (evaluations), or None.
+    - rng: Source of randomness of the tabu search (the random module by default).
+
+    Returns:
+    - The fitness of the reconciled timetable.
+    """
+    repair_timetable(timetable, codec, teacher_max_hours, report=report)
+    return tabu_search(
+        timetable, codec, teacher_max_hours, max_iterations=max_iterations, time_budget=time_budget, rng=rng,
+        report=report,
+    )
@@ -0,0 +1,152 @@
+import numpy as np
+
+from fitness_batch import COURSE_DURATION_MINUTES, GAP_PENALTY, OVERLAP_PENALTY, WORKLOAD_PENALTY
+
+
+class ConflictState:
+    """
+    A Timetable together with the conflict counters behind its fitness.
+
+    Keeps occupancy counts per teacher x timeslot, classroom x timeslot and
+    year x timeslot, the distinct teaching slots of every teacher and the gap
+    size of every (year, day). A move on one gene updates the score in O(1),
+    plus O(slots per day) when the set of used slots of a year changes.
+    The score is always equal to fitness_function on the decoded timetable.
+
+    Building the counters costs more than scoring with batch_fitness, so they
+    are used where one timetable takes many moves in a row: local search, warm
+    starts and hypermutation. GA children are scored with batch_fitness or the
+    FitnessCache; copying a parent's counters and replaying the child's
+    differences is several times slower (benchmark.py --child-scoring).
+    """
+
+    def __init__(self, timetable, codec, teacher_max_hours):
+        self.timetable = timetable
+        self.codec = codec
+
+        index_maps = codec.index_maps
+        self.slot_day = index_maps['slot_day']
+        self.slot_number = index_maps['slot_number']
+        self.day_timeslots = [np.flatnonzero(self.slot_day == day) for day in range(len(index_maps['days']))]
+        self.max_hours = np.array(
+            [teacher_max_hours.get(t['id'], float('inf')) for t in codec.teachers], dtype=np.float64
+        )
+
+        genes = timetable.genes
+        n_slots = len(codec.timeslots)
+        timeslot = genes['timeslot'].astype(np.int64)
+        self.teacher_count = _counts(genes['teacher'], timeslot, len(codec.teachers), n_slots)
+        self.classroom_count = _counts(genes['classroom'], timeslot, len(codec.classrooms), n_slots)
+        self.year_count = _counts(genes['year'], timeslot, len(codec.years), n_slots)
+
+        # Every gene beyond the first one on an occupied (resource, timeslot) pair is an overlap
+        self.overlaps = 3 * len(genes) - int(
+            np.count_nonzero(self.teacher_count)
+            + np.count_nonzero(self.classroom_count)
+            + np.count_nonzero(self.year_count)
+        )
+
+        self.teacher_distinct = np.count_nonzero(self.teacher_count, axis=1)
+        self.overloaded = int(np.count_nonzero(
+            self.teacher_distinct * (COURSE_DURATION_MINUTES / 60) > self.max_hours
+        ))
+
+        self.year_day_gaps = np.array(
+            [[self._gap(year, day) for day in range(len(self.day_timeslots))] for year in range(len(codec.years))],
+            dtype=np.int64,
+        ).reshape(len(codec.years), len(self.day_timeslots))
+        self.gaps = int(self.year_day_gaps.sum())
+
+    @property
+    def score(self):
+        return -(OVERLAP_PENALTY * self.overlaps + GAP_PENALTY * self.gaps + WORKLOAD_PENALTY * self.overloaded)
+
+    def copy(self):
+        """
+        Copy the timetable and its counters, e.g. to keep a survivor while mutating its child.
+        """
+        state = ConflictState.__new__(ConflictState)
+        state.__dict__.update(self.__dict__)
+        state.timetable = self.timetable.copy()
+        state.teacher_count = self.teacher_count.copy()
+        state.classroom_count = self.classroom_count.copy()
+        state.year_count = self.year_count.copy()
+        state.teacher_distinct = self.teacher_distinct.copy()
+        state.year_day_gaps = self.year_day_gaps.copy()
+        return state
+
+    def move(self, index, teacher=None, classroom=None, timeslot=None):
+        """
+        Change the teacher, classroom and/or timeslot of one gene and update the counters.
+
+        Parameters:
+        - index: Position of the gene in the timetable.
+        - teacher, classroom, timeslot: New indexes, None keeps the current value.
+
+        Returns:
+        - The change in fitness caused by the move.
+        """
+        genes = self.timetable.genes
+        before = self.score
+        old_teacher, old_classroom = int(genes['teacher'][index]), int(genes['classroom'][index])
+        year, old_timeslot = int(genes['year'][index]), int(genes['timeslot'][index])
+
+        new_teacher = old_teacher if teacher is None else int(teacher)
+        new_classroom = old_classroom if classroom is None else int(classroom)
+        new_timeslot = old_timeslot if timeslot is None else int(timeslot)
+
+        self._place(old_teacher, old_classroom, year, old_timeslot, -1)
+        genes['teacher'][index] = new_teacher
+        genes['classroom'][index] = new_classroom
+        genes['timeslot'][index] = new_timeslot
+        self._place(new_teacher, new_classroom, year, new_timeslot, 1)
+
+        return self.score - before
+
+    def _place(self, teacher, classroom, year, timeslot, step):
+        """
+        Add (step=1) or remove (step=-1) one gene from the counters.
+        """
+        if self._bump(self.teacher_count, teacher, timeslot, step):
+            hours_before = self.teacher_distinct[teacher] * (COURSE_DURATION_MINUTES / 60)
+            self.teacher_distinct[teacher] += step
+            hours_after = self.teacher_distinct[teacher] * (COURSE_DURATION_MINUTES / 60)
+            max_hours = self.max_hours[teacher]
+            self.overloaded += int(hours_after > max_hours) - int(hours_before > max_hours)
+
+        self._bump(self.classroom_count, classroom, timeslot, step)
+
+        if self._bump(self.year_count, year, timeslot, step):
+            day = self.slot_day[timeslot]
+            gap = self._gap(year, day)
+            self.gaps += gap - int(self.year_day_gaps[year, day])
+            self.year_day_gaps[year, day] = gap
+
+    def _bump(self, counts, resource, timeslot, step):
+        """
+        Update one occupancy count and the overlap total.
+
+        Returns:
+        - True when the (resource, timeslot) pair became free or became used.
+        """
+        count = int(counts[resource, timeslot])
+        counts[resource, timeslot] = count + step
+        if (step > 0 and count > 0) or (step < 0 and count > 1):
+            self.overlaps += step
+            return False
+        return True
+
+    def _gap(self, year, day):
+        """
+        Gap size of one year on one day: span of the used slots minus the number of used slots.
+        """
+        day_timeslots = self.day_timeslots[day]
+        used = self.slot_number[day_timeslots[self.year_count[year, day_timeslots] > 0]]
+        if not len(used):
+            return 0
+        return int(used.max() - used.min() + 1 - len(used))
+
+
+def _counts(resource, timeslot, n_resources, n_slots):
+    keys = resource.astype(np.int64) * n_slots + timeslot
+    return np.bincount(keys, minlength=n_resources * n_slots).reshape(n_resources, n_slots)
@@ -0,0 +1,173 @@
+"""
+Diversity management of a single-population GA run.
+
+Instead of throwing the whole population away when it has converged, the
+Solver passes every generation through a DiversityManager, which:
+- replaces the individuals whose fitness fell to reset_threshold by fresh ones,
+- replaces duplicated timetables (same genes) by hypermutated copies,
+- when the genotype diversity drops below min_diversity, hypermutates the
+  non-elite individuals, and after restart_patience such bursts without a new
+  best fitness, regenerates restart_fraction of them (a partial restart).
+The elite_count best individuals are never touched.
+"""
+import random
+
+import numpy as np
+
+from delta import ConflictState
+from profiling import profiled, section
+from timetable import mutate_timetable, repair_timetable
+
+# Gene fields the operators change, year and course are fixed by the gene position
+DIVERSITY_FIELDS = ('teacher', 'classroom', 'timeslot')
+
+
+def genotype_diversity(population):
+    """
+    Return the mean share of differing genes (teacher, classroom, timeslot)
+    between two individuals of a population of Timetables: 0 when all are equal.
+    """
+    if len(population) < 2:
+        return 0.0
+    genes = np.stack([timetable.genes for timetable in population])
+    columns = np.concatenate([genes[field] for field in DIVERSITY_FIELDS], axis=1)
+    n = len(columns)
+    differing = sum(int(np.count_nonzero(columns[i + 1:] != columns[i])) for i in range(n - 1))
+    return differing / (n * (n - 1) // 2 * columns.shape[1])
+
+
+def duplicate_indexes(population, order, protected=0):
+    """
+    Return the indexes of the individuals whose genes already appear earlier in order.
+    The first protected individuals of order are never returned, even when they are equal.
+    """
+    seen = set()
+    duplicates = []
+    for position, i in enumerate(order):
+        key = population[i].key()
+        if key in seen and position >= protected:
+            duplicates.append(i)
+        else:
+            seen.add(key)
+    return duplicates
+
+
+@profiled('hypermutate')
+def hypermutate(timetable, codec, teacher_max_hours, moves, rng=random):
+    """
+    Return a heavily mutated and repaired copy of a Timetable and its fitness:
+    moves rounds of mutate_timetable that each change one gene per year, drawn from rng.
+    """
+    child = timetable.copy()
+    with section('conflict_state'):
+        state = ConflictState(child, codec, teacher_max_hours)
+    for _ in range(moves):
+        mutate_timetable(child, 1.0, codec, state, rng)
+    repair_timetable(child, codec, teacher_max_hours, state)
+    return child, state.score
+
+
+class DiversityManager:
+    """
+    Keep a population diverse with partial restarts, hypermutation bursts and
+    duplicate elimination, triggered by the measured genotype diversity.
+
+    Parameters:
+    - codec: TimetableCodec of the problem.
+    - teacher_max_hours: Max teaching hours per teacher.
+    - new_population: Callable returning n fresh Timetables.
+    - evaluate: Callable returning the fitness values of a list of Timetables.
+    - min_diversity: genotype_diversity below which the population counts as converged.
+    - elite_count: Best individuals kept unchanged.
+    - restart_fraction: Share of the non-elite individuals regenerated by a partial restart,
+      between 0 and 1. When it rounds to no individual, converged populations keep being hypermutated.
+    - hypermutation_moves: Mutation rounds of a hypermutated individual.
+    - restart_patience: Bursts without a new best fitness before a partial restart.
+    - reset_threshold: Individuals at or below this fitness are replaced by fresh ones.
+    - rng: Source of randomness of the hypermutations (the random module by default).
+    """
+
+    def __init__(self, codec, teacher_max_hours, new_population, evaluate, min_diversity=0.1, elite_count=1,
+                 restart_fraction=0.5, hypermutation_moves=5, restart_patience=5, reset_threshold=None, rng=random):
+        self.codec = codec
+        self.teacher_max_hours = teacher_max_hours
+        self.new_population = new_population
+        self.evaluate = evaluate
+        self.min_diversity = min_diversity
+        self.elite_count = elite_count
+        self.restart_fraction = restart_fraction
+        self.hypermutation_moves = hypermutation_moves
+        self.restart_patience = restart_patience
+        self.reset_threshold = reset_threshold
+        self.rng = rng
+        # Bursts since the best fitness last improved, and that best fitness
+        self.stale_bursts = 0
+        self.best_fitness = None
+
+    def get_state(self):
+        return {'stale_bursts': self.stale_bursts, 'best_fitness': self.best_fitness}
+
+    def set_state(self, state):
+        self.stale_bursts = state['stale_bursts']
+        self.best_fitness = state['best_fitness']
+
+    def _replace_fresh(self, population, fitness_values, indexes):
+        fresh = self.new_population(len(indexes))
+        for i, timetable, fitness in zip(indexes, fresh, self.evaluate(fresh)):
+            population[i], fitness_values[i] = timetable, fitness
+
+    def _hypermutate(self, population, fitness_values, indexes):
+        for i in indexes:
+            population[i], fitness_values[i] = hypermutate(
+                population[i], self.codec, self.teacher_max_hours, self.hypermutation_moves, self.rng
+            )
+
+    @profiled('diversity_step')
+    def step(self, population, fitness_values, best_fitness):
+        """
+        Apply the diversity measures to one generation.
+
+        Parameters:
+        - population: List of Timetables (not modified).
+        - fitness_values: Their fitness values (not modified).
+        - best_fitness: Best fitness found so far in the run.
+
+        Returns:
+        - The new population, its fitness values, the number of individuals
+          evaluated and whether a partial restart took place.
+        """
+        population, fitness_values = list(population), list(fitness_values)
+        order = sorted(range(len(population)), key=fitness_values.__getitem__, reverse=True)
+        others = order[self.elite_count:]
+        evaluations = 0
+
+        if self.reset_threshold is not None:
+            bad = [i for i in others if fitness_values[i] <= self.reset_threshold]
+            if bad:
+                self._replace_fresh(population, fitness_values, bad)
+                evaluations += len(bad)
+
+        duplicates = duplicate_indexes(population, order, self.elite_count)
+        if duplicates:
+            self._hypermutate(population, fitness_values, duplicates)
+            evaluations += len(duplicates)
+
+        with section('diversity_step.measure'):
+            converged = genotype_diversity(population) < self.min_diversity
+        if not converged:
+            return population, fitness_values, evaluations, False
+
+        if self.best_fitness is None or best_fitness > self.best_fitness:
+            self.best_fitness = best_fitness
+            self.stale_bursts = 0
+        restart_count = round(len(others) * self.restart_fraction)
+        if self.stale_bursts >= self.restart_patience and restart_count:
+            # Regenerate the worst of the non-elite individuals
+            restart = others[len(others) - restart_count:]
+            self._replace_fresh(population, fitness_values, restart)
+            self.stale_bursts = 0
+            return population, fitness_values, evaluations + len(restart), True
+
+        self._hypermutate(population, fitness_values, others)
+        self.stale_bursts += 1
+        return population, fitness_values, evaluations + len(others), False
@@ -0,0 +1,164 @@
+import numpy as np
+
+from profiling import profiled
+
+# Constants (must stay in sync with fitness_function in algo.py)
+COURSE_DURATION_MINUTES = 45
+OVERLAP_PENALTY = 10
+GAP_PENALTY = 5
+WORKLOAD_PENALTY = 11
+
+
+def build_index_maps(years, teachers, classrooms, timeslots):
+    """
+    Build the id -> integer index lookups used to encode individuals as arrays.
+
+    Parameters:
+    - years: List of study years.
+    - teachers: List of teachers.
+    - classrooms: List of classrooms.
+    - timeslots: List of timeslots.
+
+    Returns:
+    - A dictionary with the id lookups and the per-timeslot day/slot arrays.
+    """
+    days = []
+    for ts in timeslots:
+        if ts['day'] not in days:
+            days.append(ts['day'])
+
+    return {
+        'year': {year['id']: i for i, year in enumerate(years)},
+        'teacher': {teacher['id']: i for i, teacher in enumerate(teachers)},
+        'classroom': {classroom['id']: i for i, classroom in enumerate(classrooms)},
+        'timeslot': {(ts['day'], ts['slot']): i for i, ts in enumerate(timeslots)},
+        'days': days,
+        'slot_day': np.array([days.index(ts['day']) for ts in timeslots], dtype=np.int64),
+        'slot_number': np.array([ts['slot'] for ts in timeslots], dtype=np.int64),
+    }
+
+
+def encode_population(population, index_maps):
+    """
+    Encode a population of dict individuals as integer arrays.
+
+    Every individual must have the same number of genes, which is always the case
+    for individuals built by generate_population and crossover.
+
+    Parameters:
+    - population: List of individuals (lists of year timetables of gene dicts).
+    - index_maps: Lookups returned by build_index_maps.
+
+    Returns:
+    - A dictionary of (population_size, genes) arrays: 'teacher', 'classroom', 'year', 'timeslot'.
+    """
+    teacher_map = index_maps['teacher']
+    classroom_map = index_maps['classroom']
+    year_map = index_maps['year']
+    timeslot_map = index_maps['timeslot']
+
+    rows = []
+    for individual in population:
+        row = []
+        for year_timetable in individual:
+            for gene in year_timetable:
+                row.append((
+                    teacher_map[gene['teacher']],
+                    classroom_map[gene['classroom']],
+                    year_map[gene['year_id']],
+                    timeslot_map[(gene['timeslot']['day'], gene['timeslot']['slot'])],
+                ))
+        rows.append(row)
+
+    lengths = {len(row) for row in rows}
+    assert len(lengths) <= 1, "All individuals must have the same number of genes."
+
+    genes = np.array(rows, dtype=np.int64).reshape(len(population), -1, 4)
+    return {
+        'teacher': genes[:, :, 0],
+        'classroom': genes[:, :, 1],
+        'year': genes[:, :, 2],
+        'timeslot': genes[:, :, 3],
+    }
+
+
+def _occupancy(resource, slot, n_resources, n_slots):
+    """
+    Count how many genes use each (resource, timeslot) pair, per individual.
+
+    Returns:
+    - An array of shape (population_size, n_resources, n_slots).
+    """
+    n_individuals = resource.shape[0]
+    offsets = np.arange(n_individuals, dtype=np.int64)[:, None] * n_resources
+    keys = ((offsets + resource) * n_slots + slot).ravel()
+    counts = np.bincount(keys, minlength=n_individuals * n_resources * n_slots)
+    return counts.reshape(n_individuals, n_resources, n_slots)
+
+
+@profiled('batch_fitness')
+def batch_fitness(encoded, index_maps, teacher_max_hours):
+    """
+    Evaluate the fitness of a whole encoded population at once.
+
+    Gives the same score as fitness_function: overlap penalties for teachers,
+    classrooms and years, gap penalties per year and day, and a workload penalty
+    for every teacher whose distinct teaching slots exceed teacher_max_hours.
+
+    Parameters:
+    - encoded: Arrays returned by encode_population.
+    - index_maps: Lookups returned by build_index_maps.
+    - teacher_max_hours: Max teaching hours per teacher.
+
+    Returns:
+    - A numpy array with the fitness of every individual.
+    """
+    teacher = encoded['teacher']
+    slot = encoded['timeslot']
+    n_individuals, n_genes = teacher.shape
+    n_slots = len(index_maps['timeslot'])
+
+    teacher_occupancy = _occupancy(teacher, slot, len(index_maps['teacher']), n_slots) > 0
+    classroom_occupancy = _occupancy(encoded['classroom'], slot, len(index_maps['classroom']), n_slots) > 0
+    year_occupancy = _occupancy(encoded['year'], slot, len(index_maps['year']), n_slots) > 0
+
+    # Every gene beyond the first one on an occupied (resource, timeslot) pair is an overlap
+    overlaps = (
+        (n_genes - teacher_occupancy.sum(axis=(1, 2)))
+        + (n_genes - classroom_occupancy.sum(axis=(1, 2)))
+        + (n_genes - year_occupancy.sum(axis=(1, 2)))
+    )
+
+    # Workload only counts the distinct timeslots of each teacher
+    max_hours = np.array(
+        [teacher_max_hours.get(teacher_id, float('inf')) for teacher_id in index_maps['teacher']],
+        dtype=np.float64,
+    )
+    workload = teacher_occupancy.sum(axis=2) * (COURSE_DURATION_MINUTES / 60)
+    overloaded = (workload > max_hours).sum(axis=1)
+
+    # Gaps per (year, day): span of the used slots minus the number of used slots
+    order = np.argsort(index_maps['slot_day'], kind='stable')
+    day_starts = np.flatnonzero(np.diff(index_maps['slot_day'][order], prepend=-1))
+    slot_number = index_maps['slot_number'][order]
+    used = year_occupancy[:, :, order]
+    used_count = np.add.reduceat(used, day_starts, axis=2)
+    first = np.minimum.reduceat(np.where(used, slot_number, np.iinfo(np.int64).max), day_starts, axis=2)
+    last = np.maximum.reduceat(np.where(used, slot_number, np.iinfo(np.int64).min), day_starts, axis=2)
+    gaps = np.where(used_count > 0, last - first + 1 - used_count, 0).sum(axis=(1, 2))
+
+    return -(OVERLAP_PENALTY * overlaps + GAP_PENALTY * gaps + WORKLOAD_PENALTY * overloaded)
+
+
+def population_fitness(population, years, teachers, classrooms, timeslots, teacher_max_hours):
+    """
+    Evaluate the fitness of every individual of a population in one batch.
+
+    Drop-in replacement for calling fitness_function on each individual.
+
+    Returns:
+    - A list with the fitness of every individual.
+    """
+    index_maps = build_index_maps(years, teachers, classrooms, timeslots)
+    encoded = encode_population(population, index_maps)
+    return batch_fitness(encoded, index_maps, teacher_max_hours).tolist()
@@ -0,0 +1,147 @@
+"""
+Memoized fitness of Timetables.
+
+Year-level crossover makes many children exact copies of a parent, of each
+other or of an individual seen a few generations earlier. FitnessCache keeps
+the fitness of recently seen Timetables in a bounded LRU keyed by a hash of
+their genes, and the year-local part of the score (year overlaps and gaps)
+keyed by the timeslots of recently seen year timetables. A child assembled from known years then
+only recomputes the cross-year terms: teacher and classroom overlaps and
+teacher workloads. The score is always equal to batch_fitness.
+"""
+import hashlib
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from fitness_batch import COURSE_DURATION_MINUTES, GAP_PENALTY, OVERLAP_PENALTY, WORKLOAD_PENALTY
+from profiling import profiled
+
+
+def genes_hash(genes):
+    """
+    Return a 16-byte digest of a gene array, equal for equal genes.
+    """
+    return hashlib.blake2b(genes.tobytes(), digest_size=16).digest()
+
+
+def hit_rates(counters):
+    """
+    Return the hits and misses of a counters dict (see FitnessCache.counters) with their hit rates.
+    """
+    lookups = counters['hits'] + counters['misses']
+    year_lookups = counters['year_hits'] + counters['year_misses']
+    return {
+        'hits': counters['hits'],
+        'misses': counters['misses'],
+        'hit_rate': counters['hits'] / lookups if lookups else 0.0,
+        'year_hits': counters['year_hits'],
+        'year_misses': counters['year_misses'],
+        'year_hit_rate': counters['year_hits'] / year_lookups if year_lookups else 0.0,
+    }
+
+
+class FitnessCache:
+    """
+    Bounded LRU of fitness values, with per-year sub-scores.
+
+    Parameters:
+    - codec: TimetableCodec of the problem.
+    - teacher_max_hours: Max teaching hours per teacher.
+    - max_size: Timetables kept (the least recently used one is dropped first).
+    - max_year_size: Year timetables kept (default 4 * max_size).
+    """
+
+    def __init__(self, codec, teacher_max_hours, max_size=4096, max_year_size=None):
+        index_maps = codec.index_maps
+        self.n_teachers = len(codec.teachers)
+        self.n_slots = len(codec.timeslots)
+        self.slot_day = index_maps['slot_day']
+        self.slot_number = index_maps['slot_number']
+        self.n_days = len(index_maps['days'])
+        self.max_hours = np.array(
+            [teacher_max_hours.get(t['id'], float('inf')) for t in codec.teachers], dtype=np.float64
+        )
+        self.max_size = max_size
+        self.max_year_size = 4 * max_size if max_year_size is None else max_year_size
+        self.entries = OrderedDict()
+        self.year_entries = OrderedDict()
+        self.hits = self.misses = 0
+        self.year_hits = self.year_misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @profiled('fitness_cache')
+    def fitness(self, timetable):
+        """
+        Return the fitness of a Timetable, from the cache when it was seen before.
+        """
+        key = genes_hash(timetable.genes)
+        fitness = self.entries.get(key)
+        if fitness is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return fitness
+
+        self.misses += 1
+        penalty = sum(self._year_penalty(timetable.year_genes(i)) for i in range(timetable.num_years))
+        fitness = -(penalty + self._cross_year_penalty(timetable.genes))
+        self.entries[key] = fitness
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return fitness
+
+    def _year_penalty(self, genes):
+        """
+        Overlap and gap penalty of one year timetable. Both only depend on the year's timeslots,
+        so a year whose teachers or classrooms changed is still found in the cache.
+        """
+        key = genes_hash(genes['timeslot'])
+        penalty = self.year_entries.get(key)
+        if penalty is not None:
+            self.year_entries.move_to_end(key)
+            self.year_hits += 1
+            return penalty
+
+        self.year_misses += 1
+        used = np.unique(genes['timeslot'])
+        overlaps = len(genes) - len(used)
+        day = self.slot_day[used]
+        slot = self.slot_number[used]
+        first = np.full(self.n_days, np.iinfo(np.int64).max)
+        last = np.full(self.n_days, np.iinfo(np.int64).min)
+        np.minimum.at(first, day, slot)
+        np.maximum.at(last, day, slot)
+        used_count = np.bincount(day, minlength=self.n_days)
+        gaps = int(np.where(used_count > 0, last - first + 1 - used_count, 0).sum())
+
+        penalty = OVERLAP_PENALTY * overlaps + GAP_PENALTY * gaps
+        self.year_entries[key] = penalty
+        if len(self.year_entries) > self.max_year_size:
+            self.year_entries.popitem(last=False)
+        return penalty
+
+    def _cross_year_penalty(self, genes):
+        """
+        Teacher and classroom overlap and teacher workload penalty of a whole timetable.
+        """
+        timeslot = genes['timeslot'].astype(np.int64)
+        teacher_count = np.bincount(
+            genes['teacher'].astype(np.int64) * self.n_slots + timeslot, minlength=self.n_teachers * self.n_slots
+        ).reshape(self.n_teachers, self.n_slots)
+        classroom_used = int(np.count_nonzero(np.bincount(genes['classroom'].astype(np.int64) * self.n_slots + timeslot)))
+
+        teacher_distinct = np.count_nonzero(teacher_count, axis=1)
+        overlaps = 2 * len(genes) - int(teacher_distinct.sum()) - classroom_used
+        overloaded = int(np.count_nonzero(teacher_distinct * (COURSE_DURATION_MINUTES / 60) > self.max_hours))
+        return OVERLAP_PENALTY * overlaps + WORKLOAD_PENALTY * overloaded
+
+    def counters(self):
+        return Counter(hits=self.hits, misses=self.misses, year_hits=self.year_hits, year_misses=self.year_misses)
+
+    def stats(self):
+        """
+        Return the hits, misses and hit rates of the cache, and its sizes.
+        """
+        return dict(hit_rates(self.counters()), size=len(self.entries), year_size=len(self.year_entries))
@@ -0,0 +1,185 @@
+"""
+Synthetic problem instances in the same dict format as the data of algo.py.
+
+Instances are feasible by construction: a conflict-free, gap-free reference
+timetable is built first and the teachers' qualifications, unavailability
+and max hours are derived from it, so a timetable with fitness 0 always exists.
+
+Every entry of years is a class group. With sections_per_year > 1 each year
+level has several sections (e.g. "Year 1 A", "Year 1 B") that follow the same
+courses and share the teachers and classrooms, as in a district with several
+schools or buildings.
+"""
+import math
+import random
+
+from fitness_batch import COURSE_DURATION_MINUTES
+
+DAYS = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+DAY_START_MINUTES = 8 * 60
+
+
+def generate_instance(num_years=4, num_teachers=5, num_courses=12, courses_per_year=10, courses_per_teacher=5,
+                      unavailability_days=1, num_classrooms=9, num_days=5, slots_per_day=7, density=0.7,
+                      max_hours_slack=1.5, seed=None, return_solution=False, sections_per_year=1, num_buildings=1):
+    """
+    Generate a random problem instance.
+
+    Parameters:
+    - num_years: Number of year levels.
+    - num_teachers: Number of teachers.
+    - num_courses: Size of the course catalogue shared by all years.
+    - courses_per_year: Courses taught to each year.
+    - courses_per_teacher: Courses each teacher is qualified for (more if the reference timetable needs it).
+    - unavailability_days: Days off per teacher (fewer if the teacher teaches on most days).
+    - num_classrooms: Number of classrooms.
+    - num_days, slots_per_day: Shape of the week (num_days * slots_per_day weekly slots).
+    - density: Fraction of the weekly slots each year has lessons in.
+    - max_hours_slack: teacher_max_hours relative to the teacher's hours in the reference timetable.
+    - seed: Seed of the generator.
+    - return_solution: Also return the reference timetable as a dict individual.
+    - sections_per_year: Class groups per year level, with the same courses and hours.
+    - num_buildings: Buildings the classrooms are spread over (the 'building' of each classroom).
+
+    Returns:
+    - A problem dict with years, year_courses, teachers, classrooms, timeslots and
+      teacher_max_hours (and the reference individual if return_solution is set).
+    """
+    if num_days > len(DAYS):
+        raise ValueError(f"At most {len(DAYS)} days per week are supported")
+    rng = random.Random(seed)
+    slot_hours = COURSE_DURATION_MINUTES / 60
+    capacity = min(num_teachers, num_classrooms)  # Lessons that can run in parallel
+
+    # ---- Timeslots ----
+    days = DAYS[:num_days]
+    timeslots = []
+    for day in days:
+        for k in range(slots_per_day):
+            start = DAY_START_MINUTES + k * COURSE_DURATION_MINUTES
+            end = start + COURSE_DURATION_MINUTES
+            timeslots.append({
+                'day': day,
+                'slot': len(timeslots) + 1,
+                'start_time': f"{start // 60:02d}:{start % 60:02d}",
+                'end_time': f"{end // 60:02d}:{end % 60:02d}",
+            })
+
+    # ---- Reference placement: one gap-free block per class group and day ----
+    years = []
+    for level in range(1, num_years + 1):
+        for section in range(sections_per_year):
+            letter = chr(ord('A') + section % 26) * (section // 26 + 1)
+            years.append({
+                'id': len(years) + 1,
+                'name': f"Year {level}" if sections_per_year == 1 else f"Year {level} {letter}",
+                'level': level,
+                'section': letter,
+            })
+    load = [0] * len(timeslots)
+    year_slots = {year['id']: [] for year in years}
+    level_lengths = {}  # Sections of a level get the same number of lessons every day
+    for year in years:
+        lengths = level_lengths.setdefault(year['level'], [])
+        for d in range(num_days):
+            if len(lengths) == d:
+                lengths.append(min(slots_per_day, max(1, round(density * slots_per_day) + rng.choice([-1, 0, 0, 1]))))
+            length = lengths[d]
+            starts = list(range(slots_per_day - length + 1))
+            rng.shuffle(starts)
+            start = min(starts, key=lambda s: max(load[d * slots_per_day + s + k] for k in range(length)))
+            block = [d * slots_per_day + start + k for k in range(length)]
+            if max(load[ts] for ts in block) >= capacity:
+                raise ValueError(
+                    f"{len(years)} class groups at density {density} do not fit with {num_teachers} teachers and {num_classrooms} classrooms"
+                )
+            for ts in block:
+                load[ts] += 1
+            year_slots[year['id']].extend(block)
+
+    # ---- Courses ----
+    courses = [{'id': c + 1, 'course_name': f"Course {c + 1}"} for c in range(num_courses)]
+    year_courses, lessons = {}, []
+    level_courses = {}  # Courses and lesson counts shared by the sections of a level
+    for year in years:
+        slots = year_slots[year['id']]
+        rng.shuffle(slots)
+        if year['level'] not in level_courses:
+            chosen = rng.sample(courses, min(courses_per_year, num_courses, len(slots)))
+            level_courses[year['level']] = chosen, sorted(rng.sample(range(1, len(slots)), len(chosen) - 1))
+        chosen, cuts = level_courses[year['level']]
+        year_courses[year['id']] = []
+        for course, first, last in zip(chosen, [0] + cuts, cuts + [len(slots)]):
+            year_courses[year['id']].append(dict(course, hours=(last - first) * slot_hours))
+            lessons.extend((year['id'], course, ts) for ts in slots[first:last])
+
+    # ---- Teachers and classrooms of the reference timetable ----
+    teacher_slots = [set() for _ in range(num_teachers)]
+    teacher_courses = [set() for _ in range(num_teachers)]
+    classroom_slots = [set() for _ in range(num_classrooms)]
+    solution = {year['id']: [] for year in years}
+    for year_id, course, ts in sorted(lessons, key=lambda lesson: lesson[2]):
+        free = [t for t in range(num_teachers) if ts not in teacher_slots[t]]
+        # Prefer a teacher already teaching the course, then one with room for a new course, then the least loaded
+        teacher = min(free, key=lambda t: (
+            course['id'] not in teacher_courses[t],
+            len(teacher_courses[t]) >= courses_per_teacher,
+            len(teacher_slots[t]),
+            rng.random(),
+        ))
+        classroom = rng.choice([c for c in range(num_classrooms) if ts not in classroom_slots[c]])
+        teacher_slots[teacher].add(ts)
+        teacher_courses[teacher].add(course['id'])
+        classroom_slots[classroom].add(ts)
+        solution[year_id].append((course, teacher, classroom, ts))
+
+    teachers, teacher_max_hours = [], {}
+    mean_hours = len(lessons) * slot_hours / num_teachers
+    for t in range(num_teachers):
+        extra = [c['id'] for c in courses if c['id'] not in teacher_courses[t]]
+        rng.shuffle(extra)
+        qualified = sorted(teacher_courses[t]) + extra[:max(0, courses_per_teacher - len(teacher_courses[t]))]
+        teaching_days = {timeslots[ts]['day'] for ts in teacher_slots[t]}
+        free_days = [day for day in days if day not in teaching_days]
+        teacher_id = 101 + t
+        teachers.append({
+            'id': teacher_id,
+            'name': f"Teacher {t + 1}",
+            'courses': qualified,
+            'state': 'working',
+            'unavailability': rng.sample(free_days, min(unavailability_days, len(free_days))),
+        })
+        hours = max(len(teacher_slots[t]) * slot_hours, mean_hours)
+        teacher_max_hours[teacher_id] = math.ceil(hours * max_hours_slack)
+
+    classrooms = [
+        {'id': 101 + c, 'name': f"Room {c + 1}", 'building': 1 + c * num_buildings // num_classrooms}
+        for c in range(num_classrooms)
+    ]
+
+    problem = {
+        'years': years,
+        'year_courses': year_courses,
+        'teachers': teachers,
+        'classrooms': classrooms,
+        'timeslots': timeslots,
+        'teacher_max_hours': teacher_max_hours,
+    }
+    if not return_solution:
+        return problem
+
+    individual = []
+    for year in years:
+        course_order = {course['id']: i for i, course in enumerate(year_courses[year['id']])}
+        genes = sorted(solution[year['id']], key=lambda gene: (course_order[gene[0]['id']], gene[3]))
+        individual.append([
+            {
+                'year_id': year['id'],
+                'course': course['course_name'],
+                'teacher': teachers[teacher]['id'],
+                'classroom': classrooms[classroom]['id'],
+                'timeslot': timeslots[ts],
+            }
+            for course, teacher, classroom, ts in genes
+        ])
+    return problem, individual
@@ -0,0 +1,187 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from algo import tournament_selection
+from fitness_batch import batch_fitness
+from fitness_cache import FitnessCache
+from parallel import breed_pairs
+from timetable import stack_timetables
+
+TOPOLOGIES = ('ring', 'fully_connected')
+
+# Problem data of a worker process, set once by _init_worker
+_problem = {}
+
+
+def migration_sources(num_islands, topology):
+    """
+    Return, for every island, the islands it receives migrants from.
+    """
+    if topology == 'ring':
+        return [[(i - 1) % num_islands] for i in range(num_islands)]
+    if topology == 'fully_connected':
+        return [[j for j in range(num_islands) if j != i] for i in range(num_islands)]
+    raise ValueError(f"Unknown migration topology {topology!r}, expected one of {TOPOLOGIES}")
+
+
+def evolve_island(population, fitness_values, generations, seed, codec, teacher_max_hours, mutation_rate, tournament_size, stop_threshold,
+                  cache=None):
+    """
+    Run the usual selection, crossover, mutation and repair loop on one island.
+
+    Parameters:
+    - population: List of Timetables of the island.
+    - fitness_values: Fitness of every individual.
+    - generations: Number of generations to run before the next migration.
+    - seed: Seed of this island for this epoch.
+    - cache: FitnessCache scoring the children, or None.
+
+    Returns:
+    - The new population, its fitness values, the number of generations run (fewer
+      when stop_threshold is reached) and the number of children evaluated.
+    """
+    rng = random.Random(seed)
+
+    size = len(population)
+    generations_run = evaluations = 0
+    for _ in range(generations):
+        if max(fitness_values) >= stop_threshold:
+            break
+        parent_pairs = [
+            tournament_selection(population, fitness_values, k=tournament_size, rng=rng) for _ in range((size + 1) // 2)
+        ]
+        seeds = [rng.getrandbits(64) for _ in parent_pairs]
+        # An odd island drops the second child of its last pair, so it keeps its size
+        population, fitness_values = breed_pairs(
+            parent_pairs, seeds, codec, teacher_max_hours, mutation_rate, cache, num_children=size
+        )
+        evaluations += len(fitness_values)
+        generations_run += 1
+
+    return population, fitness_values, generations_run, evaluations
+
+
+def migrate(islands, topology, num_migrants):
+    """
+    Copy the best individuals of every island over the worst ones of its neighbours.
+
+    Parameters:
+    - islands: List of (population, fitness_values), changed in place.
+    - topology: 'ring' or 'fully_connected'.
+    - num_migrants: Number of individuals each island receives.
+    """
+    emigrants = []
+    for population, fitness_values in islands:
+        best = sorted(range(len(population)), key=lambda i: fitness_values[i], reverse=True)[:num_migrants]
+        emigrants.append([(fitness_values[i], population[i]) for i in best])
+
+    for (population, fitness_values), sources in zip(islands, migration_sources(len(islands), topology)):
+        incoming = sorted((m for j in sources for m in emigrants[j]), key=lambda m: m[0], reverse=True)[:num_migrants]
+        worst = sorted(range(len(population)), key=lambda i: fitness_values[i])[:len(incoming)]
+        for i, (fitness, individual) in zip(worst, incoming):
+            population[i], fitness_values[i] = individual, fitness
+
+
+def _init_worker(codec, teacher_max_hours, mutation_rate, tournament_size, stop_threshold, cache_size):
+    _problem.update(
+        codec=codec,
+        teacher_max_hours=teacher_max_hours,
+        mutation_rate=mutation_rate,
+        tournament_size=tournament_size,
+        stop_threshold=stop_threshold,
+        cache=FitnessCache(codec, teacher_max_hours, cache_size) if cache_size > 0 else None,
+    )
+
+
+def _evolve_task(population, fitness_values, generations, seed):
+    return evolve_island(population, fitness_values, generations, seed, **_problem)
+
+
+def run_islands(populations, codec, teacher_max_hours, num_generations, migration_interval=50, num_migrants=1,
+                topology='ring', mutation_rate=0.1, tournament_size=3, stop_threshold=0, num_workers=None, seed=None,
+                time_limit=None, progress=None, fitness_cache_size=4096):
+    """
+    Island-model GA: evolve several populations independently, one process per
+    island, and let the best individuals migrate every migration_interval generations.
+    Migration replaces the full-population reset as the source of diversity.
+
+    Parameters:
+    - populations: One list of Timetables per island.
+    - codec: TimetableCodec of the problem.
+    - teacher_max_hours: Max teaching hours per teacher.
+    - num_generations: Total number of generations per island.
+    - migration_interval: Generations between two migrations.
+    - num_migrants: Individuals received by each island at every migration.
+    - topology: 'ring' or 'fully_connected'.
+    - num_workers: Worker processes (default one per island, 0 runs in this process).
+    - seed: Seed of the run.
+    - time_limit: Seconds after which no new epoch is started (None for no limit).
+    - progress: ProgressReporter receiving all islands as one population after every epoch.
+    - fitness_cache_size: Timetables memoized by the FitnessCache of every process (0 to disable).
+
+    Returns:
+    - The best Timetable found, its fitness, the final (population, fitness_values)
+      of every island, the number of generations run (by the island that ran longest)
+      and the number of fitness evaluations, the initial populations included.
+    """
+    migration_sources(len(populations), topology)  # Validate the topology before starting the workers
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    rng = random.Random(seed)
+    problem = (codec, teacher_max_hours, mutation_rate, tournament_size, stop_threshold)
+    islands = [
+        (list(population), batch_fitness(stack_timetables(population), codec.index_maps, teacher_max_hours).tolist())
+        for population in populations
+    ]
+
+    if num_workers is None:
+        num_workers = len(islands)
+    executor = None
+    if num_workers > 0:
+        executor = ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=problem + (fitness_cache_size,))
+    cache = FitnessCache(codec, teacher_max_hours, fitness_cache_size) if executor is None and fitness_cache_size > 0 else None
+
+    try:
+        generation = 0
+        evaluations = sum(len(population) for population, _ in islands)
+        best_seen = max(max(fitness_values) for _, fitness_values in islands)
+        while generation < num_generations:
+            if max(max(fitness_values) for _, fitness_values in islands) >= stop_threshold:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+            generations = min(migration_interval, num_generations - generation)
+            seeds = [rng.getrandbits(64) for _ in islands]
+            if executor is None:
+                results = [
+                    evolve_island(population, fitness_values, generations, island_seed, *problem, cache)
+                    for (population, fitness_values), island_seed in zip(islands, seeds)
+                ]
+            else:
+                futures = [
+                    executor.submit(_evolve_task, population, fitness_values, generations, island_seed)
+                    for (population, fitness_values), island_seed in zip(islands, seeds)
+                ]
+                results = [future.result() for future in futures]
+            islands = [(population, fitness_values) for population, fitness_values, _, _ in results]
+            # Islands that reached stop_threshold stopped early, count what was actually run
+            generation += max(generations_run for _, _, generations_run, _ in results)
+            evaluations += sum(island_evaluations for _, _, _, island_evaluations in results)
+
+            migrate(islands, topology, num_migrants)
+            if progress is not None:
+                population = [individual for island, _ in islands for individual in island]
+                fitness_values = [fitness for _, island_fitness in islands for fitness in island_fitness]
+                best_seen = max(best_seen, max(fitness_values))
+                progress.report(generation, population, fitness_values, best_seen,
+                                evaluations=evaluations, force=True)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    best_fitness, best_individual = max(
+        ((fitness, individual) for population, fitness_values in islands for individual, fitness in zip(population, fitness_values)),
+        key=lambda pair: pair[0],
+    )
+    return best_individual, best_fitness, islands, generation, evaluations
@@ -0,0 +1,231 @@
+"""
+Local search on a single Timetable, for the memetic stage of the GA.
+
+Both methods walk the move neighbourhood (new teacher, classroom or timeslot
+for one gene) and the swap neighbourhood (exchange the timeslots of two genes
+of the same year), scoring every step with the delta evaluation of a
+ConflictState. Genes involved in an overlap are picked first, since that is
+where the last penalty points usually are.
+
+- tabu_search: best of a sample of neighbours at every step, with recently
+  changed (gene, field) pairs tabu unless they beat the best score.
+- simulated_annealing: one random neighbour per step, worse ones accepted
+  with probability exp(delta / temperature).
+
+Each call stops after max_iterations steps, after time_budget seconds or at
+fitness 0, and leaves the timetable on the best score it found. Every scored
+neighbour counts as one fitness evaluation. With movable, only the given genes
+change (e.g. the lessons affected by an edit of the problem, see warm_start.py).
+"""
+import math
+import random
+import time
+from collections import Counter
+
+import numpy as np
+
+from delta import ConflictState
+from profiling import profiled
+
+LOCAL_SEARCH_METHODS = ('tabu', 'annealing')
+
+# Share of the steps that start from a gene involved in an overlap (when there is one)
+CONFLICT_BIAS = 0.8
+
+
+def conflicting_genes(state):
+    """
+    Return the indexes of the genes sharing their teacher, classroom or year timeslot with another gene.
+    """
+    genes = state.timetable.genes
+    timeslot = genes['timeslot']
+    return np.flatnonzero(
+        (state.teacher_count[genes['teacher'], timeslot] > 1)
+        | (state.classroom_count[genes['classroom'], timeslot] > 1)
+        | (state.year_count[genes['year'], timeslot] > 1)
+    )
+
+
+def random_move(state, codec, rng=random, conflicts=None, movable=None):
+    """
+    Draw a neighbour of the state's timetable.
+
+    Parameters:
+    - conflicts: conflicting_genes of the state, computed when not given.
+    - movable: Sorted array of the indexes of the genes that may change, None for all of them.
+
+    Returns:
+    - A list of (gene index, field, value) changes.
+    """
+    timetable = state.timetable
+    genes = timetable.genes
+    if conflicts is None:
+        conflicts = conflicting_genes(state)
+        if movable is not None:
+            conflicts = np.intersect1d(conflicts, movable, assume_unique=True)
+    if len(conflicts) and rng.random() < CONFLICT_BIAS:
+        index = int(conflicts[rng.randrange(len(conflicts))])
+    elif movable is not None:
+        index = int(movable[rng.randrange(len(movable))])
+    else:
+        index = rng.randrange(len(genes))
+
+    kind = rng.choice(('teacher', 'classroom', 'timeslot', 'swap'))
+    if kind == 'teacher':
+        available_teachers = codec.course_teachers[genes['course'][index]]
+        if available_teachers:
+            return [(index, 'teacher', rng.choice(available_teachers))]
+        kind = 'timeslot'
+    if kind == 'classroom':
+        return [(index, 'classroom', rng.randrange(len(codec.classrooms)))]
+    if kind == 'timeslot':
+        return [(index, 'timeslot', rng.randrange(len(codec.timeslots)))]
+
+    year_index = int(np.searchsorted(timetable.year_offsets, index, side='right')) - 1
+    start, end = timetable.year_offsets[year_index], timetable.year_offsets[year_index + 1]
+    if movable is None:
+        other = rng.randrange(start, end)
+    else:
+        year_movable = movable[np.searchsorted(movable, start):np.searchsorted(movable, end)]
+        other = int(year_movable[rng.randrange(len(year_movable))])
+    return [(index, 'timeslot', int(genes['timeslot'][other])), (other, 'timeslot', int(genes['timeslot'][index]))]
+
+
+def apply_move(state, move):
+    """
+    Apply a move through the state.
+
+    Returns:
+    - The change in fitness and the move that undoes it.
+    """
+    genes = state.timetable.genes
+    undo = [(index, field, int(genes[field][index])) for index, field, _ in reversed(move)]
+    delta = 0
+    for index, field, value in move:
+        delta += state.move(index, **{field: value})
+    return delta, undo
+
+
+def _stopped(iteration, max_iterations, deadline, score):
+    return score >= 0 or iteration >= max_iterations or (deadline is not None and time.perf_counter() >= deadline)
+
+
+@profiled('tabu_search')
+def tabu_search(timetable, codec, teacher_max_hours, max_iterations=200, time_budget=None, neighbours=20, tenure=10,
+                state=None, rng=random, movable=None, report=None):
+    """
+    Improve a Timetable in place with tabu search.
+
+    Parameters:
+    - timetable: Timetable to improve.
+    - codec: TimetableCodec of the problem.
+    - teacher_max_hours: Max teaching hours per teacher.
+    - max_iterations: Steps at most.
+    - time_budget: Seconds at most (None for no limit).
+    - neighbours: Neighbours sampled at every step.
+    - tenure: Steps during which a changed (gene, field) pair stays tabu.
+    - state: ConflictState of the timetable, built when not given.
+    - rng: Source of randomness (the random module by default).
+    - movable: Sorted array of the indexes of the genes that may change, None for all of them.
+    - report: Counter receiving the number of neighbours scored (evaluations), or None.
+
+    Returns:
+    - The fitness of the improved timetable.
+    """
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    if state is None:
+        state = ConflictState(timetable, codec, teacher_max_hours)
+    best_score, best_genes = state.score, timetable.genes.copy()
+    tabu = {}
+
+    iteration = evaluations = 0
+    while not _stopped(iteration, max_iterations, deadline, best_score):
+        iteration += 1
+        chosen, chosen_delta = None, None
+        conflicts = conflicting_genes(state)
+        if movable is not None:
+            conflicts = np.intersect1d(conflicts, movable, assume_unique=True)
+        for _ in range(neighbours):
+            move = random_move(state, codec, rng, conflicts, movable)
+            delta, undo = apply_move(state, move)
+            apply_move(state, undo)
+            evaluations += 1
+            is_tabu = any(tabu.get((index, field), 0) >= iteration for index, field, _ in move)
+            if is_tabu and state.score + delta <= best_score:
+                continue
+            if chosen is None or delta > chosen_delta:
+                chosen, chosen_delta = move, delta
+        if chosen is None:
+            continue
+
+        apply_move(state, chosen)
+        for index, field, _ in chosen:
+            tabu[(index, field)] = iteration + tenure
+        if state.score > best_score:
+            best_score, best_genes = state.score, timetable.genes.copy()
+
+    timetable.genes[...] = best_genes
+    if report is not None:
+        report['evaluations'] += evaluations
+    return best_score
+
+
+@profiled('simulated_annealing')
+def simulated_annealing(timetable, codec, teacher_max_hours, max_iterations=2000, time_budget=None, temperature=10.0,
+                        cooling=0.995, state=None, rng=random, movable=None, report=None):
+    """
+    Improve a Timetable in place with simulated annealing.
+
+    Parameters:
+    - timetable: Timetable to improve.
+    - codec: TimetableCodec of the problem.
+    - teacher_max_hours: Max teaching hours per teacher.
+    - max_iterations: Steps at most.
+    - time_budget: Seconds at most (None for no limit).
+    - temperature: Starting temperature, in fitness points.
+    - cooling: Factor applied to the temperature after every step.
+    - state: ConflictState of the timetable, built when not given.
+    - rng: Source of randomness (the random module by default).
+    - movable: Sorted array of the indexes of the genes that may change, None for all of them.
+    - report: Counter receiving the number of neighbours scored (evaluations), or None.
+
+    Returns:
+    - The fitness of the improved timetable.
+    """
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    if state is None:
+        state = ConflictState(timetable, codec, teacher_max_hours)
+    best_score, best_genes = state.score, timetable.genes.copy()
+
+    iteration = evaluations = 0
+    while not _stopped(iteration, max_iterations, deadline, best_score):
+        iteration += 1
+        evaluations += 1
+        delta, undo = apply_move(state, random_move(state, codec, rng, movable=movable))
+        if delta < 0 and rng.random() >= math.exp(delta / max(temperature, 1e-9)):
+            apply_move(state, undo)
+        elif state.score > best_score:
+            best_score, best_genes = state.score, timetable.genes.copy()
+        temperature *= cooling
+
+    timetable.genes[...] = best_genes
+    if report is not None:
+        report['evaluations'] += evaluations
+    return best_score
+
+
+def local_search(method, timetable, codec, teacher_max_hours, **options):
+    """
+    Improve a Timetable in place with the given method ('tabu' or 'annealing').
+
+    Returns:
+    - The fitness of the improved timetable and the number of neighbours scored.
+    """
+    report = Counter()
+    if method == 'tabu':
+        fitness = tabu_search(timetable, codec, teacher_max_hours, report=report, **options)
+    elif method == 'annealing':
+        fitness = simulated_annealing(timetable, codec, teacher_max_hours, report=report, **options)
+    else:
+        raise ValueError(f"Unknown local search method {method!r}, expected one of {', '.join(LOCAL_SEARCH_METHODS)}")
+    return fitness, report['evaluations']
@@ -0,0 +1,61 @@
+class Occupancy:
+    """
+    Weekly occupancy of teachers, classrooms or years as one integer bitmask per resource.
+
+    Bit i of a resource's mask is set when the resource is busy at the i-th
+    timeslot, so test/set/clear are O(1), counting busy slots is a popcount and
+    free slots common to several resources are a bitwise AND.
+
+    Parameters:
+    - num_slots: Number of timeslots in the week (bits per mask).
+    """
+    __slots__ = ('masks', 'week')
+
+    def __init__(self, num_slots):
+        self.masks = {}
+        self.week = (1 << num_slots) - 1
+
+    def is_busy(self, resource, slot):
+        return bool(self.masks.get(resource, 0) >> slot & 1)
+
+    def occupy(self, resource, slot):
+        """
+        Mark the resource busy at the slot.
+
+        Returns:
+        - True if it was already busy (a conflict), False otherwise.
+        """
+        mask = self.masks.get(resource, 0)
+        self.masks[resource] = mask | (1 << slot)
+        return bool(mask >> slot & 1)
+
+    def release(self, resource, slot):
+        self.masks[resource] = self.masks.get(resource, 0) & ~(1 << slot)
+
+    def busy_count(self, resource):
+        return self.masks.get(resource, 0).bit_count()
+
+    def free(self, *resources):
+        """
+        Return the mask of the slots where all the given resources are free.
+        """
+        busy = 0
+        for resource in resources:
+            busy |= self.masks.get(resource, 0)
+        return self.week & ~busy
+
+    def copy(self):
+        occupancy = Occupancy.__new__(Occupancy)
+        occupancy.masks = dict(self.masks)
+        occupancy.week = self.week
+        return occupancy
+
+
+def iter_slots(mask):
+    """
+    Yield the indexes of the set bits of a mask, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,182 @@
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from fitness_batch import batch_fitness
+from fitness_cache import FitnessCache, hit_rates
+from timetable import REPAIR_KINDS, crossover_timetables, mutate_timetable, repair_timetable, stack_timetables
+
+# Problem data of a worker process, set once by _init_worker
+_problem = {}
+
+
+def breed_pairs(parent_pairs, seeds, codec, teacher_max_hours, mutation_rate, cache=None, report=None, num_children=None):
+    """
+    Produce two children per parent pair with crossover, mutation and repair.
+
+    With a FitnessCache the children are scored by the cache once repaired,
+    otherwise all of them are scored together by batch_fitness. Both give the
+    same fitness values.
+
+    Every pair draws from its own random.Random(seed), so the children do not
+    depend on which process breeds them or in which order, and the random
+    module is left alone.
+
+    Parameters:
+    - parent_pairs: List of (parent1, parent2) Timetables.
+    - seeds: One seed per pair.
+    - codec: TimetableCodec of the problem.
+    - teacher_max_hours: Max teaching hours per teacher.
+    - mutation_rate: Probability of mutating one gene per year.
+    - cache: FitnessCache of the problem, or None.
+    - report: Counter receiving the violations found and resolved by repair_timetable, or None.
+    - num_children: Children to produce (None for two per pair). With an odd number the
+      second child of the last pair is neither mutated, repaired nor scored.
+
+    Returns:
+    - The list of children and the list of their fitness values.
+    """
+    if num_children is None:
+        num_children = 2 * len(parent_pairs)
+    children = []
+    for (parent1, parent2), seed in zip(parent_pairs, seeds):
+        rng = random.Random(seed)
+        for child in crossover_timetables(parent1, parent2, rng)[:num_children - len(children)]:
+            mutate_timetable(child, mutation_rate, codec, rng=rng)
+            repair_timetable(child, codec, teacher_max_hours, report=report)
+            children.append(child)
+    if cache is not None:
+        return children, [cache.fitness(child) for child in children]
+    if not children:
+        return children, []
+    return children, batch_fitness(stack_timetables(children), codec.index_maps, teacher_max_hours).tolist()
+
+
+def cache_counters(cache):
+    """
+    Return the hit and miss counters of a FitnessCache (empty without one).
+    """
+    return Counter() if cache is None else cache.counters()
+
+
+def _init_worker(codec, teacher_max_hours, mutation_rate, cache_size):
+    cache = FitnessCache(codec, teacher_max_hours, cache_size) if cache_size > 0 else None
+    _problem.update(codec=codec, teacher_max_hours=teacher_max_hours, mutation_rate=mutation_rate, cache=cache)
+
+
+def _breed_task(task):
+    parent_pairs, seeds, num_children = task
+    before = cache_counters(_problem['cache'])
+    report = Counter()
+    children, fitness_values = breed_pairs(
+        parent_pairs, seeds, _problem['codec'], _problem['teacher_max_hours'], _problem['mutation_rate'], _problem['cache'], report,
+        num_children,
+    )
+    return children, fitness_values, cache_counters(_problem['cache']) - before, report
+
+
+def _evaluate_task(population):
+    encoded = stack_timetables(population)
+    return batch_fitness(encoded, _problem['codec'].index_maps, _problem['teacher_max_hours']).tolist()
+
+
+def _split(items, parts):
+    size = max(1, -(-len(items) // parts))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class Breeder:
+    """
+    Evaluates populations and produces offspring, either in this process
+    (num_workers=0) or spread over a ProcessPoolExecutor.
+
+    The problem data is sent to each worker once, when the pool starts; every
+    generation only ships the parents' gene arrays and one seed per pair. For a
+    given seed the offspring are the same whatever the number of workers.
+    Children are scored through a FitnessCache of cache_size Timetables per
+    process (0 disables the cache).
+    """
+
+    def __init__(self, codec, teacher_max_hours, mutation_rate, num_workers=0, seed=None, cache_size=4096):
+        self.codec = codec
+        self.teacher_max_hours = teacher_max_hours
+        self.mutation_rate = mutation_rate
+        self.num_workers = num_workers
+        self.rng = random.Random(seed)
+        self.cache = None
+        self.counters = Counter()  # Cache hits and misses of the worker processes
+        self.repairs = Counter()  # Violations found and resolved by repair_timetable, in every process
+        self.executor = None
+        if num_workers > 0:
+            self.executor = ProcessPoolExecutor(
+                max_workers=num_workers,
+                initializer=_init_worker,
+                initargs=(codec, teacher_max_hours, mutation_rate, cache_size),
+            )
+        elif cache_size > 0:
+            self.cache = FitnessCache(codec, teacher_max_hours, cache_size)
+
+    def evaluate(self, population):
+        """
+        Return the fitness of every Timetable of the population.
+        """
+        if self.executor is None:
+            return batch_fitness(stack_timetables(population), self.codec.index_maps, self.teacher_max_hours).tolist()
+
+        fitness_values = []
+        for chunk_fitness in self.executor.map(_evaluate_task, _split(population, self.num_workers)):
+            fitness_values.extend(chunk_fitness)
+        return fitness_values
+
+    def breed(self, parent_pairs, num_children=None):
+        """
+        Return the children of the parent pairs and their fitness values: two per pair,
+        or the first num_children of them (only those are mutated, repaired and scored).
+        """
+        if num_children is None:
+            num_children = 2 * len(parent_pairs)
+        seeds = [self.rng.getrandbits(64) for _ in parent_pairs]
+
+        if self.executor is None:
+            return breed_pairs(
+                parent_pairs, seeds, self.codec, self.teacher_max_hours, self.mutation_rate, self.cache, self.repairs,
+                num_children,
+            )
+
+        children, fitness_values = [], []
+        chunks = _split(parent_pairs, self.num_workers)
+        # Only the last chunk can be short of its second child
+        limits, remaining = [], num_children
+        for chunk in chunks:
+            limits.append(min(2 * len(chunk), remaining))
+            remaining -= limits[-1]
+        tasks = zip(chunks, _split(seeds, self.num_workers), limits)
+        for chunk_children, chunk_fitness, chunk_counters, chunk_repairs in self.executor.map(_breed_task, tasks):
+            children.extend(chunk_children)
+            fitness_values.extend(chunk_fitness)
+            self.counters.update(chunk_counters)
+            self.repairs.update(chunk_repairs)
+        return children, fitness_values
+
+    def cache_stats(self):
+        """
+        Return the hits, misses and hit rates of the fitness caches of all processes.
+        """
+        return hit_rates(self.counters + cache_counters(self.cache))
+
+    def repair_stats(self):
+        """
+        Return the violations found and resolved by repair_timetable, per kind (year, teacher, classroom, gap).
+        """
+        return {kind: {'found': self.repairs[f'{kind}_found'], 'resolved': self.repairs[f'{kind}_resolved']} for kind in REPAIR_KINDS}
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,87 @@
+class ProblemIndex:
+    """
+    Eligibility lookups built once per problem and shared by every GA operator,
+    so that no operator has to rescan the teachers or timeslots lists.
+
+    Teachers, classrooms and timeslots are referred to by their position in the
+    lists given to the constructor.
+
+    - course_teachers: course id -> qualified teachers.
+    - course_ids: course name -> course id. Genes only keep the name, so two courses
+      with the same name and different ids are rejected.
+    - course_name_teachers: course name -> qualified teachers.
+    - course_day_teachers: course id -> qualified teachers available on each day.
+    - teacher_days: bitmask of the days each teacher is available (bit d for days[d]).
+    - day_teachers: bitmask of the teachers available on each day (bit t for teachers[t]).
+    - teacher_timeslots: bitmask of the timeslots each teacher is available at (bit i for timeslots[i]).
+    - day_timeslots: timeslots of each day, ordered by slot.
+    - slot_day / next_slot / previous_slot: day of each timeslot and the next and previous
+      timeslots of the same day (-1 if none).
+    """
+
+    def __init__(self, teachers, year_courses, timeslots, classrooms):
+        self.teachers = teachers
+        self.classrooms = classrooms
+        self.timeslots = timeslots
+
+        self.teacher_index = {teacher['id']: i for i, teacher in enumerate(teachers)}
+        self.classroom_index = {classroom['id']: i for i, classroom in enumerate(classrooms)}
+        self.timeslot_index = {(ts['day'], ts['slot']): i for i, ts in enumerate(timeslots)}
+
+        # ---- Days and timeslots ----
+        self.days = []
+        for ts in timeslots:
+            if ts['day'] not in self.days:
+                self.days.append(ts['day'])
+        day_index = {day: d for d, day in enumerate(self.days)}
+
+        self.slot_day = [day_index[ts['day']] for ts in timeslots]
+        self.day_timeslots = [
+            tuple(sorted((i for i, ts in enumerate(timeslots) if ts['day'] == day), key=lambda i: timeslots[i]['slot']))
+            for day in self.days
+        ]
+        self.next_slot = [-1] * len(timeslots)
+        self.previous_slot = [-1] * len(timeslots)
+        for day_timeslots in self.day_timeslots:
+            for current, following in zip(day_timeslots, day_timeslots[1:]):
+                self.next_slot[current] = following
+                self.previous_slot[following] = current
+
+        # ---- Teachers ----
+        all_days = (1 << len(self.days)) - 1
+        self.teacher_days = []
+        for teacher in teachers:
+            unavailable = sum(1 << day_index[day] for day in set(teacher['unavailability']) if day in day_index)
+            self.teacher_days.append(all_days & ~unavailable)
+        self.day_teachers = [
+            sum(1 << t for t, days in enumerate(self.teacher_days) if days >> d & 1) for d in range(len(self.days))
+        ]
+        self.teacher_timeslots = [
+            sum(1 << i for i, d in enumerate(self.slot_day) if days >> d & 1) for days in self.teacher_days
+        ]
+
+        # ---- Courses ----
+        self.course_ids = {}
+        self.course_teachers = {}
+        self.course_name_teachers = {}
+        self.course_day_teachers = {}
+        for courses in year_courses.values():
+            for course in courses:
+                known = self.course_ids.setdefault(course['course_name'], course['id'])
+                if known != course['id']:
+                    # Genes only keep the course name, so it must identify one course
+                    raise ValueError(f"Course name {course['course_name']!r} is used by courses {known} and {course['id']}")
+                if course['id'] in self.course_teachers:
+                    continue
+                qualified = tuple(i for i, teacher in enumerate(teachers) if course['id'] in teacher['courses'])
+                self.course_teachers[course['id']] = qualified
+                self.course_name_teachers[course['course_name']] = qualified
+                self.course_day_teachers[course['id']] = [
+                    tuple(t for t in qualified if self.teacher_days[t] >> d & 1) for d in range(len(self.days))
+                ]
+
+    def is_available(self, teacher, timeslot):
+        """
+        Return True if the teacher (index) can teach on the day of the timeslot (index).
+        """
+        return bool(self.teacher_days[teacher] >> self.slot_day[timeslot] & 1)
@@ -0,0 +1,181 @@
+"""
+Opt-in timing of the GA operators.
+
+Operators are decorated with @profiled and their inner phases wrapped in
+section(). Both check the active Profiler first, so when none is running a
+call costs one global lookup and a branch. Profile a run with:
+
+    with Profiler(track_allocations=True) as profiler:
+        solver.solve(config)
+    print(profiler.summary())
+
+Only the current process is measured: run with num_workers=0 to include the
+operators that the Breeder would otherwise ship to worker processes.
+"""
+import contextlib
+import functools
+import json
+import time
+import tracemalloc
+
+# Profiler receiving the measurements, None when profiling is off
+_active = None
+
+_NULL_SECTION = contextlib.nullcontext()
+
+
+class Profiler:
+    """
+    Cumulative wall time, call count and (optionally) net allocated bytes per
+    operator, for the whole run and for every generation.
+
+    Parameters:
+    - track_allocations: Also measure memory with tracemalloc (slows the run down noticeably).
+    - per_generation: Keep the totals of every generation (see end_generation).
+    """
+
+    def __init__(self, track_allocations=False, per_generation=True):
+        self.track_allocations = track_allocations
+        self.per_generation = per_generation
+        self.totals = {}
+        self.generations = []
+        self._generation = {}
+        self._previous = None
+        self._started_tracemalloc = False
+        self.elapsed = 0.0
+        self._start = None
+
+    def start(self):
+        global _active
+        if _active is not None:
+            raise RuntimeError("A profiler is already running")
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._start = time.perf_counter()
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        _active = None
+        self.elapsed += time.perf_counter() - self._start
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def measure(self):
+        """
+        Return the (time, allocated bytes) reading taken around a measured call.
+        """
+        allocated = tracemalloc.get_traced_memory()[0] if self.track_allocations else 0
+        return time.perf_counter(), allocated
+
+    def record(self, name, before):
+        """
+        Add the time and memory spent since the reading before to the operator name.
+        """
+        now, allocated = self.measure()
+        for totals in (self.totals, self._generation):
+            entry = totals.get(name)
+            if entry is None:
+                entry = totals[name] = {'calls': 0, 'seconds': 0.0, 'allocated_bytes': 0}
+            entry['calls'] += 1
+            entry['seconds'] += now - before[0]
+            entry['allocated_bytes'] += allocated - before[1]
+
+    def end_generation(self, generation):
+        """
+        Close the totals of one generation.
+        """
+        if self.per_generation:
+            self.generations.append({'generation': generation, 'operators': self._generation})
+        self._generation = {}
+
+    def dump(self):
+        """
+        Return the measurements as a JSON-serialisable dict.
+        """
+        return {
+            'elapsed': self.elapsed,
+            'track_allocations': self.track_allocations,
+            'operators': self.totals,
+            'generations': self.generations,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.dump(), f, indent=2)
+
+    def summary(self):
+        """
+        Return a table of the operators, slowest first.
+        """
+        lines = [f"{'operator':<34}{'calls':>10}{'total s':>11}{'per call ms':>13}{'share':>8}"]
+        if self.track_allocations:
+            lines[0] += f"{'alloc KiB':>12}"
+        for name, entry in sorted(self.totals.items(), key=lambda item: item[1]['seconds'], reverse=True):
+            share = entry['seconds'] / self.elapsed if self.elapsed else 0
+            line = (f"{name:<34}{entry['calls']:>10}{entry['seconds']:>11.3f}"
+                    f"{1000 * entry['seconds'] / entry['calls']:>13.3f}{share:>8.1%}")
+            if self.track_allocations:
+                line += f"{entry['allocated_bytes'] / 1024:>12.1f}"
+            lines.append(line)
+        lines.append(f"Total run time: {self.elapsed:.3f}s (operators overlap when one calls another)")
+        return '\n'.join(lines)
+
+
+def profiled(name):
+    """
+    Decorator timing every call of a function under name while a Profiler is running.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return function(*args, **kwargs)
+            before = profiler.measure()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(name, before)
+        return wrapper
+    return decorator
+
+
+class _Section:
+    __slots__ = ('profiler', 'name', 'before')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.before = self.profiler.measure()
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.before)
+
+
+def section(name):
+    """
+    Context manager timing a block under name while a Profiler is running.
+    """
+    if _active is None:
+        return _NULL_SECTION
+    return _Section(_active, name)
+
+
+def end_generation(generation):
+    """
+    Close the per-generation totals of the running Profiler, if any.
+    """
+    if _active is not None:
+        _active.end_generation(generation)
@@ -0,0 +1,134 @@
+"""
+Per-generation progress of a GA run.
+
+The Solver hands every generation to a ProgressReporter, which only builds
+the statistics when a sample is due and passes them to its callbacks. With
+no callbacks (silent mode) report() returns straight away, so the hot loop
+does no formatting or I/O.
+
+A statistics dict has the keys generation, best, mean, worst, best_so_far,
+diversity (share of distinct individuals in the population), resets,
+evaluations, elapsed and evaluations_per_s.
+"""
+import json
+import sys
+import time
+
+
+def diversity(population):
+    """
+    Return the share of distinct individuals in a population of Timetables.
+    """
+    if not population:
+        return 0.0
+    return len({individual.key() for individual in population}) / len(population)
+
+
+def generation_stats(generation, population, fitness_values, best_so_far, resets, evaluations, elapsed):
+    """
+    Summarise one generation as a statistics dict.
+    """
+    return {
+        'generation': generation,
+        'best': max(fitness_values),
+        'mean': sum(fitness_values) / len(fitness_values),
+        'worst': min(fitness_values),
+        'best_so_far': best_so_far,
+        'diversity': diversity(population),
+        'resets': resets,
+        'evaluations': evaluations,
+        'elapsed': elapsed,
+        'evaluations_per_s': evaluations / elapsed if elapsed else None,
+    }
+
+
+class ProgressReporter:
+    """
+    Sample the generations of a run and pass their statistics to callbacks.
+
+    Parameters:
+    - callbacks: Callables taking a statistics dict (empty for a silent run).
+    - interval: Report every interval-th generation.
+    - min_seconds: Also skip samples less than min_seconds after the previous one.
+    """
+
+    def __init__(self, callbacks=(), interval=1, min_seconds=0):
+        self.callbacks = list(callbacks)
+        self.interval = max(1, interval)
+        self.min_seconds = min_seconds
+        self.start = time.perf_counter()
+        self.last_report = None
+
+    @property
+    def silent(self):
+        return not self.callbacks
+
+    def restart(self):
+        self.start = time.perf_counter()
+        self.last_report = None
+
+    def report(self, generation, population, fitness_values, best_so_far, resets=0, evaluations=0, force=False):
+        """
+        Report a generation if a sample is due (or force is set).
+
+        Returns:
+        - The statistics dict, or None when nothing was reported.
+        """
+        if not self.callbacks:
+            return None
+        if not force and generation % self.interval:
+            return None
+        now = time.perf_counter()
+        if not force and self.last_report is not None and now - self.last_report < self.min_seconds:
+            return None
+        self.last_report = now
+
+        stats = generation_stats(generation, population, fitness_values, best_so_far, resets, evaluations, now - self.start)
+        for callback in self.callbacks:
+            callback(stats)
+        return stats
+
+
+class PrintSink:
+    """
+    Write one line per report to a text stream (stdout by default).
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def __call__(self, stats):
+        stream = self.stream or sys.stdout
+        stream.write(
+            f"Generation {stats['generation']}: best {stats['best']} (so far {stats['best_so_far']}), "
+            f"mean {stats['mean']:.1f}, worst {stats['worst']}, diversity {stats['diversity']:.2f}, "
+            f"{stats['elapsed']:.1f}s\n"
+        )
+
+
+class JsonLinesSink:
+    """
+    Append every report as one JSON line to a file, for plotting or comparing runs.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'a')
+
+    def __call__(self, stats):
+        self.file.write(json.dumps(stats) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class MemorySink:
+    """
+    Keep every report in a list.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, stats):
+        self.records.append(stats)
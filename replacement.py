@@ -0,0 +1,46 @@
+"""
+Survivor selection of the single-population GA.
+
+The survivors keep their fitness values, so only the children of a generation
+are evaluated. Two modes:
+- generational: the children replace the population, except the elitism best
+  individuals which are carried over unchanged,
+- steady_state: a few children per generation replace the worst individuals.
+"""
+
+REPLACEMENT_MODES = ('generational', 'steady_state')
+
+
+def children_needed(population_size, replacement, elitism=0, steady_state_size=2):
+    """
+    Return the number of children one generation needs.
+    """
+    if replacement == 'generational':
+        return max(0, population_size - elitism)
+    if replacement == 'steady_state':
+        return min(steady_state_size, population_size)
+    raise ValueError(f"Unknown replacement mode {replacement!r}, expected one of {', '.join(REPLACEMENT_MODES)}")
+
+
+def generational_replacement(population, fitness_values, children, child_fitness, elitism=0):
+    """
+    Return the next population and its fitness values: the elitism best
+    individuals of population followed by the children.
+    """
+    elite = sorted(range(len(population)), key=fitness_values.__getitem__, reverse=True)[:elitism]
+    return (
+        [population[i] for i in elite] + list(children),
+        [fitness_values[i] for i in elite] + list(child_fitness),
+    )
+
+
+def steady_state_replacement(population, fitness_values, children, child_fitness):
+    """
+    Return the next population and its fitness values: every child replaces
+    the worst individual of the population (the best ones are never replaced).
+    """
+    worst = sorted(range(len(population)), key=fitness_values.__getitem__)[:len(children)]
+    population, fitness_values = list(population), list(fitness_values)
+    for i, child, fitness in zip(worst, children, child_fitness):
+        population[i], fitness_values[i] = child, fitness
+    return population, fitness_values
@@ -0,0 +1,218 @@
+"""
+Constructive initialisation of the population.
+
+Lessons are placed one at a time like the vertices of a graph colouring
+(DSatur): the lesson group with the fewest feasible timeslots left goes
+first, ties broken by the number of qualified teachers. A timeslot is
+feasible when the year, a qualified teacher (available that day and under
+their max hours) and a classroom are all free. Each year's lessons are kept
+in compact blocks per day, so the individuals start with few gaps and
+usually no hard conflicts. When a lesson has no feasible timeslot left the
+constraints are relaxed step by step instead of giving up.
+"""
+import heapq
+import random
+
+from algo import COURSE_DURATION_MINUTES, generate_population
+from occupancy import iter_slots
+from problem_index import ProblemIndex
+
+SLOT_HOURS = COURSE_DURATION_MINUTES / 60
+
+
+def greedy_individual(years, year_courses, teachers, classrooms, timeslots, teacher_max_hours, problem_index=None, rng=random):
+    """
+    Build one individual with the DSatur heuristic. Ties are broken at random,
+    so successive calls give different individuals.
+
+    Parameters:
+    - years, year_courses, teachers, classrooms, timeslots, teacher_max_hours: The problem.
+    - problem_index: ProblemIndex of the problem (built if not given).
+    - rng: Source of randomness (the random module by default).
+
+    Returns:
+    - A dict individual, in the format of generate_population.
+    """
+    if problem_index is None:
+        problem_index = ProblemIndex(teachers, year_courses, timeslots, classrooms)
+    week = (1 << len(timeslots)) - 1
+    teacher_timeslots = problem_index.teacher_timeslots
+    slot_day = problem_index.slot_day
+    next_slot = problem_index.next_slot
+    previous_slot = problem_index.previous_slot
+    day_masks = [sum(1 << ts for ts in day_timeslots) for day_timeslots in problem_index.day_timeslots]
+    # fitness_function penalises a teacher once busy slots * 0.75 > max hours
+    capacity = [int(teacher_max_hours[teacher['id']] / SLOT_HOURS + 1e-9) for teacher in teachers]
+
+    year_busy = [0] * len(years)
+    teacher_busy = [0] * len(teachers)
+    teacher_load = [0] * len(teachers)
+    free_rooms = [list(range(len(classrooms))) for _ in timeslots]
+    rooms_full = 0
+
+    # One group per (year, course): its lessons are interchangeable
+    groups = []  # [year index, course order, course, qualified teachers, lessons left]
+    year_groups = [[] for _ in years]
+    course_groups = {}
+    teacher_courses = [[] for _ in teachers]
+    for y, year in enumerate(years):
+        for order, course in enumerate(year_courses[year['id']]):
+            lessons = int(course['hours'] * 60 // COURSE_DURATION_MINUTES)
+            if not lessons:
+                continue
+            qualified = problem_index.course_teachers[course['id']]
+            if course['id'] not in course_groups:
+                course_groups[course['id']] = []
+                for t in qualified:
+                    teacher_courses[t].append(course['id'])
+            year_groups[y].append(len(groups))
+            course_groups[course['id']].append(len(groups))
+            groups.append([y, order, course, qualified, lessons])
+
+    # Qualified teachers that can still take each course at each timeslot, and the
+    # timeslots where at least one can (kept up to date as teachers get busy)
+    course_free = {course_id: [0] * len(timeslots) for course_id in course_groups}
+    course_masks = dict.fromkeys(course_groups, 0)
+    for t in range(len(teachers)):
+        if teacher_load[t] < capacity[t]:
+            for ts in iter_slots(teacher_timeslots[t]):
+                for course_id in teacher_courses[t]:
+                    course_free[course_id][ts] += 1
+                    course_masks[course_id] |= 1 << ts
+
+    def feasible_slots(group):
+        return course_masks[group[2]['id']] & ~year_busy[group[0]] & ~rooms_full & week
+
+    def priority(g):
+        group = groups[g]
+        return (feasible_slots(group).bit_count(), len(group[3]), -group[4], rng.random())
+
+    def best_slot(y, mask):
+        # Extend an existing block of the year, else open a new day, else accept a gap
+        best, best_score = [], -1
+        for ts in iter_slots(mask):
+            before, after = previous_slot[ts], next_slot[ts]
+            if (before != -1 and year_busy[y] >> before & 1) or (after != -1 and year_busy[y] >> after & 1):
+                score = 2
+            elif not year_busy[y] & day_masks[slot_day[ts]]:
+                score = 1
+            else:
+                score = 0
+            if score > best_score:
+                best, best_score = [ts], score
+            elif score == best_score:
+                best.append(ts)
+        return rng.choice(best)
+
+    def best_teacher(qualified, ts):
+        candidates = qualified or range(len(teachers))
+        return min(candidates, key=lambda t: (
+            bool(teacher_busy[t] >> ts & 1),
+            not teacher_timeslots[t] >> ts & 1,
+            teacher_load[t] >= capacity[t],
+            teacher_load[t],
+            rng.random(),
+        ))
+
+    version = [0] * len(groups)
+    heap = [(priority(g), 0, g) for g in range(len(groups))]
+    heapq.heapify(heap)
+    genes = [[] for _ in years]
+
+    while heap:
+        _, group_version, g = heapq.heappop(heap)
+        if group_version != version[g]:
+            continue  # Stale entry, the group was pushed again with its new priority
+        y, order, course, qualified, _ = groups[g]
+
+        mask = feasible_slots(groups[g])
+        if not mask:
+            # No conflict-free timeslot left: relax max hours, then classrooms, then teachers, then the year
+            year_free = week & ~year_busy[y]
+            teacher_free = 0
+            for t in qualified:
+                teacher_free |= teacher_timeslots[t] & ~teacher_busy[t]
+            for relaxed in (teacher_free & year_free & ~rooms_full, teacher_free & year_free, year_free, week):
+                if relaxed:
+                    mask = relaxed
+                    break
+        ts = best_slot(y, mask)
+        teacher = best_teacher(qualified, ts)
+
+        rooms = free_rooms[ts]
+        filled = False
+        if rooms:
+            i = rng.randrange(len(rooms))
+            rooms[i], rooms[-1] = rooms[-1], rooms[i]
+            classroom = rooms.pop()
+            if not rooms:
+                rooms_full |= 1 << ts
+                filled = True
+        else:
+            classroom = rng.randrange(len(classrooms))
+
+        year_busy[y] |= 1 << ts
+        lost = 0  # Timeslots the teacher can no longer take
+        if not teacher_busy[teacher] >> ts & 1 and teacher_load[teacher] < capacity[teacher]:
+            lost = teacher_timeslots[teacher] >> ts & 1 and 1 << ts
+            if teacher_load[teacher] + 1 >= capacity[teacher]:
+                lost = teacher_timeslots[teacher] & ~teacher_busy[teacher]
+        if not teacher_busy[teacher] >> ts & 1:
+            teacher_busy[teacher] |= 1 << ts
+            teacher_load[teacher] += 1
+        genes[y].append((order, ts, {
+            'year_id': years[y]['id'],
+            'course': course['course_name'],
+            'teacher': teachers[teacher]['id'],
+            'classroom': classrooms[classroom]['id'],
+            'timeslot': timeslots[ts],
+        }))
+        groups[g][4] -= 1
+
+        # Only the groups of the year, and of the teacher's courses that lost a timeslot, change priority
+        # (all of them if the rooms ran out)
+        dirty = set(year_groups[y])
+        for course_id in teacher_courses[teacher]:
+            free = course_free[course_id]
+            for lost_ts in iter_slots(lost):
+                free[lost_ts] -= 1
+                if not free[lost_ts]:
+                    course_masks[course_id] &= ~(1 << lost_ts)
+                    dirty.update(course_groups[course_id])
+        if filled:
+            dirty = range(len(groups))
+        for d in dirty:
+            if groups[d][4] > 0:
+                version[d] += 1
+                heapq.heappush(heap, (priority(d), version[d], d))
+
+    return [[gene for _, _, gene in sorted(year_genes, key=lambda item: item[:2])] for year_genes in genes]
+
+
+def seed_population(population_size, years, year_courses, teachers, classrooms, timeslots, teacher_max_hours,
+                    greedy_fraction=0.5, problem_index=None, rng=random):
+    """
+    Generate a population mixing greedy individuals with random ones (for diversity).
+
+    Parameters:
+    - population_size: Number of individuals.
+    - greedy_fraction: Share of the individuals built by greedy_individual, the rest
+      come from generate_population (or greedy_individual when the random construction fails).
+    - rng: Source of randomness (the random module by default).
+
+    Returns:
+    - A list of dict individuals.
+    """
+    if problem_index is None:
+        problem_index = ProblemIndex(teachers, year_courses, timeslots, classrooms)
+    problem = (years, year_courses, teachers, classrooms, timeslots, teacher_max_hours)
+
+    num_greedy = round(population_size * greedy_fraction)
+    population = [greedy_individual(*problem, problem_index, rng) for _ in range(num_greedy)]
+    while len(population) < population_size:
+        try:
+            population.extend(generate_population(1, *problem, problem_index, rng))
+        except Exception:
+            # The random construction gives up on tight instances
+            population.append(greedy_individual(*problem, problem_index, rng))
+    return population
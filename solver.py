@@ -0,0 +1,472 @@
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from algo import (
+    MUTATION_RATE,
+    NUM_GENERATIONS,
+    NUM_WORKERS,
+    POPULATION_SIZE,
+    STOP_THRESHOLD,
+    TOURNAMENT_SIZE,
+    tournament_selection,
+)
+from checkpoint import load_checkpoint, save_checkpoint
+from cp_solver import solve_cp
+from decomposition import merge_individuals, reconcile, split_problem
+from delta import ConflictState
+from diversity import DiversityManager
+from fitness_batch import batch_fitness
+from islands import run_islands
+from local_search import LOCAL_SEARCH_METHODS, local_search, tabu_search
+from parallel import Breeder
+from profiling import end_generation
+from progress import ProgressReporter
+from replacement import children_needed, generational_replacement, steady_state_replacement
+from seeding import greedy_individual, seed_population
+from timetable import REPAIR_KINDS, TimetableCodec, stack_timetables
+from warm_start import adapt_individual, place_genes, related_genes, restore_genes
+
+ENGINES = ('ga', 'decomposition', 'cp')
+
+PROBLEM_KEYS = ('years', 'year_courses', 'teachers', 'classrooms', 'timeslots', 'teacher_max_hours')
+
+DEFAULT_CONFIG = {
+    # 'ga', 'decomposition' to solve every year on its own, then reconcile (see decomposition.py),
+    # or 'cp' for the exact CP-SAT model of cp_solver.py (needs OR-Tools, uses time_limit, num_workers and seed)
+    'engine': 'ga',
+    'population_size': POPULATION_SIZE,
+    'mutation_rate': MUTATION_RATE,
+    'num_generations': NUM_GENERATIONS,
+    'tournament_size': TOURNAMENT_SIZE,
+    # Survivor selection (single population only, see replacement.py)
+    'replacement': 'generational',  # or 'steady_state'
+    # Best individuals carried over unchanged by a generational replacement, and left alone
+    # by the diversity management in both replacement modes
+    'elitism': 1,
+    'steady_state_size': 2,  # Children replacing the worst individuals every steady-state generation
+    # Memetic stage (single population only, see local_search.py)
+    'local_search': None,  # 'tabu' or 'annealing' to improve the best children of every generation
+    'local_search_top_k': 2,
+    'local_search_iterations': 200,  # Steps per call
+    'local_search_time': 0.05,  # Seconds per call, None for no limit (runs are only reproducible without one)
+    # Individuals at or below this fitness are replaced by fresh ones (see diversity.py). It is absolute,
+    # so it depends on the size of the problem: None disables it
+    'reset_threshold': None,
+    'stop_threshold': STOP_THRESHOLD,
+    'time_limit': None,  # Seconds, None for no limit
+    'num_workers': NUM_WORKERS,
+    'fitness_cache_size': 4096,  # Timetables whose fitness is memoized per process (see fitness_cache.py), 0 to disable
+    'seed': None,
+    'greedy_fraction': 0.5,  # Share of each new population built by the DSatur heuristic (see seeding.py)
+    # Diversity management (single population only, see diversity.py)
+    'min_diversity': 0.1,  # Genotype diversity below which the population counts as converged
+    'restart_fraction': 0.5,  # Share of the non-elite individuals regenerated by a partial restart
+    'hypermutation_moves': 5,
+    'restart_patience': 5,  # Hypermutation bursts without a new best before a partial restart
+    # Island model (used when num_islands > 1)
+    'num_islands': 1,
+    'migration_interval': 50,
+    'num_migrants': 1,
+    'topology': 'ring',
+    # Checkpoints (single population only)
+    'checkpoint_path': None,
+    'checkpoint_interval': 100,  # Generations between two checkpoints
+    # Tabu search resolving the cross-year conflicts of the decomposition engine,
+    # and the lessons affected by an edit of the problem in reoptimize (per stage)
+    'reconcile_iterations': 5000,
+    'reconcile_time': None,  # Seconds, None for no limit
+}
+
+
+def make_config(config=None):
+    """
+    Complete a (partial) solver config with the defaults.
+    """
+    config = config or {}
+    unknown = set(config) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown solver settings: {', '.join(sorted(unknown))}")
+    config = dict(DEFAULT_CONFIG, **config)
+    if not 0 <= config['restart_fraction'] <= 1:
+        raise ValueError(f"restart_fraction must be between 0 and 1, got {config['restart_fraction']}")
+    return config
+
+
+class Solver:
+    """
+    GA solver for one problem.
+
+    The problem is a dict with the years, year_courses, teachers, classrooms,
+    timeslots and teacher_max_hours of algo.py. Every entry of years is one
+    class group, so parallel sections of a year level are separate entries
+    sharing the teachers and classrooms (see instances.generate_instance). The codec and ProblemIndex are
+    built once in the constructor, so a long-lived process can keep the Solver
+    and call solve() many times.
+    """
+
+    def __init__(self, problem):
+        missing = [key for key in PROBLEM_KEYS if key not in problem]
+        if missing:
+            raise ValueError(f"Problem is missing {', '.join(missing)}")
+        self.problem = problem
+        self.codec = TimetableCodec(
+            problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'], problem['timeslots']
+        )
+        self.problem_index = self.codec.problem_index
+
+    def new_population(self, population_size, greedy_fraction=0.0, rng=random):
+        """
+        Generate a population of Timetables, greedy_fraction of them with the DSatur
+        heuristic and the others at random, drawing from rng (the random module by default).
+        """
+        problem = self.problem
+        return self.codec.encode_population(seed_population(
+            population_size, problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'],
+            problem['timeslots'], problem['teacher_max_hours'], greedy_fraction, self.problem_index, rng
+        ))
+
+    def solve(self, config=None, progress=None):
+        """
+        Run the GA, or the decomposition engine when config['engine'] is 'decomposition'.
+
+        Parameters:
+        - config: Settings overriding DEFAULT_CONFIG. The run draws from its own random.Random(seed),
+          the random module is left alone.
+        - progress: ProgressReporter receiving the generations (None for a silent run).
+
+        Returns:
+        - A dict with the best individual (dict form), its Timetable, its fitness, the number
+          of generations, the number of partial restarts, the number of fitness evaluations,
+          the fitness cache (None for the island model and the decomposition engine) and repair
+          statistics (None for the island model) and the elapsed time.
+        """
+        config = make_config(config)
+        progress = progress or ProgressReporter()
+        if config['engine'] not in ENGINES:
+            raise ValueError(f"Unknown engine {config['engine']!r}, expected one of {', '.join(ENGINES)}")
+        if config['engine'] != 'ga':
+            if config['checkpoint_path'] is not None:
+                raise ValueError(f"Checkpoints are not supported with the {config['engine']} engine")
+            progress.restart()
+            if config['engine'] == 'cp':
+                return self._solve_cp(config, time.perf_counter(), progress)
+            return self._solve_decomposed(config, time.perf_counter(), progress)
+        if config['num_islands'] > 1:
+            if config['checkpoint_path'] is not None:
+                raise ValueError("Checkpoints are not supported with the island model")
+            progress.restart()
+            return self._solve_islands(config, time.perf_counter(), progress)
+        return self._run(config, progress)
+
+    def resume(self, path, config=None, progress=None):
+        """
+        Continue a run from a checkpoint written by solve.
+
+        With the same settings the run carries on exactly as if it had not been
+        interrupted. It keeps checkpointing to the same file unless config says otherwise.
+
+        Parameters:
+        - path: Checkpoint file.
+        - config: Settings overriding the checkpointed ones (e.g. a larger num_generations).
+        - progress: ProgressReporter receiving the generations (None for a silent run).
+        """
+        checkpoint = load_checkpoint(path, self.codec)
+        merged = dict(checkpoint['config'])
+        merged['checkpoint_path'] = path
+        merged.update(config or {})
+        config = make_config(merged)
+        return self._run(config, progress or ProgressReporter(), checkpoint)
+
+    def reoptimize(self, previous, config=None, progress=None):
+        """
+        Re-solve from the timetable of a slightly different problem (e.g. after a teacher's
+        unavailability or a course's hours changed), moving as few lessons as possible.
+
+        The lessons the change affects are placed at their best position (see warm_start.py),
+        then tabu search (reconcile_iterations, reconcile_time) works on those lessons only,
+        then on those lessons, the lessons they overlap with and the lessons of the days that
+        lost a lesson, and the lessons of that second stage that can go back to their previous
+        position without lowering the fitness do so. No other lesson moves, so the result may stay below stop_threshold:
+        solve() re-solves the problem from scratch. Only the GA engine without islands and
+        checkpoints is supported.
+
+        Parameters:
+        - previous: Dict individual of the previous problem (the 'individual' of its result).
+        - config: Settings overriding DEFAULT_CONFIG, as for solve.
+        - progress: ProgressReporter receiving the result (None for a silent run).
+
+        Returns:
+        - The dict of solve, with the number of affected lessons (moved, new or dropped),
+          the number of dropped lessons and the number of lessons whose teacher, classroom
+          or timeslot changed (new lessons included).
+        """
+        config = make_config(config)
+        if config['engine'] != 'ga':
+            raise ValueError(f"reoptimize does not support the {config['engine']} engine")
+        if config['num_islands'] > 1:
+            raise ValueError("reoptimize does not support the island model")
+        if config['checkpoint_path'] is not None:
+            raise ValueError("reoptimize does not support checkpoints")
+        progress = progress or ProgressReporter()
+        rng = random.Random(config['seed'])
+        progress.restart()
+        start = time.perf_counter()
+        teacher_max_hours = self.problem['teacher_max_hours']
+
+        timetable, affected, dropped = adapt_individual(previous, self.codec, self.problem['year_courses'])
+        adapted = timetable.copy()
+        best_fitness = place_genes(ConflictState(timetable, self.codec, teacher_max_hours), self.codec, affected)
+        search_report = Counter()
+        for stage in range(2):
+            # The related genes are found once the affected ones are placed
+            movable = affected if stage == 0 else related_genes(timetable, self.codec, affected, dropped)
+            if best_fitness >= config['stop_threshold'] or not len(movable):
+                continue
+            best_fitness = tabu_search(
+                timetable, self.codec, teacher_max_hours, max_iterations=config['reconcile_iterations'],
+                time_budget=config['reconcile_time'], rng=rng, movable=movable, report=search_report,
+            )
+            if stage == 1:
+                # Tabu search also takes moves that do not change the fitness, undo the ones it can spare
+                state = ConflictState(timetable, self.codec, teacher_max_hours)
+                best_fitness = restore_genes(state, adapted.genes, np.setdiff1d(movable, affected))
+
+        evaluations = 1 + search_report['evaluations']
+        progress.report(0, [timetable], [best_fitness], best_fitness, 0, evaluations, force=True)
+        result = self._result(timetable, best_fitness, 0, 0, evaluations, None, start)
+
+        genes, before = timetable.genes, adapted.genes
+        changed = (
+            (genes['teacher'] != before['teacher']) | (genes['classroom'] != before['classroom'])
+            | (genes['timeslot'] != before['timeslot'])
+        )
+        changed[affected] = True
+        result.update(
+            affected=len(affected) + len(dropped), dropped=len(dropped), changed=int(np.count_nonzero(changed)),
+        )
+        return result
+
+    def _run(self, config, progress, checkpoint=None):
+        progress.restart()
+        start = time.perf_counter()
+        teacher_max_hours = self.problem['teacher_max_hours']
+        checkpoint_path, checkpoint_interval = config['checkpoint_path'], config['checkpoint_interval']
+        num_children = children_needed(
+            config['population_size'], config['replacement'], config['elitism'], config['steady_state_size']
+        )
+        if config['local_search'] is not None and config['local_search'] not in LOCAL_SEARCH_METHODS:
+            raise ValueError(f"Unknown local search method {config['local_search']!r}")
+
+        rng = random.Random(config['seed'])  # Selection, initialisation and hypermutation
+        with Breeder(self.codec, teacher_max_hours, config['mutation_rate'], num_workers=config['num_workers'],
+                     seed=config['seed'], cache_size=config['fitness_cache_size']) as breeder:
+            diversity = DiversityManager(
+                self.codec, teacher_max_hours,
+                lambda n: self.new_population(n, config['greedy_fraction'], rng),
+                breeder.evaluate,
+                min_diversity=config['min_diversity'],
+                elite_count=config['elitism'],
+                restart_fraction=config['restart_fraction'],
+                hypermutation_moves=config['hypermutation_moves'],
+                restart_patience=config['restart_patience'],
+                reset_threshold=config['reset_threshold'],
+                rng=rng,
+            )
+            if checkpoint is None:
+                population = self.new_population(config['population_size'], config['greedy_fraction'], rng)
+                fitness_values = breeder.evaluate(population)
+                evaluations = len(population)
+                best, best_fitness = None, None
+                generation, resets = 0, 0
+            else:
+                population, fitness_values = checkpoint['population'], checkpoint['fitness_values']
+                evaluations, generation, resets = checkpoint['evaluations'], checkpoint['generation'], checkpoint['resets']
+                best, best_fitness = checkpoint['best'], checkpoint['best_fitness']
+                rng.setstate(checkpoint['random_state'])
+                breeder.rng.setstate(checkpoint['breeder_state'])
+                diversity.set_state(checkpoint['diversity_state'])
+                start -= checkpoint['elapsed']  # Elapsed time and time limit carry on from the interrupted run
+            saved_generation = generation if checkpoint is not None else None
+            deadline = None if config['time_limit'] is None else start + config['time_limit']
+
+            while True:
+                best_index = max(range(len(population)), key=fitness_values.__getitem__)
+                if best is None or fitness_values[best_index] > best_fitness:
+                    best, best_fitness = population[best_index], fitness_values[best_index]
+
+                done = best_fitness >= config['stop_threshold'] or generation >= config['num_generations']
+                if not done and deadline is not None:
+                    done = time.perf_counter() >= deadline
+                progress.report(generation, population, fitness_values, best_fitness, resets, evaluations, force=done)
+                if done:
+                    break
+
+                if checkpoint_path is not None and generation % checkpoint_interval == 0 and generation != saved_generation:
+                    save_checkpoint(checkpoint_path, self.codec, {
+                        'population': population,
+                        'fitness_values': fitness_values,
+                        'generation': generation,
+                        'resets': resets,
+                        'evaluations': evaluations,
+                        'best': best,
+                        'best_fitness': best_fitness,
+                        'random_state': rng.getstate(),
+                        'breeder_state': breeder.rng.getstate(),
+                        'diversity_state': diversity.get_state(),
+                        'elapsed': time.perf_counter() - start,
+                        'config': config,
+                    })
+                    saved_generation = generation
+                generation += 1
+
+                # Replace very bad and duplicated individuals, hypermutate or partially restart a converged population
+                population, fitness_values, diversity_evaluations, restarted = diversity.step(
+                    population, fitness_values, best_fitness
+                )
+                evaluations += diversity_evaluations
+                resets += restarted
+
+                parent_pairs = [
+                    tournament_selection(population, fitness_values, k=config['tournament_size'], rng=rng)
+                    for _ in range((num_children + 1) // 2)
+                ]
+                children, child_fitness = breeder.breed(parent_pairs, num_children)
+                evaluations += len(children)
+                if config['local_search'] is not None:
+                    evaluations += self._local_search(children, child_fitness, config, rng)
+                # Survivors keep their fitness values, only the children were evaluated
+                if config['replacement'] == 'steady_state':
+                    population, fitness_values = steady_state_replacement(
+                        population, fitness_values, children, child_fitness
+                    )
+                else:
+                    population, fitness_values = generational_replacement(
+                        population, fitness_values, children, child_fitness, config['elitism']
+                    )
+                end_generation(generation)
+            cache_stats, repair_stats = breeder.cache_stats(), breeder.repair_stats()
+
+        return self._result(best, best_fitness, generation, resets, evaluations, cache_stats, start, repair_stats)
+
+    def _local_search(self, children, fitness_values, config, rng):
+        """
+        Improve the local_search_top_k best children in place and update their fitness values.
+
+        Returns:
+        - The number of neighbours scored by the local search.
+        """
+        best = sorted(range(len(children)), key=fitness_values.__getitem__, reverse=True)[:config['local_search_top_k']]
+        evaluations = 0
+        for i in best:
+            fitness_values[i], scored = local_search(
+                config['local_search'], children[i], self.codec, self.problem['teacher_max_hours'],
+                max_iterations=config['local_search_iterations'], time_budget=config['local_search_time'], rng=rng,
+            )
+            evaluations += scored
+        return evaluations
+
+    def _solve_islands(self, config, start, progress):
+        rng = random.Random(config['seed'])
+        populations = [
+            self.new_population(config['population_size'], config['greedy_fraction'], rng) for _ in range(config['num_islands'])
+        ]
+        seed = rng.getrandbits(64)  # Island seeds of run_islands
+        best, best_fitness, _, generations, evaluations = run_islands(
+            populations, self.codec, self.problem['teacher_max_hours'], config['num_generations'],
+            migration_interval=config['migration_interval'],
+            num_migrants=config['num_migrants'],
+            topology=config['topology'],
+            mutation_rate=config['mutation_rate'],
+            tournament_size=config['tournament_size'],
+            stop_threshold=config['stop_threshold'],
+            num_workers=config['num_workers'],
+            seed=seed,
+            time_limit=config['time_limit'],
+            progress=progress,
+            fitness_cache_size=config['fitness_cache_size'],
+        )
+        return self._result(best, best_fitness, generations, 0, evaluations, None, start)
+
+    def _solve_decomposed(self, config, start, progress):
+        """
+        Solve every year as its own problem, num_workers of them at a time, then reconcile the merged timetable.
+
+        Each year gets a seed drawn from the run's seed and the whole config otherwise,
+        num_workers and time_limit included: the time limit applies per year, and the
+        years solved in parallel share the cores.
+        """
+        rng = random.Random(config['seed'])
+        year_config = dict(config, engine='ga', num_workers=0)
+        tasks = [(subproblem, dict(year_config, seed=rng.getrandbits(64))) for subproblem in split_problem(self.problem)]
+        if config['num_workers'] > 0:
+            with ProcessPoolExecutor(max_workers=config['num_workers']) as executor:
+                results = list(executor.map(_solve_subproblem, tasks))
+        else:
+            results = [_solve_subproblem(task) for task in tasks]
+
+        best = self.codec.encode(merge_individuals([result['individual'] for result in results]))
+        report = Counter()
+        best_fitness = reconcile(
+            best, self.codec, self.problem['teacher_max_hours'],
+            max_iterations=config['reconcile_iterations'], time_budget=config['reconcile_time'], report=report, rng=rng,
+        )
+        for result in results:
+            for kind, counts in result['repairs'].items():
+                report[f'{kind}_found'] += counts['found']
+                report[f'{kind}_resolved'] += counts['resolved']
+
+        generations = max(result['generations'] for result in results)
+        evaluations = sum(result['evaluations'] for result in results) + 1 + report['evaluations']
+        resets = sum(result['resets'] for result in results)
+        progress.report(generations, [best], [best_fitness], best_fitness, resets, evaluations, force=True)
+        repair_stats = {kind: {'found': report[f'{kind}_found'], 'resolved': report[f'{kind}_resolved']} for kind in REPAIR_KINDS}
+        return self._result(best, best_fitness, generations, resets, evaluations, None, start, repair_stats)
+
+    def _solve_cp(self, config, start, progress):
+        """
+        Solve the exact model of cp_solver.py, starting the search from a DSatur timetable.
+        """
+        problem = self.problem
+        hint = greedy_individual(
+            problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'], problem['timeslots'],
+            problem['teacher_max_hours'], self.problem_index, random.Random(config['seed'])
+        )
+        individual, _ = solve_cp(
+            problem, self.codec, time_limit=config['time_limit'], num_workers=config['num_workers'], seed=config['seed'],
+            hint=hint,
+        )
+        best = self.codec.encode(individual)
+        best_fitness = int(batch_fitness(stack_timetables([best]), self.codec.index_maps, self.problem['teacher_max_hours'])[0])
+        progress.report(0, [best], [best_fitness], best_fitness, 0, 1, force=True)
+        return self._result(best, best_fitness, 0, 0, 1, None, start)
+
+    def _result(self, best, best_fitness, generations, resets, evaluations, cache_stats, start, repair_stats=None):
+        return {
+            'individual': self.codec.decode(best),
+            'timetable': best,
+            'fitness': best_fitness,
+            'generations': generations,
+            'resets': resets,
+            'evaluations': evaluations,
+            'fitness_cache': cache_stats,
+            'repairs': repair_stats,
+            'elapsed': time.perf_counter() - start,
+        }
+
+
+def _solve_subproblem(task):
+    subproblem, config = task
+    result = Solver(subproblem).solve(config)
+    del result['timetable']  # Sent back in dict form, the codec of the whole problem encodes it
+    return result
+
+
+def solve(problem, config=None, progress=None):
+    """
+    Solve one problem with a fresh Solver, see Solver.solve.
+    """
+    return Solver(problem).solve(config, progress)
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, next to algo.py
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import algo  # noqa: E402
+
+
+@pytest.fixture
+def problem():
+    """
+    The built-in problem of algo.py.
+    """
+    return {
+        'years': algo.years,
+        'year_courses': algo.year_courses,
+        'teachers': algo.teachers,
+        'classrooms': algo.classrooms,
+        'timeslots': algo.timeslots,
+        'teacher_max_hours': algo.teacher_max_hours,
+    }
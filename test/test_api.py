@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+import pytest
+
+from algo import fitness_function
+from solver import Solver, solve
+
+from conftest import REPO_ROOT
+
+
+def test_importing_runs_nothing():
+    modules = 'import algo, solver, batch, benchmark'
+    completed = subprocess.run(
+        [sys.executable, '-c', modules], cwd=REPO_ROOT, capture_output=True, text=True, check=True, timeout=60,
+    )
+    assert completed.stdout == '' and completed.stderr == ''
+
+
+def test_solve_returns_a_consistent_result(problem):
+    result = solve(problem, {'num_generations': 3, 'seed': 1})
+    assert {'individual', 'timetable', 'fitness', 'generations', 'evaluations', 'elapsed'} <= set(result)
+    assert result['fitness'] == fitness_function(result['individual'], problem['teacher_max_hours'])
+    assert len(result['timetable']) == sum(map(len, result['individual']))
+
+
+def test_solver_can_be_reused(problem):
+    solver = Solver(problem)
+    config = {'greedy_fraction': 0.0, 'num_generations': 5, 'seed': 2}
+    assert solver.solve(config)['individual'] == solver.solve(config)['individual']
+
+
+def test_problem_and_settings_are_checked(problem):
+    with pytest.raises(ValueError, match='teacher_max_hours'):
+        Solver({key: value for key, value in problem.items() if key != 'teacher_max_hours'})
+    with pytest.raises(ValueError, match='populaton_size'):
+        Solver(problem).solve({'populaton_size': 10})
+    with pytest.raises(ValueError, match='engine'):
+        Solver(problem).solve({'engine': 'magic'})
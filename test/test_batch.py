@@ -0,0 +1,59 @@
+import io
+import json
+
+from batch import iter_jobs, load_problem, run_batch
+from instances import generate_instance
+
+
+def write_instances(tmp_path):
+    """
+    Write three instances as JSONL: two problems (one with its own config) and a broken one.
+    """
+    lines = [
+        json.dumps(generate_instance(seed=1)),
+        json.dumps({'id': 'school-b', 'problem': generate_instance(seed=2), 'config': {'num_generations': 2}}),
+        json.dumps({'id': 'broken', 'problem': {'years': []}}),
+    ]
+    path = tmp_path / 'schools.jsonl'
+    path.write_text('\n'.join(lines) + '\n\n')
+    return str(path)
+
+
+def test_json_keys_are_restored():
+    problem = generate_instance(seed=1)
+    restored = load_problem(json.loads(json.dumps(problem)))
+    assert restored == problem
+
+
+def test_jobs_from_a_directory_and_from_jsonl(tmp_path):
+    problem = generate_instance(seed=1)
+    (tmp_path / 'a.json').write_text(json.dumps(problem))
+    (tmp_path / 'notes.txt').write_text('ignored')
+    assert [(job_id, config) for job_id, _, config in iter_jobs(str(tmp_path))] == [('a', {})]
+
+    jobs = list(iter_jobs(write_instances(tmp_path)))
+    assert [(job_id, config) for job_id, _, config in jobs] == [(1, {}), ('school-b', {'num_generations': 2}), ('broken', {})]
+
+
+def test_run_batch_writes_results_and_summary(tmp_path):
+    path = write_instances(tmp_path)
+    config = {'num_generations': 5, 'num_workers': 0, 'seed': 1}
+    outputs = []
+    for num_workers in (0, 2):
+        output = io.StringIO()
+        summary = run_batch(iter_jobs(path), output, num_workers, config)
+        outputs.append(sorted((json.loads(line) for line in output.getvalue().splitlines()), key=lambda r: str(r['id'])))
+
+        assert (summary['jobs'], summary['failed']) == (3, 1)
+        assert summary['lessons'] == sum(result.get('lessons', 0) for result in outputs[-1])
+        assert summary['solved'] == sum(result.get('fitness') == 0 for result in outputs[-1])
+        assert summary['jobs_per_s'] > 0
+
+    results = {result['id']: result for result in outputs[0]}
+    assert results['broken']['error'].startswith('ValueError')
+    assert results['school-b']['generations'] <= 2
+    assert results[1]['lessons'] == sum(len(year) for year in results[1]['individual'])
+    # The same seeds give the same timetables in worker processes
+    for result in outputs[0] + outputs[1]:
+        del result['elapsed']
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+import pytest
+
+from checkpoint import load_checkpoint, save_checkpoint
+from instances import generate_instance
+from solver import Solver, make_config
+from timetable import TimetableCodec
+
+from test_solver import QUICK, make_codec, random_population
+
+
+def test_checkpoint_round_trip(problem, tmp_path):
+    codec = make_codec(problem)
+    population = random_population(problem, codec, 4)
+    rng = random.Random(3)
+    state = {
+        'population': population,
+        'fitness_values': [-10, -20, -30, -40],
+        'generation': 7,
+        'resets': 1,
+        'evaluations': 123,
+        'best': population[0],
+        'best_fitness': -10,
+        'random_state': rng.getstate(),
+        'breeder_state': random.Random(4).getstate(),
+        'diversity_state': {'stale_bursts': 2, 'best_fitness': -10},
+        'elapsed': 1.5,
+        'config': make_config({'seed': 3}),
+    }
+    path = str(tmp_path / 'run.npz')
+    save_checkpoint(path, codec, state)
+    loaded = load_checkpoint(path, codec)
+
+    assert [t.key() for t in loaded['population']] == [t.key() for t in population]
+    assert np.array_equal(loaded['population'][0].year_offsets, population[0].year_offsets)
+    assert loaded['best'].key() == population[0].key()
+    for key in ('fitness_values', 'generation', 'resets', 'evaluations', 'best_fitness', 'diversity_state', 'elapsed', 'config'):
+        assert loaded[key] == state[key]
+    restored = random.Random()
+    restored.setstate(loaded['random_state'])
+    assert restored.random() == rng.random()
+    assert loaded['breeder_state'] == state['breeder_state']
+
+
+def test_checkpoint_of_another_problem_is_rejected(problem, tmp_path):
+    path = str(tmp_path / 'run.npz')
+    Solver(problem).solve(dict(QUICK, num_generations=2, checkpoint_interval=1, stop_threshold=1, checkpoint_path=path))
+
+    other = generate_instance(seed=0)
+    codec = TimetableCodec(other['years'], other['year_courses'], other['teachers'], other['classrooms'], other['timeslots'])
+    with pytest.raises(ValueError, match='another problem'):
+        load_checkpoint(path, codec)
@@ -0,0 +1,18 @@
+import pytest
+
+from algo import fitness_function
+from delta import ConflictState
+from solver import Solver
+
+pytest.importorskip('ortools')
+
+
+def test_cp_engine_finds_a_timetable_without_hard_violations(problem):
+    solver = Solver(problem)
+    result = solver.solve({'engine': 'cp', 'time_limit': 30, 'num_workers': 0, 'seed': 1})
+    assert result['fitness'] == fitness_function(result['individual'], problem['teacher_max_hours'])
+
+    # The model only admits timetables without overlaps or workload violations, gaps are its objective
+    state = ConflictState(solver.codec.encode(result['individual']), solver.codec, problem['teacher_max_hours'])
+    assert (state.overlaps, state.overloaded) == (0, 0)
+    assert len(result['timetable']) == len(solver.new_population(1)[0])
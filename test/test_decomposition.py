@@ -0,0 +1,43 @@
+from algo import COURSE_DURATION_MINUTES, fitness_function
+from decomposition import merge_individuals, split_problem
+from instances import generate_instance
+from solver import Solver
+
+
+def test_split_and_merge_keep_every_year():
+    problem, solution = generate_instance(num_years=3, seed=0, return_solution=True)
+    subproblems = split_problem(problem)
+    assert [sub['years'] for sub in subproblems] == [[year] for year in problem['years']]
+    for sub in subproblems:
+        assert sub['teachers'] is problem['teachers'] and sub['classrooms'] is problem['classrooms']
+        assert list(sub['year_courses']) == [sub['years'][0]['id']]
+    assert merge_individuals([[year_timetable] for year_timetable in solution]) == solution
+
+
+def test_decomposition_gives_a_valid_timetable():
+    problem = generate_instance(num_years=3, sections_per_year=2, num_teachers=8, num_classrooms=8, seed=3)
+    # Random year populations, so reconcile has cross-year conflicts to resolve
+    config = {'engine': 'decomposition', 'greedy_fraction': 0.0, 'num_generations': 30, 'num_workers': 0, 'seed': 1}
+    result = Solver(problem).solve(config)
+
+    individual = result['individual']
+    assert result['fitness'] == fitness_function(individual, problem['teacher_max_hours']) == 0
+    assert result['repairs']['teacher']['found'] > 0
+    assert [year_timetable[0]['year_id'] for year_timetable in individual] == [year['id'] for year in problem['years']]
+    for year, year_timetable in zip(problem['years'], individual):
+        lessons = sorted(gene['course'] for gene in year_timetable)
+        expected = sorted(
+            course['course_name'] for course in problem['year_courses'][year['id']]
+            for _ in range(round(course['hours'] * 60 / COURSE_DURATION_MINUTES))
+        )
+        assert lessons == expected
+
+    # Years solved in worker processes give the same timetable
+    parallel = Solver(problem).solve(dict(config, num_workers=2))
+    assert parallel['individual'] == individual
+
+
+def test_decomposition_is_deterministic_with_a_seed():
+    problem = generate_instance(num_years=3, seed=4)
+    config = {'engine': 'decomposition', 'num_generations': 10, 'num_workers': 0, 'seed': 2}
+    assert Solver(problem).solve(config)['individual'] == Solver(problem).solve(config)['individual']
@@ -0,0 +1,6 @@
+from benchmark import benchmark_child_scoring
+
+
+def test_inherited_states_score_children_like_batch_fitness(problem):
+    results = benchmark_child_scoring(problem, 6, 1, seed=0)
+    assert results['diverse']['same_fitness'] and results['converged']['same_fitness']
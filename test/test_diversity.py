@@ -0,0 +1,29 @@
+import random
+
+from diversity import DiversityManager, duplicate_indexes, genotype_diversity
+from solver import Solver
+
+
+def test_duplicates_skip_protected_individuals(problem):
+    random.seed(0)
+    first, other = Solver(problem).new_population(2)
+    population = [first, first.copy(), other, first.copy()]
+    assert duplicate_indexes(population, [0, 1, 2, 3]) == [1, 3]
+    assert duplicate_indexes(population, [0, 1, 2, 3], protected=2) == [3]
+
+
+def test_diversity_step_leaves_equal_elites_alone(problem):
+    solver = Solver(problem)
+    random.seed(0)
+    population = solver.new_population(6)
+    population[1] = population[0].copy()
+    fitness_values = [0, 0, -50, -60, -70, -80]
+
+    manager = DiversityManager(
+        solver.codec, problem['teacher_max_hours'], solver.new_population, lambda p: [-1] * len(p),
+        min_diversity=0.0, elite_count=2,
+    )
+    population_after, _, evaluations, restarted = manager.step(population, fitness_values, 0)
+    assert population_after[0] is population[0] and population_after[1] is population[1]
+    assert (evaluations, restarted) == (0, False)
+    assert genotype_diversity(population_after) > 0
@@ -0,0 +1,38 @@
+import pytest
+
+from algo import fitness_function
+from fitness_batch import batch_fitness, build_index_maps, encode_population, population_fitness
+from instances import generate_instance
+
+from test_solver import make_codec, random_population
+
+
+def test_population_fitness_matches_fitness_function(problem):
+    codec = make_codec(problem)
+    individuals = codec.decode_population(random_population(problem, codec))
+    expected = [fitness_function(individual, problem['teacher_max_hours']) for individual in individuals]
+    assert all(fitness < 0 for fitness in expected)
+
+    assert population_fitness(
+        individuals, problem['years'], problem['teachers'], problem['classrooms'], problem['timeslots'],
+        problem['teacher_max_hours'],
+    ) == expected
+
+
+@pytest.mark.parametrize('max_hours', [0.5, 100])
+def test_workload_penalty_matches_fitness_function(problem, max_hours):
+    codec = make_codec(problem)
+    individuals = codec.decode_population(random_population(problem, codec, 4))
+    teacher_max_hours = dict.fromkeys(problem['teacher_max_hours'], max_hours)
+    index_maps = build_index_maps(problem['years'], problem['teachers'], problem['classrooms'], problem['timeslots'])
+
+    fitness_values = batch_fitness(encode_population(individuals, index_maps), index_maps, teacher_max_hours).tolist()
+    assert fitness_values == [fitness_function(individual, teacher_max_hours) for individual in individuals]
+
+
+def test_conflict_free_timetable_scores_zero():
+    problem, solution = generate_instance(seed=4, return_solution=True)
+    assert population_fitness(
+        [solution], problem['years'], problem['teachers'], problem['classrooms'], problem['timeslots'],
+        problem['teacher_max_hours'],
+    ) == [0]
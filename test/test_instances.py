@@ -0,0 +1,46 @@
+import pytest
+
+from algo import COURSE_DURATION_MINUTES, fitness_function
+from instances import generate_instance
+from solver import Solver
+
+
+def check_solution(problem, solution):
+    """
+    Assert that the reference timetable is feasible and follows the problem data.
+    """
+    assert fitness_function(solution, problem['teacher_max_hours']) == 0
+    teachers = {teacher['id']: teacher for teacher in problem['teachers']}
+    course_ids = {course['course_name']: course['id'] for courses in problem['year_courses'].values() for course in courses}
+    for year, year_timetable in zip(problem['years'], solution):
+        hours = {course['course_name']: course['hours'] for course in problem['year_courses'][year['id']]}
+        lessons = {}
+        for gene in year_timetable:
+            teacher = teachers[gene['teacher']]
+            assert course_ids[gene['course']] in teacher['courses']
+            assert gene['timeslot']['day'] not in teacher['unavailability']
+            lessons[gene['course']] = lessons.get(gene['course'], 0) + 1
+        assert lessons == {name: round(h * 60 / COURSE_DURATION_MINUTES) for name, h in hours.items()}
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_reference_solution_is_feasible(seed):
+    problem, solution = generate_instance(num_years=6, num_teachers=8, num_classrooms=8, seed=seed, return_solution=True)
+    assert len(solution) == len(problem['years'])
+    check_solution(problem, solution)
+
+
+def test_same_seed_same_instance():
+    assert generate_instance(seed=5) == generate_instance(seed=5)
+    assert generate_instance(seed=5) != generate_instance(seed=6)
+
+
+def test_instance_is_accepted_by_the_solver():
+    problem = generate_instance(seed=2)
+    result = Solver(problem).solve({'num_generations': 5, 'seed': 1})
+    assert result['fitness'] == fitness_function(result['individual'], problem['teacher_max_hours'])
+
+
+def test_overfull_instance_is_rejected():
+    with pytest.raises(ValueError, match='do not fit'):
+        generate_instance(num_years=20, num_teachers=2, num_classrooms=2, seed=0)
@@ -0,0 +1,28 @@
+from algo import fitness_function
+from islands import evolve_island, run_islands
+
+from test_solver import make_codec, random_population
+
+
+def test_island_stopping_early_reports_what_it_ran(problem):
+    codec = make_codec(problem)
+    population = random_population(problem, codec, 6)
+    fitness_values = [fitness_function(codec.decode(t), problem['teacher_max_hours']) for t in population]
+    island = (codec, problem['teacher_max_hours'], 0.1, 3)
+
+    _, reached, generations, evaluations = evolve_island(population, fitness_values, 3, 1, *island, stop_threshold=1)
+    assert (generations, evaluations) == (3, 3 * 6)
+    assert max(reached) > max(fitness_values)
+
+    # Same seed, stopping as soon as that fitness is reached
+    _, _, generations, evaluations = evolve_island(population, fitness_values, 10, 1, *island, stop_threshold=max(reached))
+    assert generations <= 3 and evaluations == generations * 6
+
+
+def test_run_islands_counts_evaluations(problem):
+    codec = make_codec(problem)
+    populations = [random_population(problem, codec, 6, seed) for seed in range(2)]
+    _, _, _, generations, evaluations = run_islands(
+        populations, codec, problem['teacher_max_hours'], 7, migration_interval=3, stop_threshold=1, num_workers=0, seed=1,
+    )
+    assert (generations, evaluations) == (7, 2 * 6 * (7 + 1))
@@ -0,0 +1,29 @@
+from occupancy import Occupancy, iter_slots
+
+
+def test_occupy_reports_conflicts_and_release_frees():
+    occupancy = Occupancy(10)
+    assert not occupancy.occupy('teacher', 3)
+    assert occupancy.occupy('teacher', 3)
+    assert occupancy.is_busy('teacher', 3) and not occupancy.is_busy('teacher', 4)
+    assert occupancy.busy_count('teacher') == 1
+
+    occupancy.release('teacher', 3)
+    assert not occupancy.is_busy('teacher', 3) and occupancy.busy_count('teacher') == 0
+
+
+def test_free_slots_are_common_to_all_resources():
+    occupancy = Occupancy(6)
+    for slot in (0, 2):
+        occupancy.occupy('a', slot)
+    occupancy.occupy('b', 5)
+    assert list(iter_slots(occupancy.free('a', 'b'))) == [1, 3, 4]
+    assert list(iter_slots(occupancy.free('unknown'))) == list(range(6))
+
+
+def test_copy_is_independent():
+    occupancy = Occupancy(4)
+    occupancy.occupy(1, 0)
+    copy = occupancy.copy()
+    copy.occupy(1, 1)
+    assert occupancy.busy_count(1) == 1 and copy.busy_count(1) == 2
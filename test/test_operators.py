@@ -0,0 +1,21 @@
+import copy
+import random
+
+from algo import crossover, generate_population, mutate, repair
+from problem_index import ProblemIndex
+
+
+def test_dict_offspring_never_change_their_parents(problem):
+    random.seed(0)
+    problem_index = ProblemIndex(problem['teachers'], problem['year_courses'], problem['timeslots'], problem['classrooms'])
+    parent1, parent2 = generate_population(
+        2, problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'], problem['timeslots'],
+        problem['teacher_max_hours'], problem_index,
+    )
+    before1, before2 = copy.deepcopy(parent1), copy.deepcopy(parent2)
+
+    for child in crossover(parent1, parent2):
+        mutate(child, 1.0, problem['teachers'], problem['classrooms'], problem['timeslots'], problem_index)
+        repair(child, problem['teachers'], problem['classrooms'], problem['timeslots'], problem['teacher_max_hours'],
+               problem_index)
+    assert parent1 == before1 and parent2 == before2
@@ -0,0 +1,59 @@
+import copy
+import random
+
+import pytest
+
+from algo import generate_population, mutate
+from problem_index import ProblemIndex
+
+
+def make_index(problem):
+    return ProblemIndex(problem['teachers'], problem['year_courses'], problem['timeslots'], problem['classrooms'])
+
+
+def test_lookups_match_the_problem_lists(problem):
+    index = make_index(problem)
+    teachers, timeslots = problem['teachers'], problem['timeslots']
+
+    for courses in problem['year_courses'].values():
+        for course in courses:
+            expected = tuple(t for t, teacher in enumerate(teachers) if course['id'] in teacher['courses'])
+            assert index.course_teachers[course['id']] == expected
+            assert index.course_name_teachers[course['course_name']] == expected
+            assert index.course_ids[course['course_name']] == course['id']
+
+    for t, teacher in enumerate(teachers):
+        for i, ts in enumerate(timeslots):
+            assert index.is_available(t, i) == (ts['day'] not in teacher['unavailability'])
+
+    for day_timeslots in index.day_timeslots:
+        slots = [timeslots[i]['slot'] for i in day_timeslots]
+        assert slots == sorted(slots) and len({timeslots[i]['day'] for i in day_timeslots}) == 1
+        for current, following in zip(day_timeslots, day_timeslots[1:]):
+            assert index.next_slot[current] == following and index.previous_slot[following] == current
+        assert index.next_slot[day_timeslots[-1]] == -1 and index.previous_slot[day_timeslots[0]] == -1
+
+
+def test_mutate_only_assigns_qualified_teachers(problem):
+    index = make_index(problem)
+    random.seed(0)
+    population = generate_population(
+        5, problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'], problem['timeslots'],
+        problem['teacher_max_hours'], index,
+    )
+    teacher_courses = {teacher['id']: teacher['courses'] for teacher in problem['teachers']}
+    for individual in population:
+        for _ in range(20):
+            mutate(individual, 1.0, problem['teachers'], problem['classrooms'], problem['timeslots'], index)
+        for year_timetable in individual:
+            for gene in year_timetable:
+                assert index.course_ids[gene['course']] in teacher_courses[gene['teacher']]
+
+
+def test_duplicate_course_names_are_rejected(problem):
+    year_courses = copy.deepcopy(problem['year_courses'])
+    first_year = next(iter(year_courses))
+    course = year_courses[first_year][0]
+    year_courses[first_year].append(dict(course, id=999))
+    with pytest.raises(ValueError, match='Course name'):
+        ProblemIndex(problem['teachers'], year_courses, problem['timeslots'], problem['classrooms'])
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from profiling import Profiler, profiled, section
+from solver import Solver
+
+from test_solver import QUICK
+
+
+@profiled('double')
+def double(x):
+    with section('double.inner'):
+        return 2 * x
+
+
+def test_profiled_functions_are_counted_only_while_running():
+    double(1)
+    with Profiler(per_generation=False) as profiler:
+        for x in range(3):
+            double(x)
+    double(1)
+    assert {name: entry['calls'] for name, entry in profiler.totals.items()} == {'double': 3, 'double.inner': 3}
+    assert 'double' in profiler.summary()
+
+
+def test_only_one_profiler_runs_at_a_time():
+    with Profiler():
+        with pytest.raises(RuntimeError):
+            Profiler().start()
+
+
+def test_solver_run_is_profiled_per_generation(problem, tmp_path):
+    config = dict(QUICK, num_generations=4, population_size=10, stop_threshold=1, num_workers=0)
+    with Profiler(track_allocations=True) as profiler:
+        Solver(problem).solve(config)
+
+    assert [generation['generation'] for generation in profiler.generations] == [1, 2, 3, 4]
+    for name in ('batch_fitness', 'tournament_selection', 'crossover_timetables', 'mutate_timetable', 'repair_timetable'):
+        assert profiler.totals[name]['calls'] > 0
+    # 9 children (one elite) per generation come from 5 parent pairs
+    assert profiler.totals['crossover_timetables']['calls'] == 4 * 5
+
+    path = tmp_path / 'profile.json'
+    profiler.write_json(str(path))
+    assert json.loads(path.read_text())['operators'].keys() == profiler.totals.keys()
@@ -0,0 +1,43 @@
+import io
+import json
+
+from progress import JsonLinesSink, MemorySink, PrintSink, ProgressReporter
+from solver import Solver
+
+from test_solver import QUICK
+
+
+def test_silent_reporter_builds_nothing():
+    reporter = ProgressReporter()
+    assert reporter.silent
+    assert reporter.report(0, [], [], 0, force=True) is None
+
+
+def test_reports_are_sampled_every_interval(problem):
+    sink = MemorySink()
+    result = Solver(problem).solve(dict(QUICK, stop_threshold=1), ProgressReporter([sink], interval=5))
+    generations = [record['generation'] for record in sink.records]
+    assert generations == [0, 5, 10, 15, 20]  # The last generation is always reported
+    last = sink.records[-1]
+    assert (last['best_so_far'], last['evaluations']) == (result['fitness'], result['evaluations'])
+    assert all(record['worst'] <= record['mean'] <= record['best'] <= record['best_so_far'] for record in sink.records)
+
+
+def test_min_seconds_skips_close_samples(problem):
+    sink = MemorySink()
+    Solver(problem).solve(dict(QUICK, stop_threshold=1), ProgressReporter([sink], min_seconds=3600))
+    assert [record['generation'] for record in sink.records] == [0, QUICK['num_generations']]
+
+
+def test_sinks_write_one_line_per_report(problem, tmp_path):
+    stream = io.StringIO()
+    json_sink = JsonLinesSink(str(tmp_path / 'progress.jsonl'))
+    reporter = ProgressReporter([PrintSink(stream), json_sink], interval=10)
+    Solver(problem).solve(dict(QUICK, stop_threshold=1), reporter)
+    json_sink.close()
+
+    lines = stream.getvalue().splitlines()
+    records = [json.loads(line) for line in (tmp_path / 'progress.jsonl').read_text().splitlines()]
+    assert len(lines) == len(records) == 3
+    assert lines[0].startswith('Generation 0: best')
+    assert [record['generation'] for record in records] == [0, 10, 20]
@@ -0,0 +1,63 @@
+import random
+from collections import Counter
+
+import pytest
+
+from algo import fitness_function
+from delta import ConflictState
+from instances import generate_instance
+from solver import Solver
+from timetable import REPAIR_KINDS, mutate_timetable, repair_timetable
+
+
+def broken_timetables(seed, size=3):
+    """
+    Random timetables of a generated instance, with many overlaps and gaps.
+    """
+    problem = generate_instance(seed=seed)
+    solver = Solver(problem)
+    population = solver.new_population(size, 0.0, random.Random(seed))
+    for timetable in population:
+        mutate_timetable(timetable, 1.0, solver.codec, rng=random.Random(seed))
+    return problem, solver.codec, population
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_repair_removes_every_overlap(seed):
+    problem, codec, population = broken_timetables(seed)
+    for timetable in population:
+        before = ConflictState(timetable, codec, problem['teacher_max_hours'])
+        report = Counter()
+        repair_timetable(timetable, codec, problem['teacher_max_hours'], report=report)
+        after = ConflictState(timetable, codec, problem['teacher_max_hours'])
+
+        assert before.overlaps > 0 and after.overlaps == 0
+        assert after.gaps <= before.gaps
+        for kind in REPAIR_KINDS:
+            assert report[f'{kind}_resolved'] <= report[f'{kind}_found']
+
+
+def test_repair_is_deterministic_and_idempotent():
+    problem, codec, population = broken_timetables(0, 1)
+    first, second = population[0].copy(), population[0].copy()
+    random.seed(1)
+    repair_timetable(first, codec, problem['teacher_max_hours'])
+    random.seed(2)
+    repair_timetable(second, codec, problem['teacher_max_hours'])
+    assert first.key() == second.key()
+
+    again = first.copy()
+    repair_timetable(again, codec, problem['teacher_max_hours'])
+    assert again.key() == first.key()
+
+
+def test_repair_through_a_conflict_state_keeps_its_score():
+    problem, codec, population = broken_timetables(1, 1)
+    timetable = population[0]
+    plain = timetable.copy()
+    state = ConflictState(timetable, codec, problem['teacher_max_hours'])
+    repair_timetable(timetable, codec, problem['teacher_max_hours'], state)
+    repair_timetable(plain, codec, problem['teacher_max_hours'])
+
+    assert timetable.key() == plain.key()
+    assert state.score == fitness_function(codec.decode(timetable), problem['teacher_max_hours'])
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from algo import fitness_function
+from parallel import Breeder
+from replacement import children_needed
+from solver import Solver
+
+from test_solver import QUICK, make_codec, random_population
+
+
+@pytest.mark.parametrize('num_workers', [0, 2])
+def test_odd_number_of_children_is_bred_exactly(problem, num_workers):
+    codec = make_codec(problem)
+    population = random_population(problem, codec)
+    pairs = [(population[i], population[i + 1]) for i in range(0, len(population), 2)]
+
+    with Breeder(codec, problem['teacher_max_hours'], 0.5, num_workers=num_workers, seed=3) as breeder:
+        children, fitness_values = breeder.breed(pairs, 7)
+        stats = breeder.cache_stats()
+    assert len(children) == len(fitness_values) == 7
+    assert stats['hits'] + stats['misses'] == 7  # The eighth child was never scored
+    assert fitness_values == [fitness_function(codec.decode(child), problem['teacher_max_hours']) for child in children]
+
+    with Breeder(codec, problem['teacher_max_hours'], 0.5, num_workers=num_workers, seed=3) as breeder:
+        all_children, _ = breeder.breed(pairs)
+    assert [child.key() for child in children] == [child.key() for child in all_children[:7]]
+
+
+def test_elitism_evaluates_only_the_children_kept(problem):
+    config = dict(QUICK, population_size=20, elitism=1, stop_threshold=1, min_diversity=0.0, reset_threshold=None)
+    result = Solver(problem).solve(config)
+    num_children = children_needed(20, 'generational', 1)
+    stats = result['fitness_cache']
+    assert stats['hits'] + stats['misses'] == result['generations'] * num_children
+
+
+@pytest.mark.parametrize('engine_config', [{}, {'num_islands': 2, 'num_workers': 0}, {'local_search': 'tabu'}])
+def test_seeded_solve_leaves_the_random_module_alone(problem, engine_config):
+    config = dict(QUICK, num_generations=5, stop_threshold=1, local_search_iterations=5, **engine_config)
+    random.seed(7)
+    expected = random.random()
+
+    random.seed(7)
+    first = Solver(problem).solve(config)
+    assert random.random() == expected
+    random.seed(8)  # The caller's random stream does not change the run either
+    second = Solver(problem).solve(config)
+    assert first['individual'] == second['individual']
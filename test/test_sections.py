@@ -0,0 +1,34 @@
+from algo import fitness_function
+from instances import generate_instance
+from solver import Solver
+
+from test_instances import check_solution
+
+
+def test_sections_follow_the_courses_of_their_level():
+    problem, solution = generate_instance(
+        num_years=3, sections_per_year=3, num_teachers=12, num_classrooms=12, num_buildings=2, seed=1, return_solution=True,
+    )
+    years = problem['years']
+    assert [year['name'] for year in years[:3]] == ['Year 1 A', 'Year 1 B', 'Year 1 C']
+    for level in (1, 2, 3):
+        sections = [year for year in years if year['level'] == level]
+        assert len(sections) == 3
+        courses = [problem['year_courses'][year['id']] for year in sections]
+        assert courses[0] == courses[1] == courses[2]
+    assert {classroom['building'] for classroom in problem['classrooms']} == {1, 2}
+    check_solution(problem, solution)
+
+
+def test_sections_share_teachers_and_classrooms():
+    problem = generate_instance(num_years=2, sections_per_year=4, num_teachers=10, num_classrooms=10, seed=2)
+    result = Solver(problem).solve({'num_generations': 10, 'seed': 1})
+    assert result['fitness'] == fitness_function(result['individual'], problem['teacher_max_hours'])
+
+    # Every class group is scheduled on its own, with the teachers of the whole district
+    assert len(result['individual']) == 8
+    sections_per_teacher = {}
+    for year_timetable in result['individual']:
+        for gene in year_timetable:
+            sections_per_teacher.setdefault(gene['teacher'], set()).add(gene['year_id'])
+    assert max(len(sections) for sections in sections_per_teacher.values()) > 1
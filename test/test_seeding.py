@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from algo import fitness_function, generate_population
+from instances import generate_instance
+from seeding import greedy_individual, seed_population
+
+PROBLEM_KEYS = ('years', 'year_courses', 'teachers', 'classrooms', 'timeslots', 'teacher_max_hours')
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_greedy_seeds_beat_random_ones(seed):
+    problem = generate_instance(seed=seed)
+    data = [problem[key] for key in PROBLEM_KEYS]
+    rng = random.Random(seed)
+    greedy = [fitness_function(greedy_individual(*data, rng=rng), problem['teacher_max_hours']) for _ in range(5)]
+    random_ones = [fitness_function(individual, problem['teacher_max_hours']) for individual in generate_population(5, *data, rng=rng)]
+    assert min(greedy) >= max(random_ones)
+
+
+def test_greedy_individual_keeps_the_lessons_of_every_course(problem):
+    individual = greedy_individual(*[problem[key] for key in PROBLEM_KEYS], rng=random.Random(0))
+    expected = generate_population(1, *[problem[key] for key in PROBLEM_KEYS], rng=random.Random(0))[0]
+    for year_timetable, expected_year in zip(individual, expected):
+        assert [gene['course'] for gene in year_timetable] == [gene['course'] for gene in expected_year]
+
+
+def test_seed_population_mixes_greedy_and_random(problem):
+    data = [problem[key] for key in PROBLEM_KEYS]
+    population = seed_population(6, *data, greedy_fraction=0.5, rng=random.Random(1))
+    assert len(population) == 6
+    rng = random.Random(1)
+    assert population[:3] == [greedy_individual(*data, rng=rng) for _ in range(3)]
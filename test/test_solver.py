@@ -0,0 +1,177 @@
+import copy
+import random
+
+import pytest
+
+from algo import fitness_function, generate_population
+from delta import ConflictState
+from fitness_batch import COURSE_DURATION_MINUTES, population_fitness
+from fitness_cache import FitnessCache
+from instances import generate_instance
+from islands import run_islands
+from local_search import local_search
+from parallel import Breeder
+from solver import Solver
+from timetable import TimetableCodec, mutate_timetable
+
+# Small GA runs: no DSatur seeding, so the built-in problem is not solved in generation 0
+QUICK = {'greedy_fraction': 0.0, 'num_generations': 20, 'seed': 1}
+
+
+def make_codec(problem):
+    return TimetableCodec(
+        problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'], problem['timeslots']
+    )
+
+
+def random_population(problem, codec, size=8, seed=0):
+    """
+    Random Timetables with teacher, classroom and timeslot conflicts.
+    """
+    random.seed(seed)
+    population = codec.encode_population(generate_population(
+        size, problem['years'], problem['year_courses'], problem['teachers'], problem['classrooms'],
+        problem['timeslots'], problem['teacher_max_hours'],
+    ))
+    for timetable in population:
+        mutate_timetable(timetable, 1.0, codec)
+    return population
+
+
+def test_fitness_evaluations_agree(problem):
+    codec = make_codec(problem)
+    population = random_population(problem, codec)
+    individuals = codec.decode_population(population)
+    expected = [fitness_function(individual, problem['teacher_max_hours']) for individual in individuals]
+
+    assert population_fitness(
+        individuals, problem['years'], problem['teachers'], problem['classrooms'], problem['timeslots'],
+        problem['teacher_max_hours'],
+    ) == expected
+    assert [ConflictState(t, codec, problem['teacher_max_hours']).score for t in population] == expected
+    cache = FitnessCache(codec, problem['teacher_max_hours'])
+    assert [cache.fitness(t) for t in population] == expected
+    assert [cache.fitness(t) for t in population] == expected  # Now from the cache
+
+
+@pytest.mark.parametrize('cache_size', [0, 4096])
+def test_breeder_pool_matches_serial(problem, cache_size):
+    codec = make_codec(problem)
+    population = random_population(problem, codec)
+    pairs = [(population[i], population[i + 1]) for i in range(0, len(population), 2)]
+
+    results = []
+    for num_workers in (0, 2):
+        with Breeder(codec, problem['teacher_max_hours'], 0.5, num_workers=num_workers, seed=3,
+                     cache_size=cache_size) as breeder:
+            children, fitness_values = breeder.breed(pairs)
+        results.append(([child.key() for child in children], fitness_values))
+        expected = [fitness_function(codec.decode(child), problem['teacher_max_hours']) for child in children]
+        assert fitness_values == expected
+    assert results[0] == results[1]
+
+
+def test_seeded_solve_is_deterministic(problem):
+    first = Solver(problem).solve(QUICK)
+    second = Solver(problem).solve(QUICK)
+    assert first['individual'] == second['individual']
+    assert (first['fitness'], first['generations'], first['evaluations']) == (
+        second['fitness'], second['generations'], second['evaluations']
+    )
+    assert first['fitness'] == fitness_function(first['individual'], problem['teacher_max_hours'])
+
+
+@pytest.mark.parametrize('override', [False, True])
+def test_resume_matches_uninterrupted_run(problem, tmp_path, override):
+    config = dict(QUICK, num_generations=12, checkpoint_interval=5, stop_threshold=1)
+    uninterrupted = Solver(problem).solve(config)
+
+    path = str(tmp_path / 'run.npz')
+    Solver(problem).solve(dict(config, num_generations=6, checkpoint_path=path))
+    resumed_path = str(tmp_path / 'resumed.npz')
+    overrides = {'num_generations': 12}
+    if override:
+        overrides['checkpoint_path'] = resumed_path
+    resumed = Solver(problem).resume(path, overrides)
+
+    assert resumed['individual'] == uninterrupted['individual']
+    assert (resumed['fitness'], resumed['generations'], resumed['evaluations']) == (
+        uninterrupted['fitness'], uninterrupted['generations'], uninterrupted['evaluations']
+    )
+    assert (tmp_path / 'resumed.npz').exists() == override
+
+
+@pytest.mark.parametrize('restart_fraction', [0.0, 0.05])
+def test_converged_run_with_small_restart_fraction(problem, restart_fraction):
+    # Every generation counts as converged, and the partial restart regenerates no individual
+    result = Solver(problem).solve(dict(
+        QUICK, min_diversity=1.0, restart_patience=0, restart_fraction=restart_fraction, stop_threshold=1,
+    ))
+    assert result['generations'] == QUICK['num_generations']
+    assert result['resets'] == 0
+
+
+def test_restart_fraction_is_validated(problem):
+    with pytest.raises(ValueError, match='restart_fraction'):
+        Solver(problem).solve({'restart_fraction': 1.5})
+
+
+@pytest.mark.parametrize('population_size', [3, 5])
+def test_odd_islands_keep_their_size(problem, population_size):
+    config = dict(
+        QUICK, population_size=population_size, num_islands=2, num_workers=0, migration_interval=4, stop_threshold=1,
+    )
+    result = Solver(problem).solve(config)
+    assert result['generations'] == QUICK['num_generations']
+
+    codec = make_codec(problem)
+    populations = [random_population(problem, codec, population_size, seed) for seed in range(2)]
+    _, _, islands, _, _ = run_islands(
+        populations, codec, problem['teacher_max_hours'], 10, migration_interval=3, stop_threshold=1, num_workers=0, seed=1,
+    )
+    assert [len(population) for population, _ in islands] == [population_size] * 2
+
+
+def test_reoptimize_one_lesson_edit_moves_few_lessons():
+    problem = generate_instance(num_days=5, slots_per_day=7, seed=3)
+    previous = Solver(problem).solve({'seed': 1})
+    edited = copy.deepcopy(problem)
+    course = next(c for c in edited['year_courses'][edited['years'][0]['id']] if c['hours'] >= 1.5)
+    course['hours'] -= COURSE_DURATION_MINUTES / 60  # One lesson fewer
+
+    for seed in range(5):
+        result = Solver(edited).reoptimize(previous['individual'], {'seed': seed})
+        assert (result['affected'], result['dropped']) == (1, 1)
+        assert result['fitness'] == fitness_function(result['individual'], edited['teacher_max_hours'])
+        # Only the lessons of the year on the day of the dropped lesson may move
+        assert result['changed'] <= 7
+
+
+def test_reoptimize_rejects_other_engines(problem):
+    previous = Solver(problem).solve({'seed': 1})
+    for config in ({'engine': 'decomposition'}, {'num_islands': 2}):
+        with pytest.raises(ValueError, match='reoptimize'):
+            Solver(problem).reoptimize(previous['individual'], config)
+
+
+def test_local_search_evaluations_are_counted(problem):
+    codec = make_codec(problem)
+    timetable = random_population(problem, codec, 1)[0]
+    fitness, evaluations = local_search('tabu', timetable, codec, problem['teacher_max_hours'], max_iterations=5)
+    assert fitness < 0 and evaluations == 5 * 20  # Far from solved: 5 steps of 20 sampled neighbours
+
+    config = dict(QUICK, num_generations=3, stop_threshold=1, local_search_time=None)
+    plain = Solver(problem).solve(config)
+    memetic = Solver(problem).solve(dict(config, local_search='annealing', local_search_iterations=50))
+    assert memetic['evaluations'] > plain['evaluations']
+
+
+def test_fitness_cache_year_penalty_ignores_teachers_and_classrooms(problem):
+    codec = make_codec(problem)
+    timetable = random_population(problem, codec, 1)[0]
+    cache = FitnessCache(codec, problem['teacher_max_hours'])
+    cache.fitness(timetable)
+    timetable.genes['classroom'] = (timetable.genes['classroom'] + 1) % len(codec.classrooms)
+    fitness = cache.fitness(timetable)
+    assert cache.year_hits == timetable.num_years
+    assert fitness == fitness_function(codec.decode(timetable), problem['teacher_max_hours'])
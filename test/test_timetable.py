@@ -0,0 +1,44 @@
+import random
+
+import numpy as np
+
+from algo import fitness_function
+from fitness_batch import batch_fitness
+from timetable import crossover_timetables, mutate_timetable, stack_timetables
+
+from test_solver import make_codec, random_population
+
+
+def test_encode_decode_round_trip(problem):
+    codec = make_codec(problem)
+    timetable = random_population(problem, codec, 1)[0]
+    individual = codec.decode(timetable)
+    assert [len(year_timetable) for year_timetable in individual] == np.diff(timetable.year_offsets).tolist()
+    assert codec.encode(individual).key() == timetable.key()
+
+
+def test_stacked_timetables_score_like_fitness_function(problem):
+    codec = make_codec(problem)
+    population = random_population(problem, codec)
+    fitness_values = batch_fitness(stack_timetables(population), codec.index_maps, problem['teacher_max_hours']).tolist()
+    assert fitness_values == [fitness_function(codec.decode(t), problem['teacher_max_hours']) for t in population]
+
+
+def test_crossover_swaps_whole_years(problem):
+    codec = make_codec(problem)
+    parent1, parent2 = random_population(problem, codec, 2)
+    child1, child2 = crossover_timetables(parent1, parent2, random.Random(0))
+    for year_index in range(parent1.num_years):
+        years = [t.year_genes(year_index).tobytes() for t in (parent1, parent2, child1, child2)]
+        assert (years[2], years[3]) in ((years[0], years[1]), (years[1], years[0]))
+
+
+def test_mutate_keeps_years_and_courses(problem):
+    codec = make_codec(problem)
+    timetable = random_population(problem, codec, 1)[0]
+    mutated = mutate_timetable(timetable.copy(), 1.0, codec, rng=random.Random(0))
+    for field in ('year', 'course'):
+        assert np.array_equal(mutated.genes[field], timetable.genes[field])
+    # One gene per year at most
+    changed = np.flatnonzero(mutated.genes != timetable.genes)
+    assert len(changed) <= timetable.num_years
@@ -0,0 +1,364 @@
+import random
+
+import numpy as np
+
+from fitness_batch import COURSE_DURATION_MINUTES, build_index_maps
+from occupancy import Occupancy, iter_slots
+from problem_index import ProblemIndex
+from profiling import profiled, section
+
+SLOT_HOURS = COURSE_DURATION_MINUTES / 60
+
+# Violations counted by repair_timetable
+REPAIR_KINDS = ('year', 'teacher', 'classroom', 'gap')
+
+# One row per scheduled class, every field is an index into the codec tables
+GENE_DTYPE = np.dtype([
+    ('year', np.int16),
+    ('course', np.int16),
+    ('teacher', np.int32),
+    ('classroom', np.int32),
+    ('timeslot', np.int16),
+])
+
+
+class Timetable:
+    """
+    Compact individual: one structured array row per gene, ordered by year.
+
+    year_offsets[i]:year_offsets[i + 1] is the slice of genes of the i-th year.
+    The offsets never change during a run, so every individual shares the same array.
+    """
+    __slots__ = ('genes', 'year_offsets')
+
+    def __init__(self, genes, year_offsets):
+        self.genes = genes
+        self.year_offsets = year_offsets
+
+    def __len__(self):
+        return len(self.genes)
+
+    @property
+    def num_years(self):
+        return len(self.year_offsets) - 1
+
+    def year_genes(self, year_index):
+        """
+        Return a view on the genes of one year.
+        """
+        return self.genes[self.year_offsets[year_index]:self.year_offsets[year_index + 1]]
+
+    def copy(self):
+        return Timetable(self.genes.copy(), self.year_offsets)
+
+    def key(self):
+        """
+        Return the genes as bytes: a hashable key, equal for Timetables with the same genes.
+        """
+        return self.genes.tobytes()
+
+
+class TimetableCodec:
+    """
+    Integer tables for teachers, courses, classrooms and timeslots, and the
+    converters between Timetable and the dict individuals of generate_population.
+    """
+
+    def __init__(self, years, year_courses, teachers, classrooms, timeslots):
+        self.years = years
+        self.teachers = teachers
+        self.classrooms = classrooms
+        self.timeslots = timeslots
+        self.index_maps = build_index_maps(years, teachers, classrooms, timeslots)
+        self.problem_index = ProblemIndex(teachers, year_courses, timeslots, classrooms)
+
+        # Courses are shared between years, genes only keep the course name
+        self.courses = []
+        self.course_index = {}
+        for year in years:
+            for course in year_courses[year['id']]:
+                if course['course_name'] not in self.course_index:
+                    self.course_index[course['course_name']] = len(self.courses)
+                    self.courses.append(course)
+
+        self.course_teachers = [self.problem_index.course_teachers[course['id']] for course in self.courses]
+        # Same as bitmasks over the teachers, every teacher for a course nobody is qualified for
+        all_teachers = (1 << len(teachers)) - 1
+        self.course_teacher_masks = [sum(1 << t for t in qualified) or all_teachers for qualified in self.course_teachers]
+
+    def encode(self, individual):
+        """
+        Convert a dict individual into a Timetable.
+        """
+        year_map = self.index_maps['year']
+        teacher_map = self.index_maps['teacher']
+        classroom_map = self.index_maps['classroom']
+        timeslot_map = self.index_maps['timeslot']
+
+        rows = []
+        year_offsets = [0]
+        for year_timetable in individual:
+            for gene in year_timetable:
+                rows.append((
+                    year_map[gene['year_id']],
+                    self.course_index[gene['course']],
+                    teacher_map[gene['teacher']],
+                    classroom_map[gene['classroom']],
+                    timeslot_map[(gene['timeslot']['day'], gene['timeslot']['slot'])],
+                ))
+            year_offsets.append(len(rows))
+
+        return Timetable(np.array(rows, dtype=GENE_DTYPE), np.array(year_offsets, dtype=np.int64))
+
+    def decode(self, timetable):
+        """
+        Convert a Timetable back into a dict individual (e.g. for display_population).
+        """
+        individual = []
+        for year_index in range(timetable.num_years):
+            year_timetable = []
+            for gene in timetable.year_genes(year_index).tolist():
+                year, course, teacher, classroom, timeslot = gene
+                year_timetable.append({
+                    'year_id': self.years[year]['id'],
+                    'course': self.courses[course]['course_name'],
+                    'teacher': self.teachers[teacher]['id'],
+                    'classroom': self.classrooms[classroom]['id'],
+                    'timeslot': self.timeslots[timeslot],
+                })
+            individual.append(year_timetable)
+        return individual
+
+    def encode_population(self, population):
+        encoded = [self.encode(individual) for individual in population]
+        # All individuals share the layout of the first one
+        for timetable in encoded[1:]:
+            if np.array_equal(timetable.year_offsets, encoded[0].year_offsets):
+                timetable.year_offsets = encoded[0].year_offsets
+        return encoded
+
+    def decode_population(self, population):
+        return [self.decode(timetable) for timetable in population]
+
+
+def stack_timetables(population):
+    """
+    Stack a population of Timetables into the arrays expected by batch_fitness.
+    """
+    genes = np.stack([timetable.genes for timetable in population])
+    return {
+        'teacher': genes['teacher'].astype(np.int64),
+        'classroom': genes['classroom'].astype(np.int64),
+        'year': genes['year'].astype(np.int64),
+        'timeslot': genes['timeslot'].astype(np.int64),
+    }
+
+
+@profiled('crossover_timetables')
+def crossover_timetables(parent1, parent2, rng=random):
+    """
+    Year-level crossover of two Timetables, the array counterpart of crossover.
+    The children own fresh arrays, so mutating them never touches the parents.
+    rng is the source of randomness (the random module by default).
+    """
+    assert parent1.num_years == parent2.num_years, "The number of years must be fixed."
+
+    child1, child2 = parent1.genes.copy(), parent2.genes.copy()
+    for i in range(parent1.num_years):
+        if rng.random() >= 0.5:
+            start, end = parent1.year_offsets[i], parent1.year_offsets[i + 1]
+            child1[start:end] = parent2.genes[start:end]
+            child2[start:end] = parent1.genes[start:end]
+
+    return Timetable(child1, parent1.year_offsets), Timetable(child2, parent1.year_offsets)
+
+
+def _assign(timetable, state, index, **change):
+    """
+    Change one gene, through its ConflictState when there is one so the score stays current.
+    """
+    if state is not None:
+        state.move(index, **change)
+    else:
+        for field, value in change.items():
+            timetable.genes[field][index] = value
+
+
+@profiled('mutate_timetable')
+def mutate_timetable(timetable, mutation_rate, codec, state=None, rng=random):
+    """
+    Array counterpart of mutate: change the teacher, classroom or timeslot of one gene per year.
+    Pass the ConflictState of the timetable as state to update its score move by move,
+    and a random.Random as rng to draw from it instead of the random module.
+    """
+    genes = timetable.genes
+    for year_index in range(timetable.num_years):
+        if rng.random() < mutation_rate:
+            start, end = timetable.year_offsets[year_index], timetable.year_offsets[year_index + 1]
+            mutation_index = rng.randint(start, end - 1)
+            mutation_choice = rng.choice(['teacher', 'classroom', 'timeslot'])
+
+            if mutation_choice == 'teacher':
+                available_teachers = codec.course_teachers[genes['course'][mutation_index]]
+                if available_teachers:
+                    _assign(timetable, state, mutation_index, teacher=rng.choice(available_teachers))
+
+            elif mutation_choice == 'classroom':
+                _assign(timetable, state, mutation_index, classroom=rng.randrange(len(codec.classrooms)))
+
+            elif mutation_choice == 'timeslot':
+                _assign(timetable, state, mutation_index, timeslot=rng.randrange(len(codec.timeslots)))
+
+    return timetable
+
+
+def _lowest(mask):
+    return (mask & -mask).bit_length() - 1
+
+
+@profiled('repair_timetable')
+def repair_timetable(timetable, codec, teacher_max_hours, state=None, report=None):
+    """
+    Deterministic array counterpart of repair.
+
+    Genes are placed in order. A gene whose year is already busy at its timeslot
+    moves to a free slot of the year; a gene whose teacher is busy, unavailable
+    that day or out of hours gets the least loaded qualified teacher that is free
+    (or, when there is none, moves to a slot where one is); a gene whose classroom
+    is busy gets a free classroom. All lookups are bitmasks of the free slots of
+    each resource and of the free teachers and classrooms of each slot, so the
+    cost per gene does not grow with the number of teachers and classrooms.
+    New slots are picked next to the year's other classes when possible. Then
+    gaps are closed by shifting the later class of a day to the slot after the
+    previous one, when its teacher and classroom are free there.
+
+    Pass the ConflictState of the timetable as state to update its score move by
+    move, and a Counter as report to count the violations found (<kind>_found) and
+    resolved (<kind>_resolved), kind being year, teacher, classroom or gap.
+    """
+    genes = timetable.genes
+    problem_index = codec.problem_index
+    teacher_timeslots = problem_index.teacher_timeslots
+    day_teachers, slot_day = problem_index.day_teachers, problem_index.slot_day
+    next_slot, previous_slot = problem_index.next_slot, problem_index.previous_slot
+    slot_number = [ts['slot'] for ts in codec.timeslots]
+    max_hours = [teacher_max_hours.get(t['id'], float('inf')) for t in codec.teachers]
+    all_teachers = range(len(codec.teachers))
+
+    teacher_busy = Occupancy(len(codec.timeslots))
+    classroom_busy = Occupancy(len(codec.timeslots))
+    year_busy = Occupancy(len(codec.timeslots))
+    slot_classrooms = Occupancy(len(codec.classrooms))  # Busy classrooms of every timeslot
+    slot_teachers = Occupancy(len(codec.teachers))  # Busy teachers of every timeslot
+    # Teachers without room for one more slot in their max hours
+    full_teachers = sum(1 << t for t, hours in enumerate(max_hours) if SLOT_HOURS > hours)
+    double_booked = set()  # (resource kind, resource, timeslot) left with an unresolved overlap
+    counts = {}
+
+    def count(kind, resolved):
+        counts[f'{kind}_found'] = counts.get(f'{kind}_found', 0) + 1
+        if resolved:
+            counts[f'{kind}_resolved'] = counts.get(f'{kind}_resolved', 0) + 1
+
+    def has_hours(teacher):
+        return (teacher_busy.busy_count(teacher) + 1) * SLOT_HOURS <= max_hours[teacher]
+
+    def teacher_fits(teacher, timeslot):
+        return bool(teacher_timeslots[teacher] >> timeslot & 1) and not teacher_busy.is_busy(teacher, timeslot) and has_hours(teacher)
+
+    def best_slot(year, mask):
+        # Prefer the slots next to the classes the year already has
+        adjacent = 0
+        for ts in iter_slots(year_busy.masks.get(year, 0)):
+            for neighbour in (previous_slot[ts], next_slot[ts]):
+                if neighbour != -1:
+                    adjacent |= 1 << neighbour
+        return _lowest(mask & adjacent or mask)
+
+    for year_index in range(timetable.num_years):
+        start, end = timetable.year_offsets[year_index], timetable.year_offsets[year_index + 1]
+        slot_genes = {}
+
+        with section('repair_timetable.conflicts'):
+            for i in range(start, end):
+                year, course = int(genes['year'][i]), int(genes['course'][i])
+                teacher, classroom, timeslot = int(genes['teacher'][i]), int(genes['classroom'][i]), int(genes['timeslot'][i])
+                qualified = codec.course_teachers[course] or all_teachers
+
+                # ---- Repair Year Overlaps ----
+                if year_busy.is_busy(year, timeslot):
+                    free = year_busy.free(year)
+                    options = free & teacher_busy.free(teacher) & teacher_timeslots[teacher] & classroom_busy.free(classroom)
+                    count('year', bool(free))
+                    if free:
+                        timeslot = best_slot(year, options or free)
+                        _assign(timetable, state, i, timeslot=timeslot)
+
+                # ---- Repair Teacher Conflicts, Unavailability and Workload ----
+                if not teacher_fits(teacher, timeslot):
+                    candidates = (
+                        codec.course_teacher_masks[course] & day_teachers[slot_day[timeslot]]
+                        & slot_teachers.free(timeslot) & ~full_teachers
+                    )
+                    if candidates:
+                        teacher = min(iter_slots(candidates), key=teacher_busy.busy_count)
+                        _assign(timetable, state, i, teacher=teacher)
+                    else:
+                        # No qualified teacher is free at this slot: find a slot where one is
+                        for t in sorted((t for t in qualified if has_hours(t)), key=teacher_busy.busy_count):
+                            options = year_busy.free(year) & teacher_busy.free(t) & teacher_timeslots[t]
+                            if options:
+                                teacher, timeslot = t, best_slot(year, options & classroom_busy.free(classroom) or options)
+                                _assign(timetable, state, i, teacher=teacher, timeslot=timeslot)
+                                break
+                    count('teacher', teacher_fits(teacher, timeslot))
+
+                # ---- Repair Classroom Conflicts ----
+                if classroom_busy.is_busy(classroom, timeslot):
+                    free_classrooms = slot_classrooms.free(timeslot)
+                    count('classroom', bool(free_classrooms))
+                    if free_classrooms:
+                        classroom = _lowest(free_classrooms)
+                        _assign(timetable, state, i, classroom=classroom)
+
+                for kind, occupancy, resource in (('teacher', teacher_busy, teacher), ('classroom', classroom_busy, classroom), ('year', year_busy, year)):
+                    if occupancy.occupy(resource, timeslot):
+                        double_booked.add((kind, resource, timeslot))
+                slot_classrooms.occupy(timeslot, classroom)
+                slot_teachers.occupy(timeslot, teacher)
+                if not has_hours(teacher):
+                    full_teachers |= 1 << teacher
+                slot_genes.setdefault(timeslot, []).append(i)
+
+        # ---- Repair Gaps in Timetables ----
+        with section('repair_timetable.gap_shift'):
+            year = int(genes['year'][start]) if end > start else None
+            for day_timeslots in problem_index.day_timeslots:
+                used = [ts for ts in day_timeslots if ts in slot_genes]
+                for k in range(1, len(used)):
+                    previous, current = used[k - 1], used[k]
+                    if slot_number[current] <= slot_number[previous] + 1:
+                        continue
+                    target, closed = next_slot[previous], False
+                    if len(slot_genes[current]) == 1:
+                        i = slot_genes[current][0]
+                        teacher, classroom = int(genes['teacher'][i]), int(genes['classroom'][i])
+                        clean = ('teacher', teacher, current) not in double_booked and ('classroom', classroom, current) not in double_booked
+                        if clean and teacher_timeslots[teacher] >> target & 1 and not teacher_busy.is_busy(teacher, target) \
+                                and not classroom_busy.is_busy(classroom, target):
+                            _assign(timetable, state, i, timeslot=target)
+                            for occupancy, resource in ((teacher_busy, teacher), (classroom_busy, classroom), (year_busy, year)):
+                                occupancy.release(resource, current)
+                                occupancy.occupy(resource, target)
+                            slot_classrooms.release(current, classroom)
+                            slot_classrooms.occupy(target, classroom)
+                            slot_teachers.release(current, teacher)
+                            slot_teachers.occupy(target, teacher)
+                            slot_genes[target] = slot_genes.pop(current)
+                            used[k] = target
+                            closed = True
+                    count('gap', closed)
+
+    if report is not None:
+        report.update(counts)
+    return timetable
@@ -0,0 +1,188 @@
+"""
+Warm start: re-solve a slightly changed problem from its previous timetable.
+
+When a teacher's unavailability, a course's hours or another part of the
+input is edited, most lessons of the published timetable are still valid.
+adapt_individual maps the previous timetable onto the new problem and
+returns the lessons the edit affects:
+
+- lessons whose teacher is no longer qualified, no longer available that day
+  or gone, and lessons whose classroom or timeslot is gone,
+- new lessons (more hours, new courses or new years).
+
+Lessons of removed courses or years and lessons beyond the new hours of a
+course are dropped. place_genes then moves every affected lesson to its best
+(teacher, classroom, timeslot), and Solver.reoptimize runs tabu search on the
+affected lessons only, then on the related_genes: the affected lessons, the
+lessons they overlap with and the lessons around the gaps left by dropped ones.
+restore_genes finally moves back every lesson that can return to its previous
+position without lowering the fitness. Every other lesson stays where it was
+(see Solver.reoptimize).
+"""
+import numpy as np
+
+from fitness_batch import COURSE_DURATION_MINUTES
+from profiling import profiled
+from timetable import GENE_DTYPE, Timetable
+
+
+def adapt_individual(previous, codec, year_courses):
+    """
+    Map a timetable of the previous problem onto a new problem.
+
+    Parameters:
+    - previous: Dict individual of the previous problem (e.g. the 'individual' of a solve result).
+    - codec: TimetableCodec of the new problem.
+    - year_courses: year_courses of the new problem.
+
+    Returns:
+    - The Timetable, the sorted array of the indexes of its affected genes and
+      the (year, timeslot) of every dropped lesson as an array of shape (n, 2),
+      -1 for a year or timeslot that is no longer part of the problem.
+    """
+    year_map = codec.index_maps['year']
+    timeslot_index = codec.problem_index.timeslot_index
+    previous_genes = {}  # (year, course) -> previous genes, in order
+    dropped = []  # (year, timeslot) of the previous lessons the new problem has no room for
+    for year_timetable in previous:
+        for gene in year_timetable:
+            year = year_map.get(gene['year_id'])
+            course = codec.course_index.get(gene['course'])
+            if year is not None:
+                previous_genes.setdefault((year, course), []).append(gene)  # course None: removed from the problem
+            else:
+                dropped.append((-1, -1))  # Year removed from the problem
+
+    rows, affected = [], []
+    year_offsets = [0]
+    for year_index, year in enumerate(codec.years):
+        needed = {}
+        for course in year_courses[year['id']]:
+            course_index = codec.course_index[course['course_name']]
+            needed[course_index] = needed.get(course_index, 0) + int(course['hours'] * 60 // COURSE_DURATION_MINUTES)
+
+        for course_index, count in needed.items():
+            genes = previous_genes.get((year_index, course_index), [])
+            qualified = codec.course_teachers[course_index] or range(len(codec.teachers))
+            for k in range(count):
+                gene = genes[k] if k < len(genes) else None
+                row, valid = _adapt_gene(gene, codec, qualified)
+                if not valid:
+                    affected.append(len(rows))
+                rows.append((year_index, course_index) + row)
+        year_offsets.append(len(rows))
+
+        # Lessons beyond the new hours of their course, or of a course the year no longer has
+        for (previous_year, course_index), genes in previous_genes.items():
+            if previous_year == year_index:
+                for gene in genes[needed.get(course_index, 0):]:
+                    timeslot = timeslot_index.get((gene['timeslot']['day'], gene['timeslot']['slot']), -1)
+                    dropped.append((year_index, timeslot))
+
+    timetable = Timetable(np.array(rows, dtype=GENE_DTYPE), np.array(year_offsets, dtype=np.int64))
+    return timetable, np.array(affected, dtype=np.int64), np.array(dropped, dtype=np.int64).reshape(-1, 2)
+
+
+def _adapt_gene(gene, codec, qualified):
+    """
+    Return the (teacher, classroom, timeslot) of a previous gene in the new problem and
+    whether it is still valid. Missing or invalid fields get placeholders for place_genes.
+    """
+    problem_index = codec.problem_index
+    if gene is None:
+        return (qualified[0], 0, 0), False
+    teacher = problem_index.teacher_index.get(gene['teacher'])
+    classroom = problem_index.classroom_index.get(gene['classroom'])
+    timeslot = problem_index.timeslot_index.get((gene['timeslot']['day'], gene['timeslot']['slot']))
+    valid = (
+        teacher in qualified and classroom is not None and timeslot is not None
+        and problem_index.is_available(teacher, timeslot)
+    )
+    return (
+        teacher if teacher in qualified else qualified[0],
+        0 if classroom is None else classroom,
+        0 if timeslot is None else timeslot,
+    ), valid
+
+
+@profiled('place_genes')
+def place_genes(state, codec, indexes):
+    """
+    Move each of the given genes, in order, to the (teacher, classroom, timeslot) with
+    the best fitness, keeping its current values on ties. Teachers are the qualified
+    ones available on the day, classrooms the first free one at the timeslot.
+
+    Returns:
+    - The fitness of the timetable.
+    """
+    problem_index = codec.problem_index
+    genes = state.timetable.genes
+    n_slots = len(codec.timeslots)
+    for index in indexes:
+        index = int(index)
+        qualified = codec.course_teachers[genes['course'][index]] or range(len(codec.teachers))
+        current = (int(genes['teacher'][index]), int(genes['classroom'][index]), int(genes['timeslot'][index]))
+        best, best_score = current, state.score
+        for timeslot in [current[2]] + [s for s in range(n_slots) if s != current[2]]:
+            free = np.flatnonzero(state.classroom_count[:, timeslot] == 0)
+            classroom = int(free[0]) if len(free) else current[1]
+            teachers = [t for t in qualified if problem_index.teacher_timeslots[t] >> timeslot & 1] or qualified
+            for teacher in teachers:
+                state.move(index, teacher=teacher, classroom=classroom, timeslot=timeslot)
+                if state.score > best_score:
+                    best, best_score = (teacher, classroom, timeslot), state.score
+                state.move(index, teacher=current[0], classroom=current[1], timeslot=current[2])
+        state.move(index, teacher=best[0], classroom=best[1], timeslot=best[2])
+    return state.score
+
+
+def related_genes(timetable, codec, indexes, dropped):
+    """
+    Return the sorted indexes of the genes a re-optimization may move: the given genes,
+    the genes sharing their teacher, classroom or year at their timeslot, and the genes of
+    the year of every dropped lesson on the day of that lesson.
+
+    Parameters:
+    - timetable: Timetable of the new problem.
+    - codec: TimetableCodec of the new problem.
+    - indexes: Array of the indexes of the affected genes.
+    - dropped: (year, timeslot) of the dropped lessons, as returned by adapt_individual.
+    """
+    genes = timetable.genes
+    timeslot = genes['timeslot'].astype(np.int64)
+    related = np.zeros(len(genes), dtype=bool)
+    related[indexes] = True
+    for field in ('teacher', 'classroom', 'year'):
+        keys = genes[field].astype(np.int64) * len(codec.timeslots) + timeslot
+        related |= np.isin(keys, keys[indexes])
+
+    slot_day = codec.index_maps['slot_day']
+    day = slot_day[timeslot]
+    for year, dropped_timeslot in dropped:
+        if year >= 0 and dropped_timeslot >= 0:
+            related |= (genes['year'] == year) & (day == slot_day[dropped_timeslot])
+    return np.flatnonzero(related)
+
+
+@profiled('restore_genes')
+def restore_genes(state, original, indexes):
+    """
+    Move each of the given genes, in order, back to its (teacher, classroom, timeslot)
+    in original when that does not lower the fitness.
+
+    Parameters:
+    - state: ConflictState of the timetable.
+    - original: Gene array the genes return to (e.g. the adapted previous timetable).
+    - indexes: Indexes of the genes to restore.
+
+    Returns:
+    - The fitness of the timetable.
+    """
+    genes = state.timetable.genes
+    for index in indexes:
+        index = int(index)
+        current = {field: int(genes[field][index]) for field in ('teacher', 'classroom', 'timeslot')}
+        previous = {field: int(original[field][index]) for field in current}
+        if current != previous and state.move(index, **previous) < 0:
+            state.move(index, **current)
+    return state.score